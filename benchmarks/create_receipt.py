@@ -0,0 +1,58 @@
+"""Statements and latency per created receipt: ORM add/commit/refresh versus INSERT ... RETURNING.
+
+Both variants write only the receipts row, the statement the refresh round trip was removed from; the items and daily
+stats that insert_receipts also writes would be the same work on either side.
+
+Run against a migrated database: uv run python -m benchmarks.create_receipt
+"""
+
+import asyncio
+
+from sqlalchemy import insert
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import PaymentType, Receipt
+from src.schemas.receipts import ReceiptCreateRequest
+from src.services.receipts import build_receipt_values, calculate_totals
+
+ITERATIONS = 500
+
+RECEIPT_DATA = ReceiptCreateRequest.model_validate(
+    {
+        "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"} for i in range(5)],
+        "payment": {"type": PaymentType.CASH, "amount": "200.00"},
+    }
+)
+
+
+async def main() -> None:
+    counter = StatementCounter(engine)
+
+    async with bench_user(session) as user:
+
+        async def add_commit_refresh() -> None:
+            _, total_minor = calculate_totals(RECEIPT_DATA.products)
+            async with session() as db:
+                receipt = Receipt(**build_receipt_values(user.id, RECEIPT_DATA, total_minor))
+                db.add(receipt)
+                await db.commit()
+                await db.refresh(receipt)
+
+        async def insert_returning() -> None:
+            _, total_minor = calculate_totals(RECEIPT_DATA.products)
+            async with session() as db:
+                await db.execute(
+                    insert(Receipt).returning(Receipt.id, Receipt.created_at),
+                    build_receipt_values(user.id, RECEIPT_DATA, total_minor),
+                )
+                await db.commit()
+
+        await measure("add + commit + refresh", counter, ITERATIONS, add_commit_refresh)
+        await measure("insert ... returning + commit", counter, ITERATIONS, insert_returning)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Latency and peak memory per /receipts/search page of receipts with large product lists: loading ORM objects with
+the products JSON versus selecting only the list item columns.
+
+Run against a migrated database: uv run python -m benchmarks.list_receipts
+"""
+
+import asyncio
+import tracemalloc
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import PaymentType
+from src.schemas.receipts import ReceiptCreateRequest, ReceiptListItem
+from src.services.receipts import (
+    build_receipt_values,
+    build_receipts_query,
+    calculate_totals,
+    insert_receipts,
+    paginate_receipts_query,
+    project_receipt_list_query,
+)
+from src.utils.money import from_minor
+
+ITERATIONS = 50
+RECEIPTS = 1000
+PER_PAGE = 100
+
+RECEIPT_DATA = ReceiptCreateRequest.model_validate(
+    {
+        "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"} for i in range(200)],
+        "payment": {"type": PaymentType.CASH, "amount": "5000.00"},
+    }
+)
+
+
+async def main() -> None:
+    counter = StatementCounter(engine)
+
+    async with bench_user(session) as user:
+        lines, total_minor = calculate_totals(RECEIPT_DATA.products)
+        async with session() as db:
+            for _ in range(0, RECEIPTS, PER_PAGE):
+                values = build_receipt_values(user.id, RECEIPT_DATA, total_minor)
+                await insert_receipts(db, [values] * PER_PAGE, [lines] * PER_PAGE)
+            await db.commit()
+
+        query = build_receipts_query(user.id)
+
+        async def orm_objects() -> list[ReceiptListItem]:
+            async with session() as db:
+                receipts = await db.scalars(paginate_receipts_query(query, PER_PAGE))
+                return [
+                    ReceiptListItem(
+                        id=receipt.id,
+                        total=from_minor(receipt.total_minor),
+                        payment_type=receipt.payment_type,
+                        created_at=receipt.created_at,
+                    )
+                    for receipt in receipts
+                ]
+
+        async def projected_rows() -> list[ReceiptListItem]:
+            async with session() as db:
+                rows = await db.execute(paginate_receipts_query(project_receipt_list_query(query), PER_PAGE))
+                return [
+                    ReceiptListItem(
+                        id=row.id,
+                        total=from_minor(row.total_minor),
+                        payment_type=row.payment_type,
+                        created_at=row.created_at,
+                    )
+                    for row in rows
+                ]
+
+        for name, operation in [("orm objects", orm_objects), ("projected rows", projected_rows)]:
+            await measure(name, counter, ITERATIONS, operation)
+
+            tracemalloc.start()
+            await operation()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'':<32} peak memory per page={peak / 1024:.0f}KiB")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Latency of GET /receipts/{id} while a storm of logins runs on the same worker: idle, with bcrypt called on the
+event loop (as logins were handled before), and with bcrypt in the bounded password hashing pool.
+
+Run against a migrated database: uv run python -m benchmarks.login_storm
+"""
+
+import asyncio
+import sys
+import time
+from typing import Callable
+
+import httpx
+from sqlalchemy import delete
+
+from benchmarks.utils import bench_user, report
+from src.db import engine, session
+from src.main import app
+from src.models import PaymentType, User
+from src.schemas.receipts import ReceiptCreateRequest
+from src.services import auth as auth_service
+from src.services.receipts import create_receipt
+from src.utils.auth import PasswordHasher, get_password_hash, password_hasher
+from src.utils.tokens import create_access_token
+
+PROBES = 30
+LOGIN_CONCURRENCY = 4
+STORM_EMAIL = "login-storm@example.com"
+STORM_PASSWORD = "password123"  # noqa: S105
+
+RECEIPT_DATA = ReceiptCreateRequest.model_validate(
+    {
+        "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"} for i in range(5)],
+        "payment": {"type": PaymentType.CASH, "amount": "500.00"},
+    }
+)
+
+
+class BlockingPasswordHasher(PasswordHasher):
+    async def _run[T](self, function: Callable[..., T], *args: str) -> T:
+        return function(*args)
+
+
+async def login_storm(client: httpx.AsyncClient, stop: asyncio.Event, statuses: dict[int, int]) -> None:
+    form = {"username": STORM_EMAIL, "password": STORM_PASSWORD}
+    while not stop.is_set():
+        response = await client.post("/auth/token", data=form)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def probe(name: str, client: httpx.AsyncClient, url: str, headers: dict, storm: bool) -> None:
+    stop = asyncio.Event()
+    statuses: dict[int, int] = {}
+    storm_started = time.perf_counter()
+    logins = [
+        asyncio.create_task(login_storm(client, stop, statuses)) for _ in range(LOGIN_CONCURRENCY if storm else 0)
+    ]
+    await asyncio.sleep(0.5)
+
+    samples = []
+    for _ in range(PROBES):
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            sys.exit(f"{name}: GET {url} returned {response.status_code}")
+        await asyncio.sleep(0.005)
+
+    stop.set()
+    await asyncio.gather(*logins)
+    elapsed = time.perf_counter() - storm_started
+    report(name, samples, None, PROBES)
+    if storm:
+        rates = ", ".join(f"{code}: {count / elapsed:.1f}/s" for code, count in sorted(statuses.items()))
+        print(f"{'':<32} logins {rates}")
+
+
+async def main() -> None:
+    async with session() as db:
+        db.add(User(name="Login storm", email=STORM_EMAIL, password=get_password_hash(STORM_PASSWORD)))
+        await db.commit()
+
+    try:
+        async with bench_user(session) as user:
+            async with session() as db:
+                receipt = await create_receipt(db, user.id, RECEIPT_DATA)
+                await db.commit()
+
+            url = f"/receipts/{receipt.id}"
+            headers = {"Authorization": f"Bearer {create_access_token(user.email, user.id)}"}
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await probe("idle", client, url, headers, storm=False)
+
+                auth_service.password_hasher = BlockingPasswordHasher(1, 0)
+                await probe("storm: bcrypt on event loop", client, url, headers, storm=True)
+
+                auth_service.password_hasher = password_hasher
+                await probe("storm: password hashing pool", client, url, headers, storm=True)
+    finally:
+        async with session() as db:
+            await db.execute(delete(User).where(User.email == STORM_EMAIL))
+            await db.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
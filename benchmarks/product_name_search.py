@@ -0,0 +1,102 @@
+"""Latency of the product_name search filter over a large seeded table: decoding every receipt's products JSON
+versus the product name dictionary and its indexes.
+
+Run against a migrated database: uv run python -m benchmarks.product_name_search [--receipts N]
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import Select, exists, func, select, text
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import Receipt
+from src.schemas.receipts import ProductNameMatch, ReceiptFilters
+from src.services.receipts import build_count_query, build_receipts_query, paginate_receipts_query
+
+PRODUCT_NAMES = 50_000
+ITEMS_PER_RECEIPT = 3
+
+SEARCHES = {
+    "substring, rare": ("duct 4242", ProductNameMatch.SUBSTRING),
+    "substring, common": ("duct 1", ProductNameMatch.SUBSTRING),
+    "prefix, rare": ("Product 4242", ProductNameMatch.PREFIX),
+}
+
+
+def build_json_scan_query(user_id: int, name: str, match: ProductNameMatch) -> Select:
+    pattern = f"%{name}%" if match == ProductNameMatch.SUBSTRING else f"{name}%"
+    item = func.json_array_elements(Receipt.products["items"]).table_valued("value").alias("item")
+    return build_receipts_query(user_id).where(
+        exists(select(1).select_from(item).where(item.c.value.op("->>")("name").ilike(pattern)))
+    )
+
+
+async def seed(user_id: int, receipts: int) -> None:
+    params = {"user_id": user_id, "receipts": receipts, "names": PRODUCT_NAMES, "items": ITEMS_PER_RECEIPT}
+
+    async with session() as db:
+        await db.execute(
+            text(
+                "INSERT INTO product_names (name) SELECT 'Product ' || g FROM generate_series(1, :names) g "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            params,
+        )
+        await db.execute(
+            text(
+                "INSERT INTO receipts (user_id, products, total_minor, payment_type, payment_minor, created_at) "
+                "SELECT :user_id, json_build_object('items', ("
+                "SELECT json_agg(json_build_object('name', 'Product ' || ((g * k) % :names + 1), "
+                "'price', '1.00', 'quantity', '1', 'total', '1.00')) FROM generate_series(7, 6 + :items) k"
+                ")), :items * 100, 'cash', 10000, now() - g * interval '1 minute' FROM generate_series(1, :receipts) g"
+            ),
+            params,
+        )
+        await db.execute(
+            text(
+                "INSERT INTO receipt_items "
+                "(receipt_id, receipt_created_at, position, product_name_id, price_minor, quantity, total_minor) "
+                "SELECT r.id, r.created_at, i.position - 1, n.id, 100, 1, 100 FROM receipts r "
+                "CROSS JOIN LATERAL json_array_elements(r.products -> 'items') WITH ORDINALITY AS i(item, position) "
+                "JOIN product_names n ON n.name = i.item ->> 'name' WHERE r.user_id = :user_id"
+            ),
+            params,
+        )
+        await db.execute(text("ANALYZE receipts, receipt_items, product_names"))
+        await db.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=1_000_000, help="Receipts to seed")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    counter = StatementCounter(engine)
+
+    async with bench_user(session) as user:
+        await seed(user.id, args.receipts)
+
+        for label, (name, match) in SEARCHES.items():
+            queries = {
+                "json scan": build_json_scan_query(user.id, name, match),
+                "dictionary": build_receipts_query(
+                    user.id, ReceiptFilters.model_validate({"product_name": name, "product_name_match": match})
+                ),
+            }
+            for approach, query in queries.items():
+
+                async def search(query: Select = query) -> None:
+                    async with session() as db:
+                        await db.scalar(build_count_query(query))
+                        (await db.execute(paginate_receipts_query(query, 20))).all()
+
+                await measure(f"{label}: {approach}", counter, args.iterations, search)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
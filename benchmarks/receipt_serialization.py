@@ -0,0 +1,167 @@
+"""CPU time to build and serialize the response of each receipt route: a validated response model passed through
+FastAPI's response validation and json.dumps, versus FastJSONResponse as the routes use it now.
+
+No database is needed: uv run python -m benchmarks.receipt_serialization
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import partial
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+
+from benchmarks.utils import measure
+from src.models import PaymentType, Receipt
+from src.routes.receipts import router
+from src.schemas.receipts import (
+    CountMode,
+    PaymentInfo,
+    ProductResponse,
+    ReceiptBulkCreateResponse,
+    ReceiptBulkCreateResult,
+    ReceiptListItem,
+    ReceiptListResponse,
+    ReceiptResponse,
+)
+from src.services.receipts import build_receipt_response_content
+from src.utils.money import format_minor, from_minor, to_minor
+from src.utils.responses import FastJSONResponse
+
+ITERATIONS = 500
+CREATED_AT = datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc)
+PAYMENT = PaymentInfo(type=PaymentType.CARD, amount=Decimal("5000.00"))
+
+
+def product_rows(count: int) -> list[dict]:
+    return [
+        {
+            "name": f"Product {i}",
+            "price_minor": 1050,
+            "price_places": 2,
+            "quantity": Decimal("2"),
+            "total_minor": 2100,
+            "total_places": 2,
+        }
+        for i in range(count)
+    ]
+
+
+def stored_receipt(products: int) -> Receipt:
+    receipt = Receipt(
+        user_id=1,
+        products={"items": []},
+        total_minor=2100 * products,
+        payment_type=PAYMENT.type,
+        payment_minor=to_minor(PAYMENT.amount),
+        created_at=CREATED_AT,
+    )
+    receipt.id = 1
+    return receipt
+
+
+def receipt_model(receipt_id: int, products: list[dict]) -> ReceiptResponse:
+    return ReceiptResponse(
+        id=receipt_id,
+        products=[
+            ProductResponse(
+                name=row["name"],
+                price=from_minor(row["price_minor"]),
+                quantity=row["quantity"],
+                total=from_minor(row["total_minor"]),
+            )
+            for row in products
+        ],
+        payment=PAYMENT,
+        total=Decimal("21.00") * len(products),
+        rest=PAYMENT.amount - Decimal("21.00") * len(products),
+        created_at=CREATED_AT,
+    )
+
+
+def list_rows() -> list[dict]:
+    return [
+        {"id": i, "total_minor": 4200, "payment_type": PaymentType.CASH, "created_at": CREATED_AT} for i in range(100)
+    ]
+
+
+def list_item(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "total": format_minor(row["total_minor"]),
+        "payment_type": row["payment_type"],
+        "created_at": row["created_at"],
+    }
+
+
+def list_content(receipts: list) -> dict:
+    return {
+        "receipts": receipts,
+        "total_count": 1000,
+        "count_mode": CountMode.EXACT,
+        "has_more": True,
+        "page": 1,
+        "per_page": 100,
+        "next_cursor": "cursor",
+    }
+
+
+def bulk_model() -> ReceiptBulkCreateResponse:
+    results = [
+        ReceiptBulkCreateResult(index=i, success=True, receipt=receipt_model(i, product_rows(5))) for i in range(100)
+    ]
+    return ReceiptBulkCreateResponse(results=results, created_count=100)
+
+
+DETAIL_RECEIPT = stored_receipt(200)
+DETAIL_ROWS = product_rows(200)
+CREATE_ROWS = product_rows(20)
+LIST_ROWS = list_rows()
+
+# path: (default route body, what the route does now)
+ENDPOINTS: dict[str, tuple[Callable[[], BaseModel], Callable[[], object]]] = {
+    "/receipts/{receipt_id}": (
+        lambda: receipt_model(1, DETAIL_ROWS),
+        lambda: build_receipt_response_content(DETAIL_RECEIPT, [dict(row) for row in DETAIL_ROWS]),
+    ),
+    "/receipts/create": (lambda: receipt_model(1, CREATE_ROWS), lambda: receipt_model(1, CREATE_ROWS)),
+    "/receipts/search": (
+        lambda: ReceiptListResponse(
+            **list_content([ReceiptListItem.model_validate(list_item(row)) for row in LIST_ROWS])
+        ),
+        lambda: list_content([list_item(row) for row in LIST_ROWS]),
+    ),
+    "/receipts/bulk-create": (bulk_model, bulk_model),
+}
+
+
+async def default_response(response_model: TypeAdapter, build: Callable[[], BaseModel]) -> bytes:
+    # Validated against the route's response model and dumped to JSON-compatible data, as FastAPI does by default.
+    content = response_model.dump_python(response_model.validate_python(build()), mode="json")
+    return bytes(JSONResponse(content).body)
+
+
+async def fast_response(build: Callable[[], object]) -> bytes:
+    return bytes(FastJSONResponse(build()).body)
+
+
+async def main() -> None:
+    routes = {route.path: route for route in router.routes if isinstance(route, APIRoute)}
+
+    for path, (default_content, fast_content) in ENDPOINTS.items():
+        default = partial(default_response, TypeAdapter(routes[path].response_model), default_content)
+        fast = partial(fast_response, fast_content)
+
+        if await default() != await fast():
+            sys.exit(f"{path}: responses differ")
+
+        await measure(f"{path}: default", None, ITERATIONS, default)
+        await measure(f"{path}: fast", None, ITERATIONS, fast)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+"""Receipts with many lines, Decimal amounts (as receipts were handled before) versus integer minor units:
+
+- write: CPU time to total a receipt, build its stored values and render its text;
+- read: latency to load a stored receipt's items and serialize its detail response, with the amounts coming from
+  numeric columns versus bigint minor units.
+
+Run against a migrated database: uv run python -m benchmarks.receipt_totals
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import partial
+
+import pydantic_core
+from sqlalchemy import Numeric, cast, select
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import PaymentType, ProductName, Receipt, ReceiptItem
+from src.schemas.receipts import ReceiptCreateRequest
+from src.services.receipt_items import load_receipt_products
+from src.services.receipts import (
+    build_receipt_query,
+    build_receipt_response_content,
+    build_receipt_values,
+    calculate_totals,
+    insert_receipts,
+)
+from src.services.rendering import render_receipt_text
+
+ITERATIONS = 50
+LINE_COUNTS = [1_000, 10_000]
+LINE_WIDTH = 32
+CREATED_AT = datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def receipt_data(lines: int) -> ReceiptCreateRequest:
+    # Whole quantities, so every line total keeps its price's two places and both approaches must give the same output.
+    return ReceiptCreateRequest.model_validate(
+        {
+            "products": [
+                {"name": f"Product {i}", "price": f"{1 + i % 997}.{i % 100:02d}", "quantity": ["2", "3", "1"][i % 3]}
+                for i in range(lines)
+            ],
+            "payment": {"type": PaymentType.CARD, "amount": "99999999.00"},
+        }
+    )
+
+
+def decimal_receipt(data: ReceiptCreateRequest) -> tuple[dict, str]:
+    products = []
+    total_cost = Decimal("0")
+    for product in data.products:
+        product_total = product.price * product.quantity
+        products.append(
+            {"name": product.name, "price": product.price, "quantity": product.quantity, "total": product_total}
+        )
+        total_cost += product_total
+
+    stored_items = {
+        "items": [
+            {"name": p["name"], "price": str(p["price"]), "quantity": str(p["quantity"]), "total": str(p["total"])}
+            for p in products
+        ]
+    }
+
+    price_width = min(10, max(8, LINE_WIDTH // 4))
+    label_width = LINE_WIDTH - price_width - 1
+
+    def row(label: str, amount: Decimal) -> str:
+        label = label if len(label) <= label_width else label[: label_width - 3] + "..."
+        return f"{label:<{label_width}} {amount:>{price_width},.2f}"
+
+    text_lines = ["My Company".center(LINE_WIDTH), "=" * LINE_WIDTH]
+    for product in products:
+        text_lines.append(f"{product['quantity']} x {product['price']:,.2f}")
+        text_lines.append(row(product["name"], product["total"]))
+    text_lines.append("-" * LINE_WIDTH)
+    text_lines.append(row("Загальна сума", total_cost))
+    text_lines.append(row("Карта", data.payment.amount))
+    text_lines.append(row("Решта", data.payment.amount - total_cost))
+    text_lines.append("=" * LINE_WIDTH)
+    text_lines.append(CREATED_AT.strftime("%d.%m.%Y %H:%M").center(LINE_WIDTH))
+    return stored_items, "\n".join(text_lines)
+
+
+def minor_units_receipt(data: ReceiptCreateRequest) -> tuple[dict, str]:
+    lines, total_minor = calculate_totals(data.products)
+    values = build_receipt_values(1, data, total_minor)
+    return values, render_receipt_text(Receipt(**values, created_at=CREATED_AT), lines, LINE_WIDTH)
+
+
+async def write(build: partial[tuple[dict, str]]) -> None:
+    build()
+
+
+async def read_numeric(receipt_id: int) -> bytes:
+    async with session() as db:
+        receipt = await db.scalar(build_receipt_query(receipt_id))
+        if receipt is None:
+            sys.exit("receipt not found")
+        result = await db.execute(
+            select(
+                ProductName.name,
+                cast(cast(ReceiptItem.price_minor, Numeric) / 100, Numeric(12, 2)).label("price"),
+                ReceiptItem.quantity,
+                cast(cast(ReceiptItem.total_minor, Numeric) / 100, Numeric(12, 2)).label("total"),
+            )
+            .join(ProductName, ProductName.id == ReceiptItem.product_name_id)
+            .where(ReceiptItem.receipt_id == receipt_id)
+            .order_by(ReceiptItem.position)
+        )
+        products = [
+            {"name": row.name, "price": row.price, "quantity": row.quantity, "total": row.total} for row in result
+        ]
+        total = Decimal(receipt.total_minor).scaleb(-2)
+        payment = Decimal(receipt.payment_minor).scaleb(-2)
+        return pydantic_core.to_json(
+            {
+                "id": receipt.id,
+                "products": products,
+                "payment": {"type": receipt.payment_type, "amount": payment},
+                "total": total,
+                "rest": payment - total,
+                "created_at": receipt.created_at,
+            }
+        )
+
+
+async def read_minor_units(receipt_id: int) -> bytes:
+    async with session() as db:
+        receipt = await db.scalar(build_receipt_query(receipt_id))
+        if receipt is None:
+            sys.exit("receipt not found")
+        products = await load_receipt_products(db, receipt)
+        return pydantic_core.to_json(build_receipt_response_content(receipt, products))
+
+
+async def main() -> None:
+    counter = StatementCounter(engine)
+
+    async with bench_user(session) as user:
+        for line_count in LINE_COUNTS:
+            data = receipt_data(line_count)
+
+            if decimal_receipt(data)[1] != minor_units_receipt(data)[1]:
+                sys.exit(f"{line_count} lines: rendered receipts differ")
+
+            await measure(
+                f"{line_count} lines, write: decimal", None, ITERATIONS, partial(write, partial(decimal_receipt, data))
+            )
+            await measure(
+                f"{line_count} lines, write: minor units",
+                None,
+                ITERATIONS,
+                partial(write, partial(minor_units_receipt, data)),
+            )
+
+            lines, total_minor = calculate_totals(data.products)
+            async with session() as db:
+                [row] = await insert_receipts(db, [build_receipt_values(user.id, data, total_minor)], [lines])
+                await db.commit()
+
+            if await read_numeric(row.id) != await read_minor_units(row.id):
+                sys.exit(f"{line_count} lines: responses differ")
+
+            await measure(f"{line_count} lines, read: numeric", counter, ITERATIONS, partial(read_numeric, row.id))
+            await measure(
+                f"{line_count} lines, read: minor units", counter, ITERATIONS, partial(read_minor_units, row.id)
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
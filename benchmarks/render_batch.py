@@ -0,0 +1,75 @@
+"""Statements and latency to render a batch of public receipts: loading and rendering them one by one, as repeated
+/receipts/{id}/public calls do, versus /receipts/public/render-batch loading them all in one statement.
+
+Run against a migrated database: uv run python -m benchmarks.render_batch
+"""
+
+import asyncio
+import sys
+from functools import partial
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import PaymentType
+from src.schemas.receipts import ReceiptCreateRequest, RenderFormat
+from src.services.receipt_items import load_receipt_products, load_receipts_with_products
+from src.services.receipts import build_receipt_query, build_receipt_values, calculate_totals, insert_receipts
+from src.services.rendering import render_document, render_receipt
+
+ITERATIONS = 20
+RECEIPTS = 500
+LINE_WIDTH = 32
+
+RECEIPT_DATA = ReceiptCreateRequest.model_validate(
+    {
+        "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"} for i in range(20)],
+        "payment": {"type": PaymentType.CASH, "amount": "500.00"},
+    }
+)
+
+
+async def one_by_one(receipt_ids: list[int], render_format: RenderFormat) -> bytes:
+    bodies = []
+    async with session() as db:
+        for receipt_id in receipt_ids:
+            receipt = await db.scalar(build_receipt_query(receipt_id))
+            if receipt is None:
+                sys.exit(f"receipt {receipt_id} not found")
+            products = await load_receipt_products(db, receipt)
+            bodies.append(render_receipt(receipt, products, LINE_WIDTH, render_format))
+    return b"".join(render_document(render_format, bodies))
+
+
+async def batch(receipt_ids: list[int], render_format: RenderFormat) -> bytes:
+    async with session() as db:
+        receipts = await load_receipts_with_products(db, receipt_ids)
+    bodies = (render_receipt(*receipts[receipt_id], LINE_WIDTH, render_format) for receipt_id in receipt_ids)
+    return b"".join(render_document(render_format, bodies))
+
+
+async def main() -> None:
+    counter = StatementCounter(engine)
+
+    async with bench_user(session) as user:
+        lines, total_minor = calculate_totals(RECEIPT_DATA.products)
+        async with session() as db:
+            rows = await insert_receipts(
+                db, [build_receipt_values(user.id, RECEIPT_DATA, total_minor)] * RECEIPTS, [lines] * RECEIPTS
+            )
+            await db.commit()
+        receipt_ids = [row.id for row in rows]
+
+        for render_format in RenderFormat:
+            if await one_by_one(receipt_ids, render_format) != await batch(receipt_ids, render_format):
+                sys.exit(f"{render_format}: renders differ")
+
+            await measure(
+                f"{render_format}: one by one", counter, ITERATIONS, partial(one_by_one, receipt_ids, render_format)
+            )
+            await measure(f"{render_format}: batch", counter, ITERATIONS, partial(batch, receipt_ids, render_format))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Overhead of per-route request metrics on GET /receipts/{id}: with metrics disabled, where the middleware and the
+engine listeners only check whether they are on, and enabled, recording the route, status, latency and SQL time.
+
+Run against a migrated database: uv run python -m benchmarks.request_metrics
+"""
+
+import asyncio
+import sys
+from functools import partial
+
+import httpx
+
+from benchmarks.utils import bench_user, measure
+from src.config import config
+from src.db import engine, session
+from src.main import app
+from src.models import PaymentType
+from src.schemas.receipts import ReceiptCreateRequest
+from src.services.metrics import route_metrics
+from src.services.receipts import create_receipt
+from src.utils.tokens import create_access_token
+
+ITERATIONS = 2000
+
+RECEIPT_DATA = ReceiptCreateRequest.model_validate(
+    {
+        "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"} for i in range(5)],
+        "payment": {"type": PaymentType.CASH, "amount": "500.00"},
+    }
+)
+
+
+async def request(client: httpx.AsyncClient, url: str, headers: dict) -> None:
+    response = await client.get(url, headers=headers)
+    if response.status_code != 200:
+        sys.exit(f"GET {url} returned {response.status_code}")
+
+
+async def main() -> None:
+    async with bench_user(session) as user:
+        async with session() as db:
+            receipt = await create_receipt(db, user.id, RECEIPT_DATA)
+            await db.commit()
+
+        url = f"/receipts/{receipt.id}"
+        headers = {"Authorization": f"Bearer {create_access_token(user.email, user.id)}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for enabled in (False, True, False, True):
+                config.METRICS_ENABLED = enabled
+                label = "metrics enabled" if enabled else "metrics disabled"
+                await measure(label, None, ITERATIONS, partial(request, client, url, headers))
+
+        if route_metrics["GET", "/receipts/{receipt_id}"].db_statements.count != 2 * (ITERATIONS + 1):
+            sys.exit("requests were not recorded")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
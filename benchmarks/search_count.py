@@ -0,0 +1,122 @@
+"""Latency of an exact-count /receipts/search page across filter selectivities: the count and the page as two
+statements, as one statement joining the page laterally to the count, and as one statement with count(*) OVER ().
+
+Every extra statement costs a network round trip, which is near zero against a local database; --rtt-ms adds a
+simulated one to each statement.
+
+Run against a migrated database: uv run python -m benchmarks.search_count [--receipts N] [--rtt-ms MS]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from functools import partial
+
+from sqlalchemy import Select, event, func, text
+
+from benchmarks.utils import StatementCounter, bench_user, measure
+from src.db import engine, session
+from src.models import PaymentType
+from src.schemas.receipts import ReceiptFilters
+from src.services.receipts import (
+    build_count_query,
+    build_receipts_query,
+    build_search_page_query,
+    paginate_receipts_query,
+    project_receipt_list_query,
+)
+
+PER_PAGE = 10
+PAGES = (1, 50)
+
+NOW = datetime.now(timezone.utc)
+SEARCHES = {
+    "all receipts": None,
+    "last 30 days": ReceiptFilters.model_validate({"date_from": NOW - timedelta(days=30)}),
+    "card payments": ReceiptFilters.model_validate({"payment_type": PaymentType.CARD}),
+    "total 10.00-10.50": ReceiptFilters.model_validate({"min_total": Decimal("10.00"), "max_total": Decimal("10.50")}),
+    "no matches": ReceiptFilters.model_validate({"min_total": Decimal("999999.00")}),
+}
+
+
+async def seed(user_id: int, receipts: int) -> None:
+    """Receipts five minutes apart with spread totals, one in twenty paid by card."""
+    async with session() as db:
+        await db.execute(
+            text(
+                "INSERT INTO receipts (user_id, products, total_minor, payment_type, payment_minor, created_at) "
+                "SELECT :user_id, '{\"items\": []}', (g * 7919) % 100000, "
+                "CASE WHEN g % 20 = 0 THEN 'card' ELSE 'cash' END::payment_types, 100000, "
+                "now() - g * interval '5 minutes' FROM generate_series(1, :receipts) g"
+            ),
+            {"user_id": user_id, "receipts": receipts},
+        )
+        await db.execute(text("ANALYZE receipts"))
+        await db.commit()
+
+
+async def two_statements(query: Select, page: int) -> tuple[int, list]:
+    async with session() as db:
+        total_count = await db.scalar(build_count_query(query)) or 0
+        current_page = min(page, (total_count + PER_PAGE - 1) // PER_PAGE)
+        page_query = paginate_receipts_query(
+            project_receipt_list_query(query), PER_PAGE + 1, offset=max(current_page - 1, 0) * PER_PAGE
+        )
+        return total_count, list((await db.execute(page_query)).all())
+
+
+async def lateral(query: Select, page: int) -> tuple[int, list]:
+    async with session() as db:
+        rows = (await db.execute(build_search_page_query(query, PER_PAGE, page))).all()
+        return rows[0].total_count, [row[1:] for row in rows if row.id is not None]
+
+
+async def window(query: Select, page: int) -> tuple[int, list]:
+    """Page past the end not clamped, so only comparable for pages that exist."""
+    page_query = paginate_receipts_query(
+        project_receipt_list_query(query).add_columns(func.count().over()), PER_PAGE + 1, offset=(page - 1) * PER_PAGE
+    )
+    async with session() as db:
+        rows = (await db.execute(page_query)).all()
+    return (rows[0][-1] if rows else 0), [row[:-1] for row in rows]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=100_000, help="Receipts to seed")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated network round trip per statement")
+    args = parser.parse_args()
+
+    counter = StatementCounter(engine)
+    if args.rtt_ms:
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def round_trip(*_: object) -> None:
+            time.sleep(args.rtt_ms / 1000)
+
+    async with bench_user(session) as user:
+        await seed(user.id, args.receipts)
+
+        for name, filters in SEARCHES.items():
+            query = build_receipts_query(user.id, filters)
+            for page in PAGES:
+                expected = await two_statements(query, page)
+                strategies = [("two statements", two_statements), ("lateral", lateral)]
+                if page <= (expected[0] + PER_PAGE - 1) // PER_PAGE:
+                    strategies.append(("window", window))
+
+                for label, strategy in strategies:
+                    if await strategy(query, page) != expected:
+                        sys.exit(f"{name}, page {page}: {label} differs from two statements")
+                    await measure(f"{name}, p{page}: {label}", counter, args.iterations, partial(strategy, query, page))
+                print(f"{'':<32} total={expected[0]}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
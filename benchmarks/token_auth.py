@@ -0,0 +1,58 @@
+"""Auth overhead per request with and without the verified-token cache: verifying the bearer token alone, and a
+whole GET /auth/me (whose user lookup is served by the principal cache, so the token is most of the work).
+
+Run against a migrated database: uv run python -m benchmarks.token_auth
+"""
+
+import asyncio
+import sys
+from functools import partial
+
+import httpx
+
+from benchmarks.utils import bench_user, measure
+from src.db import engine, session
+from src.main import app
+from src.utils.auth import get_data_from_token, token_cache
+from src.utils.tokens import create_access_token
+
+DECODE_ITERATIONS = 5000
+REQUEST_ITERATIONS = 1000
+
+
+async def verify(token: str, cached: bool) -> None:
+    if not cached:
+        token_cache.clear()
+    get_data_from_token(token)
+
+
+async def request(client: httpx.AsyncClient, headers: dict, cached: bool) -> None:
+    if not cached:
+        token_cache.clear()
+    response = await client.get("/auth/me", headers=headers)
+    if response.status_code != 200:
+        sys.exit(f"GET /auth/me returned {response.status_code}")
+
+
+async def main() -> None:
+    async with bench_user(session) as user:
+        token = create_access_token(user.email, user.id)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for cached in (False, True):
+            label = "token cache" if cached else "no token cache"
+            await measure(f"verify token: {label}", None, DECODE_ITERATIONS, partial(verify, token, cached))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for cached in (False, True):
+                label = "token cache" if cached else "no token cache"
+                await measure(
+                    f"GET /auth/me: {label}", None, REQUEST_ITERATIONS, partial(request, client, headers, cached)
+                )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
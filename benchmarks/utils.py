@@ -0,0 +1,59 @@
+import statistics
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from src.models import User
+
+
+class StatementCounter:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args: object) -> None:
+        self.count += 1
+
+
+def report(name: str, samples: list[float], statements: int | None, operations: int) -> None:
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    line = (
+        f"{name:<32} mean={statistics.mean(samples_ms):8.3f}ms p50={statistics.median(samples_ms):8.3f}ms "
+        f"p95={p95:8.3f}ms"
+    )
+    if statements is not None:
+        line += f" statements/op={statements / operations:.2f}"
+    print(line)
+
+
+async def measure(
+    name: str, counter: StatementCounter | None, iterations: int, operation: Callable[[], Awaitable[object]]
+) -> None:
+    await operation()
+    if counter is not None:
+        counter.count = 0
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - started)
+    report(name, samples, counter.count if counter is not None else None, iterations)
+
+
+@asynccontextmanager
+async def bench_user(session_factory: async_sessionmaker[AsyncSession]) -> AsyncIterator[User]:
+    async with session_factory() as db:
+        user = User(name="Benchmark", email="benchmark@example.com", password="-")
+        db.add(user)
+        await db.commit()
+
+    try:
+        yield user
+    finally:
+        async with session_factory() as db:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
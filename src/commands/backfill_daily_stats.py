@@ -0,0 +1,34 @@
+"""Rebuild receipt_daily_stats from receipts.
+
+Usage: uv run python -m src.commands.backfill_daily_stats [--batch-size N]
+"""
+
+import argparse
+
+from sqlalchemy import create_engine, func, select
+
+from src.config import config
+from src.models import User
+from src.services.stats import backfill_daily_stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Users per transaction")
+    args = parser.parse_args()
+
+    engine = create_engine(config.database_url)
+    with engine.connect() as connection:
+        max_user_id = connection.scalar(select(func.max(User.id))) or 0
+        connection.commit()
+
+        for first_user_id in range(1, max_user_id + 1, args.batch_size):
+            last_user_id = min(first_user_id + args.batch_size - 1, max_user_id)
+            backfill_daily_stats(connection, first_user_id, last_user_id)
+            print(f"Backfilled users {first_user_id}-{last_user_id} of {max_user_id}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
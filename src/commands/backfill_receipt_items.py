@@ -0,0 +1,34 @@
+"""Copy receipt items from the products JSON into receipt_items and product_names.
+
+Usage: uv run python -m src.commands.backfill_receipt_items [--batch-size N]
+"""
+
+import argparse
+
+from sqlalchemy import create_engine, func, select
+
+from src.config import config
+from src.models import Receipt
+from src.services.receipt_items import backfill_receipt_items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Receipts per transaction")
+    args = parser.parse_args()
+
+    engine = create_engine(config.database_url)
+    with engine.connect() as connection:
+        max_receipt_id = connection.scalar(select(func.max(Receipt.id))) or 0
+        connection.commit()
+
+        for first_receipt_id in range(1, max_receipt_id + 1, args.batch_size):
+            last_receipt_id = min(first_receipt_id + args.batch_size - 1, max_receipt_id)
+            backfill_receipt_items(connection, first_receipt_id, last_receipt_id)
+            print(f"Backfilled receipts {first_receipt_id}-{last_receipt_id} of {max_receipt_id}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
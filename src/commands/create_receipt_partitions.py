@@ -0,0 +1,44 @@
+"""Create the monthly receipts partitions from the current month up to --months-ahead months ahead.
+
+Run it daily (e.g. from cron) so inserts never fall through to receipts_default. Receipts that already did are moved
+into the partition of their month when it is created.
+
+Usage: uv run python -m src.commands.create_receipt_partitions [--months-ahead N] [--from YYYY-MM]
+"""
+
+import argparse
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from src.config import config
+from src.services.partitions import add_months, current_month, ensure_receipt_partitions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--months-ahead", type=int, default=config.RECEIPT_PARTITION_MONTHS_AHEAD, help="Months after the current one"
+    )
+    parser.add_argument(
+        "--from",
+        dest="first_month",
+        type=lambda value: date.fromisoformat(f"{value}-01"),
+        default=None,
+        help="First month to create (YYYY-MM), for backfilling past months; defaults to the current month",
+    )
+    args = parser.parse_args()
+
+    first_month = args.first_month or current_month()
+    last_month = add_months(current_month(), args.months_ahead)
+
+    engine = create_engine(config.database_url)
+    with engine.connect() as connection:
+        created = ensure_receipt_partitions(connection, first_month, last_month)
+
+    print(f"Created {len(created)} partitions: {', '.join(created)}" if created else "All partitions exist")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from typing import Any
+import os
+from typing import Any, Literal
 
 from pydantic import PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -15,25 +16,86 @@ class Config(BaseSettings):
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = ""
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    # Connections older than this are replaced at checkout; -1 keeps them indefinitely.
+    DB_POOL_RECYCLE_SECONDS: int = -1
+    DB_POOL_PRE_PING: bool = True
+    # Server-side statement_timeout of every connection; 0 disables it.
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # Logs every statement; defaults to on in dev.
+    DB_ECHO: bool | None = None
+
+    # Read-only routes use the replica when its host or database is set; unset values fall back to the primary's.
+    POSTGRES_REPLICA_HOST: str = ""
+    POSTGRES_REPLICA_PORT: int | None = None
+    POSTGRES_REPLICA_DB: str = ""
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    READ_YOUR_WRITES_MAX_USERS: int = 100_000
+
     JWT_SECRET_KEY: str = ""
     JWT_ALGORITHM: str = ""
     JWT_ACCESS_TOKEN_EXPIRE_HOURS: int = 2
+    TOKEN_CACHE_SIZE: int = 10_000
+
+    # bcrypt work factor for new hashes; stored hashes of another cost are rehashed at the next successful login.
+    BCRYPT_ROUNDS: int = 12
+    # bcrypt runs in its own thread pool; calls beyond the running and queued ones are rejected with 503.
+    PASSWORD_HASH_CONCURRENCY: int = os.cpu_count() or 1
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+
+    IDEMPOTENCY_BACKEND: Literal["memory", "postgres"] = "memory"
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_MAX_KEYS: int = 10_000
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 60 * 60
+
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+    PUBLIC_RECEIPT_CACHE_SIZE: int = 4096
+    PRODUCT_NAME_CACHE_SIZE: int = 10_000
+
+    RECEIPT_PARTITION_MONTHS_AHEAD: int = 3
+
+    # Records per-route request metrics and serves them under /metrics; leave off where those routes would be reachable
+    # from outside.
+    METRICS_ENABLED: bool = False
+
+    # Adds a Server-Timing header with the auth, db and serialize phases to responses of the receipt and auth routes,
+    # which shows clients how long database work took; leave off where they should not see that.
+    TRACING_ENABLED: bool = False
+    # Logs statements slower than this to the src.slow_queries logger, with their route; 0 turns the log off.
+    SLOW_QUERY_LOG_MS: float = 0
 
     _database_url: str = ""
+    _replica_database_url: str | None = None
 
     def model_post_init(self, context: Any, /) -> None:
-        self._database_url = PostgresDsn.build(
+        self._database_url = self._build_database_url(self.POSTGRES_HOST, self.POSTGRES_PORT, self.POSTGRES_DB)
+        if self.POSTGRES_REPLICA_HOST or self.POSTGRES_REPLICA_DB:
+            self._replica_database_url = self._build_database_url(
+                self.POSTGRES_REPLICA_HOST or self.POSTGRES_HOST,
+                self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT,
+                self.POSTGRES_REPLICA_DB or self.POSTGRES_DB,
+            )
+
+    def _build_database_url(self, host: str, port: int, db: str) -> str:
+        return PostgresDsn.build(
             scheme="postgresql+psycopg",
             username=self.POSTGRES_USER,
             password=self.POSTGRES_PASSWORD,
-            host=self.POSTGRES_HOST,
-            port=self.POSTGRES_PORT,
-            path=self.POSTGRES_DB,
+            host=host,
+            port=port,
+            path=db,
         ).encoded_string()
 
     @property
     def database_url(self) -> str:
         return self._database_url
 
+    @property
+    def replica_database_url(self) -> str | None:
+        return self._replica_database_url
+
 
 config = Config()
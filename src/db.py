@@ -1,15 +1,101 @@
-from typing import AsyncGenerator
+import time
+from typing import Any, AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from .config import config
+from .schemas.metrics import PoolStats
+from .utils.cache import LRUCache
+from .utils.metrics import Histogram, instrument_engine
 
-engine = create_async_engine(
-    config.database_url, echo=config.ENVIRONMENT == "dev", pool_size=10, max_overflow=20, pool_pre_ping=True
-)
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """The default async pool, also timing each checkout and counting checkouts that timed out."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    connect_args = {}
+    if config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"
+
+    engine = create_async_engine(
+        url,
+        echo=config.ENVIRONMENT == "dev" if config.DB_ECHO is None else config.DB_ECHO,
+        poolclass=MeteredPool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def pool_stats(engine: AsyncEngine) -> PoolStats:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, MeteredPool):
+        raise TypeError(f"{engine} does not use a MeteredPool")
+
+    return PoolStats(
+        size=pool.size(),
+        max_overflow=config.DB_MAX_OVERFLOW,
+        checked_out=pool.checkedout(),
+        idle=pool.checkedin(),
+        # The pool counts overflow from -size, reaching 0 once all of its own connections are open.
+        overflow=max(pool.overflow(), 0),
+        timeouts=pool.timeouts,
+        checkout_wait=pool.checkout_wait.stats(),
+    )
+
+
+engine = create_engine(config.database_url)
 session = async_sessionmaker(bind=engine, expire_on_commit=False)
 
+replica_engine = create_engine(config.replica_database_url) if config.replica_database_url else None
+replica_session = async_sessionmaker(bind=replica_engine, expire_on_commit=False) if replica_engine else session
+
+# Users who wrote within the last READ_YOUR_WRITES_SECONDS. Their reads stay on the primary until the replica has had
+# time to catch up. The window is per process, so with several workers it only covers requests to the same one.
+recent_writers: LRUCache[int, bool] = LRUCache(config.READ_YOUR_WRITES_MAX_USERS, ttl=config.READ_YOUR_WRITES_SECONDS)
+
+
+def record_write(user_id: int) -> None:
+    recent_writers.set(user_id, True)
+
+
+def read_session(user_id: int) -> async_sessionmaker[AsyncSession]:
+    return session if recent_writers.get(user_id) else replica_session
+
+
+def is_replica(db: AsyncSession) -> bool:
+    """Whether db reads from somewhere else than the primary, so a row missing from it may just not be there yet."""
+    return db.get_bind() is not engine.sync_engine
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with session() as db:
         yield db
+
+
+async def get_replica_db() -> AsyncGenerator[AsyncSession, None]:
+    async with replica_session() as db:
+        yield db
@@ -1,26 +1,54 @@
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.db import get_db
-from src.models import User
-from src.schemas.auth import TokenData
+from src.db import get_db, read_session
+from src.schemas.auth import Principal, TokenData
+from src.services.principals import load_principal
 from src.utils.auth import get_data_from_token
+from src.utils.metrics import timed_phase
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
 async def get_token_data(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
-    return get_data_from_token(token)
+    with timed_phase("auth"):
+        return get_data_from_token(token)
+
+
+async def get_read_db(token_data: Annotated[TokenData, Depends(get_token_data)]) -> AsyncGenerator[AsyncSession, None]:
+    """A session for read-only routes: on the replica, or on the primary right after the user wrote something."""
+    async with read_session(token_data.user_id)() as db:
+        yield db
+
+
+async def _load_user(db: AsyncSession, token_data: TokenData) -> Principal:
+    with timed_phase("auth"):
+        principal = await load_principal(db, token_data.user_id)
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return principal
 
 
 async def get_current_user(
     db: Annotated[AsyncSession, Depends(get_db)], token_data: Annotated[TokenData, Depends(get_token_data)]
-) -> User:
-    user = await db.get(User, token_data.user_id)
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+) -> Principal:
+    return await _load_user(db, token_data)
+
+
+async def get_current_reader(
+    db: Annotated[AsyncSession, Depends(get_read_db)], token_data: Annotated[TokenData, Depends(get_token_data)]
+) -> Principal:
+    """The current user, loaded through the same read session as the rest of a read-only route."""
+    return await _load_user(db, token_data)
+
+
+async def get_current_user_id(token_data: Annotated[TokenData, Depends(get_token_data)]) -> int:
+    """The user id from a valid token, without checking that the user still exists.
+
+    For read-only routes scoped by user id, where a deleted user simply has nothing to read.
+    """
+    return token_data.user_id
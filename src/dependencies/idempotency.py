@@ -0,0 +1,5 @@
+from src.services.idempotency import IdempotencyStore, idempotency_store
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    return idempotency_store
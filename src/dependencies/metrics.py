@@ -0,0 +1,8 @@
+from fastapi import HTTPException, status
+
+from src.config import config
+
+
+def require_metrics_enabled() -> None:
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 
+from src.middleware.metrics import MetricsMiddleware
 from src.routes.auth import router as auth_router
+from src.routes.metrics import router as metrics_router
 from src.routes.receipts import router as receipts_router
 
 app = FastAPI(root_path="/api", redirect_slashes=False)
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth_router)
 app.include_router(receipts_router)
+app.include_router(metrics_router)
@@ -0,0 +1,40 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import config
+from src.services.metrics import UNMATCHED_ROUTE, record_request
+from src.utils.metrics import RequestStats, request_stats
+
+
+class MetricsMiddleware:
+    """Records each HTTP request's route, response status, latency, and SQL statements and time, when metrics are
+    enabled. A plain ASGI middleware, so that streamed responses are timed until their last chunk is sent."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = request_stats.set(stats)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            request_stats.reset(token)
+            # The router adds the matched route to the scope.
+            route = scope.get("route")
+            record_request(scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status_code, duration, stats)
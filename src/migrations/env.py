@@ -1,9 +1,11 @@
+from collections.abc import Mapping
 from logging.config import fileConfig
 
 from alembic import context
 from sqlalchemy import create_engine
 
 from src.config import config as app_config
+from src.services.partitions import is_receipt_partition
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -22,6 +24,17 @@ from src.models import *  # noqa: F401, F403, E402
 
 target_metadata = Base.metadata  # noqa: F405
 
+
+def include_name(name: str | None, type_: str, parent_names: Mapping) -> bool:
+    # Receipt partitions are managed by src.services.partitions, not by the models.
+    return not (type_ == "table" and name is not None and is_receipt_partition(name))
+
+
+def include_object(object, name: str | None, type_: str, reflected: bool, compare_to) -> bool:
+    # Postgres clones a foreign key to a partitioned table for each of its partitions.
+    return not (type_ == "foreign_key_constraint" and is_receipt_partition(object.referred_table.name))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -61,7 +74,12 @@ def run_migrations_online() -> None:
     connectable = create_engine(app_config.database_url)
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,143 @@
+"""partition receipts by month
+
+Revision ID: 189d850656e9
+Revises: 88d5d97ae53c
+Create Date: 2026-10-17 11:04:27.512906
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "189d850656e9"
+down_revision: Union[str, Sequence[str], None] = "88d5d97ae53c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECEIPT_CONSTRAINTS = [
+    "receipts_pkey",
+    "ix_receipts_user_id_created_at_id",
+    "ix_receipts_user_id_total_minor",
+    "ix_receipts_user_id_payment_type_created_at",
+]
+RECEIPT_COLUMNS = "id, user_id, products, total_minor, payment_type, payment_minor, created_at"
+
+# Months from the oldest receipt through three months ahead; src.commands.create_receipt_partitions keeps adding
+# partitions after that.
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', coalesce((SELECT min(created_at) FROM receipts_legacy), now()) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF receipts FOR VALUES FROM (%L) TO (%L)',
+            'receipts_' || to_char(month, 'YYYY_MM'),
+            month || ' 00:00:00+00',
+            (month + interval '1 month')::date || ' 00:00:00+00'
+        );
+    END LOOP;
+END $$
+"""
+
+
+def rename_receipts(old_suffix: str, new_suffix: str) -> None:
+    op.rename_table(f"receipts{old_suffix}", f"receipts{new_suffix}")
+    for name in RECEIPT_CONSTRAINTS:
+        op.execute(f"ALTER INDEX {name}{old_suffix} RENAME TO {name}{new_suffix}")
+
+
+def create_receipts(primary_key: sa.PrimaryKeyConstraint, **kwargs) -> None:
+    op.create_table(
+        "receipts",
+        sa.Column("id", sa.Integer(), sa.Identity(always=True), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("products", sa.JSON(), nullable=False),
+        sa.Column("total_minor", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "payment_type", postgresql.ENUM("cash", "card", name="payment_types", create_type=False), nullable=False
+        ),
+        sa.Column("payment_minor", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="receipts_user_id_fkey", ondelete="CASCADE"),
+        primary_key,
+        **kwargs,
+    )
+    op.create_index(
+        "ix_receipts_user_id_created_at_id",
+        "receipts",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_include=["total_minor", "payment_type"],
+    )
+    op.create_index("ix_receipts_user_id_total_minor", "receipts", ["user_id", "total_minor"])
+    op.create_index(
+        "ix_receipts_user_id_payment_type_created_at",
+        "receipts",
+        ["user_id", "payment_type", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def copy_receipts(source: str) -> None:
+    op.execute(
+        f"INSERT INTO receipts ({RECEIPT_COLUMNS}) OVERRIDING SYSTEM VALUE SELECT {RECEIPT_COLUMNS} FROM {source}"  # noqa: S608
+    )
+    op.execute("SELECT setval(pg_get_serial_sequence('receipts', 'id'), coalesce(max(id), 0) + 1, false) FROM receipts")
+    op.drop_table(source)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint("receipt_items_receipt_id_fkey", "receipt_items", type_="foreignkey")
+    rename_receipts("", "_legacy")
+
+    # The partition key has to be part of the primary key, so items reference receipts by (id, created_at).
+    op.add_column("receipt_items", sa.Column("receipt_created_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE receipt_items SET receipt_created_at = r.created_at "
+        "FROM receipts_legacy r WHERE r.id = receipt_items.receipt_id"
+    )
+    op.alter_column("receipt_items", "receipt_created_at", nullable=False)
+
+    create_receipts(
+        sa.PrimaryKeyConstraint("id", "created_at", name="receipts_pkey"), postgresql_partition_by="RANGE (created_at)"
+    )
+    op.execute("CREATE TABLE receipts_default PARTITION OF receipts DEFAULT")
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    copy_receipts("receipts_legacy")
+
+    op.create_foreign_key(
+        "receipt_items_receipt_id_receipt_created_at_fkey",
+        "receipt_items",
+        "receipts",
+        ["receipt_id", "receipt_created_at"],
+        ["id", "created_at"],
+        ondelete="CASCADE",
+    )
+    op.execute("ANALYZE receipts")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("receipt_items_receipt_id_receipt_created_at_fkey", "receipt_items", type_="foreignkey")
+    rename_receipts("", "_partitioned")
+
+    create_receipts(sa.PrimaryKeyConstraint("id", name="receipts_pkey"))
+    # Dropping the partitioned table drops all of its partitions.
+    copy_receipts("receipts_partitioned")
+
+    op.drop_column("receipt_items", "receipt_created_at")
+    op.create_foreign_key(
+        "receipt_items_receipt_id_fkey", "receipt_items", "receipts", ["receipt_id"], ["id"], ondelete="CASCADE"
+    )
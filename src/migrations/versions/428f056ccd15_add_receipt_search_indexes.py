@@ -0,0 +1,43 @@
+"""add receipt search indexes
+
+Revision ID: 428f056ccd15
+Revises: 6068653987bd
+Create Date: 2026-10-17 10:12:44.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "428f056ccd15"
+down_revision: Union[str, Sequence[str], None] = "6068653987bd"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_receipts_user_id_created_at_id",
+        "receipts",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_include=["total_cost", "payment_type"],
+    )
+    op.create_index("ix_receipts_user_id_total_cost", "receipts", ["user_id", "total_cost"], unique=False)
+    op.create_index(
+        "ix_receipts_user_id_payment_type_created_at",
+        "receipts",
+        ["user_id", "payment_type", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_receipts_user_id_payment_type_created_at", table_name="receipts")
+    op.drop_index("ix_receipts_user_id_total_cost", table_name="receipts")
+    op.drop_index("ix_receipts_user_id_created_at_id", table_name="receipts")
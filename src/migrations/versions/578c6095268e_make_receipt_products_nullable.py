@@ -0,0 +1,46 @@
+"""make receipt products nullable
+
+Revision ID: 578c6095268e
+Revises: 4c6b8b03d62f
+Create Date: 2026-10-17 06:15:48.668693
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "578c6095268e"
+down_revision: Union[str, Sequence[str], None] = "4c6b8b03d62f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The products JSON of receipts written after this revision, rebuilt from their receipt_items.
+RESTORE_PRODUCTS = """
+UPDATE receipts r
+SET products = json_build_object('items', (
+    SELECT json_agg(json_build_object(
+        'name', n.name,
+        'price', CAST(round(ri.price_minor / 100.0, ri.price_places) AS text),
+        'quantity', CAST(ri.quantity AS text),
+        'total', CAST(round(ri.total_minor / 100.0, ri.total_places) AS text)
+    ) ORDER BY ri.position)
+    FROM receipt_items ri JOIN product_names n ON n.id = ri.product_name_id
+    WHERE ri.receipt_id = r.id AND ri.receipt_created_at = r.created_at
+))
+WHERE r.products IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column("receipts", "products", existing_type=postgresql.JSON(astext_type=sa.Text()), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(RESTORE_PRODUCTS)
+    op.alter_column("receipts", "products", existing_type=postgresql.JSON(astext_type=sa.Text()), nullable=False)
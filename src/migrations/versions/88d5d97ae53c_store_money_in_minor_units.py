@@ -0,0 +1,58 @@
+"""store money in minor units
+
+Revision ID: 88d5d97ae53c
+Revises: 0873d1eac3c2
+Create Date: 2026-10-17 09:12:40.318275
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "88d5d97ae53c"
+down_revision: Union[str, Sequence[str], None] = "0873d1eac3c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, old column, old type, new column)
+MONEY_COLUMNS = [
+    ("receipts", "total_cost", sa.Numeric(8, 2), "total_minor"),
+    ("receipts", "payment_amount", sa.Numeric(8, 2), "payment_minor"),
+    ("receipt_items", "price", sa.Numeric(), "price_minor"),
+    ("receipt_items", "total", sa.Numeric(), "total_minor"),
+    ("receipt_daily_stats", "total_cost", sa.Numeric(14, 2), "total_minor"),
+    ("receipt_daily_stats", "payment_amount", sa.Numeric(14, 2), "payment_minor"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, old_column, old_type, new_column in MONEY_COLUMNS:
+        op.alter_column(
+            table,
+            old_column,
+            new_column_name=new_column,
+            type_=sa.BigInteger(),
+            existing_type=old_type,
+            existing_nullable=False,
+            postgresql_using=f"round({old_column} * 100)::bigint",
+        )
+    op.execute("ALTER INDEX ix_receipts_user_id_total_cost RENAME TO ix_receipts_user_id_total_minor")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER INDEX ix_receipts_user_id_total_minor RENAME TO ix_receipts_user_id_total_cost")
+    for table, old_column, old_type, new_column in MONEY_COLUMNS:
+        op.alter_column(
+            table,
+            new_column,
+            new_column_name=old_column,
+            type_=old_type,
+            existing_type=sa.BigInteger(),
+            existing_nullable=False,
+            postgresql_using=f"{new_column} / 100.0",
+        )
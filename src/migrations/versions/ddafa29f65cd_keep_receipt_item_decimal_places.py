@@ -0,0 +1,48 @@
+"""keep receipt item decimal places
+
+Revision ID: ddafa29f65cd
+Revises: 189d850656e9
+Create Date: 2026-10-17 18:40:12.514903
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ddafa29f65cd"
+down_revision: Union[str, Sequence[str], None] = "189d850656e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The places each amount was written with in the products JSON, or two where it had to be rounded to the cent.
+BACKFILL_PLACES = """
+UPDATE receipt_items ri
+SET price_places = CASE WHEN round(v.price, 2) = v.price THEN scale(v.price) ELSE 2 END,
+    total_places = CASE WHEN round(v.total, 2) = v.total THEN scale(v.total) ELSE 2 END
+FROM receipts r
+CROSS JOIN LATERAL json_array_elements(r.products -> 'items') WITH ORDINALITY AS i(item, position)
+CROSS JOIN LATERAL (
+    SELECT CAST(i.item ->> 'price' AS numeric) AS price, CAST(i.item ->> 'total' AS numeric) AS total
+) v
+WHERE r.id = ri.receipt_id AND r.created_at = ri.receipt_created_at AND i.position - 1 = ri.position
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "receipt_items", sa.Column("price_places", sa.SmallInteger(), server_default=sa.text("2"), nullable=False)
+    )
+    op.add_column(
+        "receipt_items", sa.Column("total_places", sa.SmallInteger(), server_default=sa.text("2"), nullable=False)
+    )
+    op.execute(BACKFILL_PLACES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("receipt_items", "total_places")
+    op.drop_column("receipt_items", "price_places")
@@ -1,8 +1,27 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import StrEnum
 
-from sqlalchemy import JSON, DateTime, Enum, ForeignKey, Identity, Numeric, String, UniqueConstraint, text
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    Date,
+    DateTime,
+    Enum,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Identity,
+    Index,
+    Numeric,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+    desc,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -38,31 +57,167 @@ class User(Base):
 
 class Receipt(Base):
     __tablename__ = "receipts"
+    __table_args__ = (
+        Index(
+            "ix_receipts_user_id_created_at_id",
+            "user_id",
+            desc("created_at"),
+            desc("id"),
+            postgresql_include=["total_minor", "payment_type"],
+        ),
+        Index("ix_receipts_user_id_total_minor", "user_id", "total_minor"),
+        Index("ix_receipts_user_id_payment_type_created_at", "user_id", "payment_type", desc("created_at"), desc("id")),
+        # Monthly partitions are created by src.services.partitions; receipts_default catches anything outside them.
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[int] = mapped_column(Identity(always=True), primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
-    products: Mapped[dict] = mapped_column(JSON)
-    total_cost: Mapped[Decimal] = mapped_column(Numeric(8, 2))
+    # Items of receipts written before receipt_items existed; new receipts only have rows there. Dropped once
+    # backfill_receipt_items has copied every receipt (see src.commands.backfill_receipt_items).
+    products: Mapped[dict | None] = mapped_column(JSON)
+    total_minor: Mapped[int] = mapped_column(BigInteger)
     payment_type: Mapped[PaymentType] = mapped_column(PaymentTypeEnum)
-    payment_amount: Mapped[Decimal] = mapped_column(Numeric(8, 2))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("CURRENT_TIMESTAMP"))
+    payment_minor: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("CURRENT_TIMESTAMP"), primary_key=True
+    )
 
     user: Mapped["User"] = relationship(back_populates="receipts", cascade="all")
 
     def __init__(
         self,
         user_id: int,
-        products: dict,
-        total_cost: Decimal,
+        total_minor: int,
         payment_type: PaymentType,
-        payment_amount: Decimal,
+        payment_minor: int,
         created_at: datetime | None = None,
+        products: dict | None = None,
     ) -> None:
         super().__init__()
         self.user_id = user_id
         self.products = products
-        self.total_cost = total_cost
+        self.total_minor = total_minor
         self.payment_type = payment_type
-        self.payment_amount = payment_amount
+        self.payment_minor = payment_minor
         if created_at:
             self.created_at = created_at
+
+
+event.listen(Receipt.__table__, "after_create", DDL("CREATE TABLE receipts_default PARTITION OF receipts DEFAULT"))
+
+
+class ProductName(Base):
+    __tablename__ = "product_names"
+    __table_args__ = (
+        Index(
+            "ix_product_names_lower_name",
+            func.lower(text("name")).label("lower_name"),
+            postgresql_ops={"lower_name": "text_pattern_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Identity(always=True), primary_key=True)
+    name: Mapped[str] = mapped_column(String, unique=True)
+
+    def __init__(self, name: str) -> None:
+        super().__init__()
+        self.name = name
+
+
+class ReceiptItem(Base):
+    __tablename__ = "receipt_items"
+    __table_args__ = (
+        # The partitioned receipts table is only unique on (id, created_at).
+        ForeignKeyConstraint(
+            ["receipt_id", "receipt_created_at"], ["receipts.id", "receipts.created_at"], ondelete="CASCADE"
+        ),
+        Index("ix_receipt_items_product_name_id_receipt_id", "product_name_id", "receipt_id"),
+    )
+
+    receipt_id: Mapped[int] = mapped_column(primary_key=True)
+    position: Mapped[int] = mapped_column(primary_key=True)
+    receipt_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    product_name_id: Mapped[int] = mapped_column(ForeignKey("product_names.id"))
+    price_minor: Mapped[int] = mapped_column(BigInteger)
+    quantity: Mapped[Decimal] = mapped_column(Numeric)
+    total_minor: Mapped[int] = mapped_column(BigInteger)
+    # Decimal places the price and total are written with in responses (see src.utils.money.minor_places).
+    price_places: Mapped[int] = mapped_column(SmallInteger, server_default=text("2"))
+    total_places: Mapped[int] = mapped_column(SmallInteger, server_default=text("2"))
+
+    product_name: Mapped["ProductName"] = relationship()
+
+    def __init__(
+        self,
+        receipt_id: int,
+        receipt_created_at: datetime,
+        position: int,
+        product_name_id: int,
+        price_minor: int,
+        quantity: Decimal,
+        total_minor: int,
+        price_places: int = 2,
+        total_places: int = 2,
+    ) -> None:
+        super().__init__()
+        self.receipt_id = receipt_id
+        self.receipt_created_at = receipt_created_at
+        self.position = position
+        self.product_name_id = product_name_id
+        self.price_minor = price_minor
+        self.quantity = quantity
+        self.total_minor = total_minor
+        self.price_places = price_places
+        self.total_places = total_places
+
+
+class ReceiptDailyStats(Base):
+    __tablename__ = "receipt_daily_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    payment_type: Mapped[PaymentType] = mapped_column(PaymentTypeEnum, primary_key=True)
+    receipt_count: Mapped[int]
+    total_minor: Mapped[int] = mapped_column(BigInteger)
+    payment_minor: Mapped[int] = mapped_column(BigInteger)
+
+    def __init__(
+        self,
+        user_id: int,
+        day: date,
+        payment_type: PaymentType,
+        receipt_count: int,
+        total_minor: int,
+        payment_minor: int,
+    ) -> None:
+        super().__init__()
+        self.user_id = user_id
+        self.day = day
+        self.payment_type = payment_type
+        self.receipt_count = receipt_count
+        self.total_minor = total_minor
+        self.payment_minor = payment_minor
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_user_id_last_used_at", "user_id", "last_used_at"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    response: Mapped[dict] = mapped_column(JSON)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("CURRENT_TIMESTAMP"))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    def __init__(self, user_id: int, key: str, fingerprint: str, response: dict, expires_at: datetime) -> None:
+        super().__init__()
+        self.user_id = user_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.response = response
+        self.expires_at = expires_at
@@ -1,31 +1,32 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db import get_db
-from src.dependencies.auth import get_current_user
-from src.models import User
-from src.schemas.auth import TokenResponse, UserInfo, UserRegisterData
+from src.dependencies.auth import get_current_reader
+from src.schemas.auth import Principal, TokenResponse, UserInfo, UserRegisterData
 from src.services.auth import login_user, register_user
+from src.utils.responses import FastJSONResponse
+from src.utils.tracing import TracedRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TracedRoute)
 
 
-@router.post("/register", status_code=201)
-async def register(db: Annotated[AsyncSession, Depends(get_db)], user_data: UserRegisterData) -> dict[str, str]:
+@router.post("/register", status_code=201, response_model=dict[str, str])
+async def register(db: Annotated[AsyncSession, Depends(get_db)], user_data: UserRegisterData) -> Response:
     await register_user(db, user_data)
-    return {"message": "Successfully registered"}
+    return FastJSONResponse({"message": "Successfully registered"}, status_code=status.HTTP_201_CREATED)
 
 
-@router.post("/token")
+@router.post("/token", response_model=TokenResponse)
 async def login(
     db: Annotated[AsyncSession, Depends(get_db)], form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
-) -> TokenResponse:
-    return await login_user(db, form_data.username, form_data.password)
+) -> Response:
+    return FastJSONResponse(await login_user(db, form_data.username, form_data.password))
 
 
-@router.get("/me")
-async def get_current_user_info(current_user: Annotated[User, Depends(get_current_user)]) -> UserInfo:
-    return UserInfo(name=current_user.name, email=current_user.email)
+@router.get("/me", response_model=UserInfo)
+async def get_current_user_info(current_user: Annotated[Principal, Depends(get_current_reader)]) -> Response:
+    return FastJSONResponse(UserInfo(name=current_user.name, email=current_user.email))
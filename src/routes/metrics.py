@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from src.db import engine, pool_stats, replica_engine
+from src.dependencies.metrics import require_metrics_enabled
+from src.schemas.metrics import PoolStatsResponse
+from src.services.metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(require_metrics_enabled)])
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Route and connection pool metrics in the Prometheus text format."""
+    pools = {"primary": pool_stats(engine)}
+    if replica_engine is not None:
+        pools["replica"] = pool_stats(replica_engine)
+    return PlainTextResponse(render_prometheus(pools), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/pool")
+async def get_pool_stats() -> PoolStatsResponse:
+    return PoolStatsResponse(
+        primary=pool_stats(engine), replica=pool_stats(replica_engine) if replica_engine is not None else None
+    )
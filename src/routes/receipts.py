@@ -1,202 +1,326 @@
-from decimal import Decimal
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import PlainTextResponse
-from sqlalchemy import and_, func, select
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import SkipValidation, TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db import get_db
-from src.dependencies.auth import get_current_user
-from src.models import Receipt, User
+from src.db import get_db, get_replica_db, is_replica, record_write
+from src.dependencies.auth import get_current_user, get_current_user_id, get_read_db
+from src.dependencies.idempotency import get_idempotency_store
+from src.schemas.auth import Principal
 from src.schemas.receipts import (
-    PaymentInfo,
-    ProductResponse,
+    CountMode,
+    ExportFormat,
+    ReceiptBulkCreateResponse,
+    ReceiptBulkCreateResult,
     ReceiptCreateRequest,
+    ReceiptExportParams,
     ReceiptFilters,
-    ReceiptListItem,
     ReceiptListResponse,
+    ReceiptRenderBatchRequest,
     ReceiptResponse,
+    ReceiptStatsBucket,
+    ReceiptStatsParams,
+    ReceiptStatsResponse,
+    RenderFormat,
 )
+from src.services import receipts as receipts_service
+from src.services.export import stream_receipts_export
+from src.services.idempotency import IdempotencyStore, request_fingerprint
+from src.services.receipt_items import load_receipt_products, load_receipts_with_products
+from src.services.receipts import (
+    build_receipt_query,
+    build_receipt_response,
+    build_receipt_response_content,
+    build_receipt_values,
+    build_receipts_query,
+    build_search_page_query,
+    calculate_totals,
+    estimate_count,
+    insert_receipts,
+    paginate_receipts_query,
+    project_receipt_list_query,
+)
+from src.services.rendering import (
+    PUBLIC_RECEIPT_CACHE_CONTROL,
+    RENDERERS,
+    etag_matches,
+    matches_any_etag,
+    public_receipt_etag,
+    render_cache,
+    render_document,
+    render_receipt,
+    render_receipts,
+)
+from src.services.stats import build_stats_query
+from src.utils.money import format_minor, from_minor, to_minor
+from src.utils.pagination import decode_cursor, encode_cursor
+from src.utils.responses import FastJSONResponse
+from src.utils.tracing import TracedRoute
+
+router = APIRouter(prefix="/receipts", tags=["Receipts"], route_class=TracedRoute)
+
+EXPORT_MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+# Bulk receipts are validated one by one, so that a malformed receipt is rejected alone rather than the whole batch.
+# The body skips validation of its items but keeps their type, so the OpenAPI schema still describes them.
+receipt_create_adapter = TypeAdapter(ReceiptCreateRequest)
+UnvalidatedReceiptCreateRequest = Annotated[ReceiptCreateRequest, SkipValidation]
 
-router = APIRouter(prefix="/receipts", tags=["Receipts"])
 
+def _validation_error(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'receipt'}: {error['msg']}" for error in exc.errors())
 
-@router.post("/create", status_code=201)
+
+@router.post("/create", status_code=201, response_model=ReceiptResponse)
 async def create_receipt(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    idempotency_store: Annotated[IdempotencyStore, Depends(get_idempotency_store)],
     receipt_data: ReceiptCreateRequest,
-) -> ReceiptResponse:
-    products_with_totals = []
-    total_cost = Decimal("0")
-
-    for product in receipt_data.products:
-        product_total = product.price * product.quantity
-        products_with_totals.append(
-            ProductResponse(name=product.name, price=product.price, quantity=product.quantity, total=product_total)
-        )
-        total_cost += product_total
-
-    rest = receipt_data.payment.amount - total_cost
-    if rest < 0:
-        raise HTTPException(status_code=400, detail="Insufficient payment amount")
-
-    receipt = Receipt(
-        user_id=current_user.id,
-        products={
-            "items": [
-                {"name": p.name, "price": str(p.price), "quantity": str(p.quantity), "total": str(p.total)}
-                for p in products_with_totals
-            ]
-        },
-        total_cost=total_cost,
-        payment_type=receipt_data.payment.type,
-        payment_amount=receipt_data.payment.amount,
-    )
-
-    db.add(receipt)
-    await db.commit()
-    await db.refresh(receipt)
-
-    return ReceiptResponse(
-        id=receipt.id,
-        products=products_with_totals,
-        payment=receipt_data.payment,
-        total=total_cost,
-        rest=rest,
-        created_at=receipt.created_at,
+    idempotency_key: Annotated[str | None, Header(min_length=1, max_length=255)] = None,
+) -> Response:
+    if idempotency_key is None:
+        receipt = await receipts_service.create_receipt(db, current_user.id, receipt_data)
+        await db.commit()
+        record_write(current_user.id)
+        return FastJSONResponse(receipt, status_code=status.HTTP_201_CREATED)
+
+    fingerprint = request_fingerprint(receipt_data)
+    async with idempotency_store.reserve(db, current_user.id, idempotency_key, fingerprint) as reservation:
+        if reservation.response is not None:
+            # Commits the refresh of the key's last use, which keeps it from being evicted as least recently used.
+            await db.commit()
+            return FastJSONResponse(
+                reservation.response, status_code=status.HTTP_201_CREATED, headers={"Idempotent-Replayed": "true"}
+            )
+
+        receipt = await receipts_service.create_receipt(db, current_user.id, receipt_data)
+        await idempotency_store.save(db, reservation, receipt.model_dump(mode="json"))
+        await db.commit()
+        record_write(current_user.id)
+        return FastJSONResponse(receipt, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/bulk-create", response_model=ReceiptBulkCreateResponse)
+async def bulk_create_receipts(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    receipts_data: Annotated[list[UnvalidatedReceiptCreateRequest], Body(min_length=1, max_length=1000)],
+) -> Response:
+    results = {}
+    accepted = []
+
+    for index, data in enumerate(receipts_data):
+        try:
+            receipt_data = receipt_create_adapter.validate_python(data)
+        except ValidationError as exc:
+            results[index] = ReceiptBulkCreateResult(index=index, success=False, error=_validation_error(exc))
+            continue
+
+        lines, total_minor = calculate_totals(receipt_data.products)
+        if to_minor(receipt_data.payment.amount) < total_minor:
+            results[index] = ReceiptBulkCreateResult(index=index, success=False, error="Insufficient payment amount")
+        else:
+            accepted.append((index, receipt_data, lines, total_minor))
+
+    if accepted:
+        values = [
+            build_receipt_values(current_user.id, receipt_data, total_minor)
+            for _, receipt_data, _, total_minor in accepted
+        ]
+        rows = await insert_receipts(db, values, [lines for _, _, lines, _ in accepted])
+        await db.commit()
+        record_write(current_user.id)
+
+        for (index, receipt_data, lines, total_minor), row in zip(accepted, rows, strict=True):
+            receipt = build_receipt_response(row, receipt_data.payment, lines, total_minor)
+            results[index] = ReceiptBulkCreateResult(index=index, success=True, receipt=receipt)
+
+    return FastJSONResponse(
+        ReceiptBulkCreateResponse(results=[results[i] for i in sorted(results)], created_count=len(accepted))
     )
 
 
-@router.post("/search")
+@router.post("/search", response_model=ReceiptListResponse)
 async def list_receipts(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    user_id: Annotated[int, Depends(get_current_user_id)],
     page: Annotated[int, Query(ge=1)] = 1,
     per_page: Annotated[int, Query(ge=1, le=100)] = 10,
+    cursor: Annotated[str | None, Query()] = None,
+    count_mode: Annotated[CountMode, Query()] = CountMode.EXACT,
     filters: ReceiptFilters | None = None,
-) -> ReceiptListResponse:
-    query = select(Receipt).where(Receipt.user_id == current_user.id).order_by(Receipt.created_at.desc())
-
-    if filters:
-        filter_conditions = []
-        if filters.date_from:
-            filter_conditions.append(Receipt.created_at >= filters.date_from)
-        if filters.date_to:
-            filter_conditions.append(Receipt.created_at <= filters.date_to)
-        if filters.min_total is not None:
-            filter_conditions.append(Receipt.total_cost >= filters.min_total)
-        if filters.max_total is not None:
-            filter_conditions.append(Receipt.total_cost <= filters.max_total)
-        if filters.payment_type:
-            filter_conditions.append(Receipt.payment_type == filters.payment_type)
-
-        if filter_conditions:
-            query = query.where(and_(*filter_conditions))
-
-    count_result = await db.scalar(query.with_only_columns(func.count(Receipt.id.distinct())).order_by(None))
-    total_count = count_result or 0
-    total_pages = (total_count + per_page - 1) // per_page
-    current_page = min(page, total_pages)
-
-    offset = max((current_page - 1), 0) * per_page
-    receipts = await db.scalars(query.offset(offset).limit(per_page))
-    receipts_list = list(receipts)
+) -> Response:
+    query = build_receipts_query(user_id, filters)
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    if count_mode == CountMode.EXACT:
+        rows = (await db.execute(build_search_page_query(query, per_page, page, after))).all()
+        total_count = rows[0].total_count
+        if rows[0].id is None:
+            rows = []
+        current_page = None if after is not None else min(page, (total_count + per_page - 1) // per_page)
+    else:
+        total_count = await estimate_count(db, query) if count_mode == CountMode.ESTIMATE else None
+        current_page = None if after is not None else page
+        offset = (page - 1) * per_page
+        rows = (
+            await db.execute(paginate_receipts_query(project_receipt_list_query(query), per_page + 1, offset, after))
+        ).all()
+
+    has_more = len(rows) > per_page
+    next_cursor = None
+    if has_more:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
 
     receipt_items = [
-        ReceiptListItem(
-            id=receipt.id, total=receipt.total_cost, payment_type=receipt.payment_type, created_at=receipt.created_at
-        )
-        for receipt in receipts_list
+        {
+            "id": row.id,
+            "total": format_minor(row.total_minor),
+            "payment_type": row.payment_type,
+            "created_at": row.created_at,
+        }
+        for row in rows
     ]
 
-    return ReceiptListResponse(receipts=receipt_items, total_count=total_count, page=current_page, per_page=per_page)
+    return FastJSONResponse(
+        {
+            "receipts": receipt_items,
+            "total_count": total_count,
+            "count_mode": count_mode,
+            "has_more": has_more,
+            "page": current_page,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }
+    )
 
 
-@router.get("/{receipt_id}")
-async def get_receipt(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
-    receipt_id: int,
-) -> ReceiptResponse:
-    query = select(Receipt).where(Receipt.id == receipt_id, Receipt.user_id == current_user.id)
-    receipt = await db.scalar(query)
+@router.get("/export", response_class=StreamingResponse)
+async def export_receipts(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    user_id: Annotated[int, Depends(get_current_user_id)],
+    params: Annotated[ReceiptExportParams, Query()],
+) -> StreamingResponse:
+    query = build_receipts_query(user_id, params)
 
-    if not receipt:
-        raise HTTPException(status_code=404, detail="Receipt not found")
+    return StreamingResponse(
+        stream_receipts_export(db, query, params.format),
+        media_type=EXPORT_MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="receipts.{params.format}"'},
+    )
 
-    products = [
-        ProductResponse(
-            name=item["name"],
-            price=Decimal(item["price"]),
-            quantity=Decimal(item["quantity"]),
-            total=Decimal(item["total"]),
+
+@router.get("/stats")
+async def get_receipt_stats(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    user_id: Annotated[int, Depends(get_current_user_id)],
+    params: Annotated[ReceiptStatsParams, Query()],
+) -> ReceiptStatsResponse:
+    result = await db.execute(build_stats_query(user_id, params))
+    buckets = [
+        ReceiptStatsBucket(
+            period=row.period,
+            receipt_count=row.receipt_count,
+            total=from_minor(row.total_minor),
+            cash_count=row.cash_count,
+            cash_total=from_minor(row.cash_total_minor),
+            card_count=row.card_count,
+            card_total=from_minor(row.card_total_minor),
         )
-        for item in receipt.products["items"]
+        for row in result
     ]
 
-    rest = receipt.payment_amount - receipt.total_cost
-
-    return ReceiptResponse(
-        id=receipt.id,
-        products=products,
-        payment=PaymentInfo(type=receipt.payment_type, amount=receipt.payment_amount),
-        total=receipt.total_cost,
-        rest=rest,
-        created_at=receipt.created_at,
-    )
+    return ReceiptStatsResponse(granularity=params.granularity, buckets=buckets)
 
 
-@router.get("/{receipt_id}/public", response_class=PlainTextResponse)
-async def get_public_receipt(
-    db: Annotated[AsyncSession, Depends(get_db)], receipt_id: int, line_width: Annotated[int, Query(ge=20, le=80)] = 32
-) -> str:
-    query = select(Receipt).where(Receipt.id == receipt_id)
-    receipt = await db.scalar(query)
+@router.post(
+    "/public/render-batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/plain": {}, "text/html": {}, "application/octet-stream": {}}}},
+)
+async def render_public_receipts(
+    db: Annotated[AsyncSession, Depends(get_replica_db)],
+    primary_db: Annotated[AsyncSession, Depends(get_db)],
+    params: ReceiptRenderBatchRequest,
+) -> StreamingResponse:
+    cached = {}
+    for receipt_id in params.receipt_ids:
+        body = render_cache.get((receipt_id, params.line_width, params.format))
+        if body is not None:
+            cached[receipt_id] = body
+
+    receipts = {}
+    missing_ids = [receipt_id for receipt_id in dict.fromkeys(params.receipt_ids) if receipt_id not in cached]
+    if missing_ids:
+        receipts = await load_receipts_with_products(db, missing_ids)
+        not_found = [receipt_id for receipt_id in missing_ids if receipt_id not in receipts]
+        if not_found and is_replica(db):
+            # Receipts just created may not have reached the replica yet.
+            receipts |= await load_receipts_with_products(primary_db, not_found)
+            not_found = [receipt_id for receipt_id in not_found if receipt_id not in receipts]
+        if not_found:
+            raise HTTPException(status_code=404, detail=f"Receipts not found: {', '.join(map(str, not_found))}")
+
+    bodies = render_receipts(params.receipt_ids, cached, receipts, params.line_width, params.format)
+    return StreamingResponse(render_document(params.format, bodies), media_type=RENDERERS[params.format].media_type)
+
+
+@router.get("/{receipt_id}", response_model=ReceiptResponse)
+async def get_receipt(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    user_id: Annotated[int, Depends(get_current_user_id)],
+    receipt_id: int,
+) -> Response:
+    receipt = await db.scalar(build_receipt_query(receipt_id, user_id))
 
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
 
-    def format_line(text: str, width: int) -> str:
-        if len(text) <= width:
-            return text
-        return text[: width - 3] + "..."
-
-    def center_text(text: str, width: int) -> str:
-        return text.center(width)
-
-    lines = []
-    lines.append(center_text("My Company", line_width))
-    lines.append("=" * line_width)
-
-    price_width = min(10, max(8, line_width // 4))
-    label_width = line_width - price_width - 1
+    products = await load_receipt_products(db, receipt)
+    return FastJSONResponse(build_receipt_response_content(receipt, products))
 
-    for item in receipt.products["items"]:
-        quantity = Decimal(item["quantity"])
-        price = Decimal(item["price"])
-        total = Decimal(item["total"])
-        name = item["name"]
 
-        price_line = f"{quantity} x {price:,.2f}"
-        lines.append(price_line)
-
-        name_total_line = f"{format_line(name, label_width):<{label_width}} {total:>{price_width},.2f}"
-        lines.append(name_total_line)
-
-    lines.append("-" * line_width)
-    lines.append(f"{format_line('Загальна сума', label_width):<{label_width}} {receipt.total_cost:>{price_width},.2f}")
-
-    payment_type_display = "Готівка" if receipt.payment_type == "cash" else "Карта"
-    lines.append(
-        f"{format_line(payment_type_display, label_width):<{label_width}} {receipt.payment_amount:>{price_width},.2f}"
+@router.get(
+    "/{receipt_id}/public",
+    response_class=PlainTextResponse,
+    responses={200: {"content": {"text/html": {}, "application/octet-stream": {}}}},
+)
+async def get_public_receipt(
+    db: Annotated[AsyncSession, Depends(get_replica_db)],
+    primary_db: Annotated[AsyncSession, Depends(get_db)],
+    receipt_id: int,
+    line_width: Annotated[int, Query(ge=20, le=80)] = 32,
+    render_format: Annotated[RenderFormat, Query(alias="format")] = RenderFormat.TEXT,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    etag = public_receipt_etag(receipt_id, line_width, render_format)
+    headers = {"ETag": etag, "Cache-Control": PUBLIC_RECEIPT_CACHE_CONTROL}
+
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    rendered = render_cache.get((receipt_id, line_width, render_format))
+    if rendered is None:
+        receipt = await db.scalar(build_receipt_query(receipt_id))
+        if not receipt and is_replica(db):
+            # The receipt may have been created too recently to have reached the replica.
+            db = primary_db
+            receipt = await db.scalar(build_receipt_query(receipt_id))
+        if not receipt:
+            raise HTTPException(status_code=404, detail="Receipt not found")
+
+        rendered = render_receipt(receipt, await load_receipt_products(db, receipt), line_width, render_format)
+        render_cache.set((receipt_id, line_width, render_format), rendered)
+
+    if if_none_match is not None and matches_any_etag(if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(
+        b"".join(render_document(render_format, [rendered])),
+        media_type=RENDERERS[render_format].media_type,
+        headers=headers,
     )
-
-    rest = receipt.payment_amount - receipt.total_cost
-    lines.append(f"{format_line('Решта', label_width):<{label_width}} {rest:>{price_width},.2f}")
-
-    lines.append("=" * line_width)
-    lines.append(center_text(receipt.created_at.strftime("%d.%m.%Y %H:%M"), line_width))
-
-    return "\n".join(lines)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 class UserRegisterData(BaseModel):
@@ -28,3 +28,13 @@ class TokenResponse(BaseModel):
 class TokenData(BaseModel):
     email: str = Field(description="User email from token")
     user_id: int = Field(description="User ID from token")
+
+
+class Principal(BaseModel):
+    """The authenticated user as routes see it; instances are shared between requests through the principal cache."""
+
+    model_config = ConfigDict(frozen=True)
+
+    id: int = Field(description="User ID")
+    name: str = Field(description="User name")
+    email: str = Field(description="User email")
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+
+
+class HistogramBucket(BaseModel):
+    le: float | None = Field(description="Upper bound in seconds; null for the last, unbounded bucket")
+    count: int = Field(description="Observations at or below the upper bound")
+
+
+class HistogramStats(BaseModel):
+    count: int = Field(description="Number of observations")
+    sum: float = Field(description="Sum of the observations in seconds")
+    buckets: list[HistogramBucket] = Field(description="Cumulative bucket counts")
+
+
+class PoolStats(BaseModel):
+    size: int = Field(description="Connections kept open by the pool")
+    max_overflow: int = Field(description="Connections the pool may open beyond its size")
+    checked_out: int = Field(description="Connections in use")
+    idle: int = Field(description="Open connections waiting in the pool")
+    overflow: int = Field(description="Connections in use beyond the pool size")
+    timeouts: int = Field(description="Checkouts that gave up after waiting pool_timeout")
+    checkout_wait: HistogramStats = Field(description="Time to get a connection, including opening a new one")
+
+
+class PoolStatsResponse(BaseModel):
+    primary: PoolStats = Field(description="Pool of the primary database")
+    replica: PoolStats | None = Field(description="Pool of the read replica, when one is configured")
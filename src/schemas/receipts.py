@@ -1,9 +1,45 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
+from enum import StrEnum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from src.models import PaymentType
+from src.utils.money import to_minor
+
+
+class ProductNameMatch(StrEnum):
+    SUBSTRING = "substring"
+    PREFIX = "prefix"
+
+
+class CountMode(StrEnum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class RenderFormat(StrEnum):
+    TEXT = "text"
+    HTML = "html"
+    ESCPOS = "escpos"
+
+
+class StatsGranularity(StrEnum):
+    DAY = "day"
+    MONTH = "month"
+
+
+def validate_minor_amount(amount: Decimal) -> Decimal:
+    """Reject amounts that round to zero minor units: they would be stored and returned as 0.00."""
+    if to_minor(amount) <= 0:
+        raise ValueError("Amount must round to at least 0.01")
+    return amount
 
 
 class ProductItem(BaseModel):
@@ -11,6 +47,11 @@ class ProductItem(BaseModel):
     price: Decimal = Field(description="Price per unit", gt=0)
     quantity: Decimal = Field(description="Quantity or weight", gt=0)
 
+    @field_validator("price")
+    @classmethod
+    def validate_price(cls, price: Decimal) -> Decimal:
+        return validate_minor_amount(price)
+
 
 class ProductResponse(ProductItem):
     total: Decimal = Field(description="Total cost for this product")
@@ -20,6 +61,11 @@ class PaymentInfo(BaseModel):
     type: PaymentType = Field(description="Payment type: cash or card")
     amount: Decimal = Field(description="Payment amount", gt=0)
 
+    @field_validator("amount")
+    @classmethod
+    def validate_amount(cls, amount: Decimal) -> Decimal:
+        return validate_minor_amount(amount)
+
 
 class ReceiptCreateRequest(BaseModel):
     products: list[ProductItem] = Field(description="List of products in receipt", min_length=1)
@@ -35,6 +81,18 @@ class ReceiptResponse(BaseModel):
     created_at: datetime = Field(description="Receipt creation timestamp")
 
 
+class ReceiptBulkCreateResult(BaseModel):
+    index: int = Field(description="Position of the receipt in the request")
+    success: bool = Field(description="Whether the receipt was created")
+    receipt: ReceiptResponse | None = Field(default=None, description="Created receipt")
+    error: str | None = Field(default=None, description="Reason the receipt was rejected")
+
+
+class ReceiptBulkCreateResponse(BaseModel):
+    results: list[ReceiptBulkCreateResult] = Field(description="Per-receipt results in request order")
+    created_count: int = Field(description="Number of receipts created")
+
+
 class ReceiptListItem(BaseModel):
     id: int = Field(description="Receipt ID")
     total: Decimal = Field(description="Total receipt amount")
@@ -44,9 +102,12 @@ class ReceiptListItem(BaseModel):
 
 class ReceiptListResponse(BaseModel):
     receipts: list[ReceiptListItem] = Field(description="List of receipts")
-    total_count: int = Field(description="Total number of receipts")
-    page: int = Field(description="Current page number")
+    total_count: int | None = Field(description="Total number of receipts, null when count_mode is none")
+    count_mode: CountMode = Field(description="Strategy that produced total_count")
+    has_more: bool = Field(description="Whether more receipts follow this page")
+    page: int | None = Field(description="Current page number, null when paging by cursor")
     per_page: int = Field(description="Items per page")
+    next_cursor: str | None = Field(default=None, description="Cursor for the next page, null on the last page")
 
 
 class ReceiptFilters(BaseModel):
@@ -55,3 +116,40 @@ class ReceiptFilters(BaseModel):
     min_total: Decimal | None = Field(None, description="Filter receipts with total >= this amount", ge=0)
     max_total: Decimal | None = Field(None, description="Filter receipts with total <= this amount", ge=0)
     payment_type: PaymentType | None = Field(None, description="Filter by payment type")
+    product_name: str | None = Field(
+        None, description="Filter receipts containing a product with this name (case-insensitive)", min_length=1
+    )
+    product_name_match: ProductNameMatch = Field(
+        ProductNameMatch.SUBSTRING, description="Match product_name anywhere in the name or only at its start"
+    )
+
+
+class ReceiptExportParams(ReceiptFilters):
+    format: ExportFormat = Field(default=ExportFormat.NDJSON, description="Export format: ndjson or csv")
+
+
+class ReceiptRenderBatchRequest(BaseModel):
+    receipt_ids: list[int] = Field(description="Receipts to render, in output order", min_length=1, max_length=1000)
+    line_width: int = Field(default=32, description="Characters per line", ge=20, le=80)
+    format: RenderFormat = Field(default=RenderFormat.TEXT, description="Output format: text, html or escpos")
+
+
+class ReceiptStatsParams(BaseModel):
+    date_from: date | None = Field(default=None, description="First day of the range (UTC), inclusive")
+    date_to: date | None = Field(default=None, description="Last day of the range (UTC), inclusive")
+    granularity: StatsGranularity = Field(default=StatsGranularity.DAY, description="Bucket size: day or month")
+
+
+class ReceiptStatsBucket(BaseModel):
+    period: date = Field(description="First day of the bucket")
+    receipt_count: int = Field(description="Number of receipts")
+    total: Decimal = Field(description="Revenue")
+    cash_count: int = Field(description="Number of receipts paid in cash")
+    cash_total: Decimal = Field(description="Revenue paid in cash")
+    card_count: int = Field(description="Number of receipts paid by card")
+    card_total: Decimal = Field(description="Revenue paid by card")
+
+
+class ReceiptStatsResponse(BaseModel):
+    granularity: StatsGranularity = Field(description="Bucket size")
+    buckets: list[ReceiptStatsBucket] = Field(description="Buckets in chronological order, empty buckets omitted")
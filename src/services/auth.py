@@ -1,30 +1,43 @@
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.db import record_write
 from src.models import User
 from src.schemas.auth import TokenResponse, UserRegisterData
-from src.utils.auth import get_password_hash, verify_password
+from src.utils.auth import password_hasher, password_needs_rehash
+from src.utils.metrics import timed_phase
 from src.utils.tokens import create_access_token
 
 
 async def register_user(db: AsyncSession, user_data: UserRegisterData) -> None:
-    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
-    if existing_user:
+    with timed_phase("auth"):
+        hashed_password = await password_hasher.hash(user_data.password)
+
+    # The unique email decides, so concurrent registrations of one email get a single winner and 409 for the rest.
+    user_id = await db.scalar(
+        insert(User)
+        .values(name=user_data.name, email=user_data.email, password=hashed_password)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id)
+    )
+    if user_id is None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User with this email already exists")
 
-    hashed_password = get_password_hash(user_data.password)
-
-    new_user = User(name=user_data.name, email=user_data.email, password=hashed_password)
-    db.add(new_user)
     await db.commit()
+    record_write(user_id)
 
 
 async def login_user(db: AsyncSession, login: str, password: str) -> TokenResponse:
-    user = await _authenticate_user(db, login, password)
+    with timed_phase("auth"):
+        user = await _authenticate_user(db, login, password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Wrong email or password")
 
+    if password_needs_rehash(user.password):
+        await _rehash_password(db, user, password)
+
     access_token = create_access_token(user.email, user.id)
     return TokenResponse(access_token=access_token)
 
@@ -33,6 +46,15 @@ async def _authenticate_user(db: AsyncSession, login: str, password: str) -> Use
     query = select(User).where(User.email == login)
     user = await db.scalar(query)
 
-    if not user or not verify_password(password, user.password):
+    if not user or not await password_hasher.verify(password, user.password):
         return None
     return user
+
+
+async def _rehash_password(db: AsyncSession, user: User, password: str) -> None:
+    """Store the password hashed with the configured cost, unless it was changed since it was read."""
+    hashed_password = await password_hasher.hash(password)
+    await db.execute(
+        update(User).where(User.id == user.id, User.password == user.password).values(password=hashed_password)
+    )
+    await db.commit()
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import Row, Select, String, case, cast, func, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import ProductName, Receipt, ReceiptItem
+from src.schemas.receipts import ExportFormat
+from src.services.receipt_items import json_receipt_products
+from src.utils.money import format_minor
+
+EXPORT_BATCH_SIZE = 1000
+
+CSV_HEADER = [
+    "receipt_id",
+    "created_at",
+    "payment_type",
+    "payment_amount",
+    "total",
+    "rest",
+    "product_name",
+    "price",
+    "quantity",
+    "product_total",
+]
+
+
+def build_export_query(query: Select) -> Select:
+    """The receipts of query with their items, aggregated per receipt so that a batch never splits one.
+
+    Items come from receipt_items; the products JSON is only read for receipts the items backfill hasn't reached.
+    """
+    item = func.json_build_array(
+        ProductName.name,
+        ReceiptItem.price_minor,
+        ReceiptItem.price_places,
+        cast(ReceiptItem.quantity, String),
+        ReceiptItem.total_minor,
+        ReceiptItem.total_places,
+    )
+    lines = (
+        select(func.json_agg(aggregate_order_by(item, ReceiptItem.position)).label("lines"))
+        .join(ProductName, ProductName.id == ReceiptItem.product_name_id)
+        .where(ReceiptItem.receipt_id == Receipt.id)
+        .lateral("lines")
+    )
+    return (
+        query.with_only_columns(
+            Receipt.id,
+            Receipt.created_at,
+            Receipt.payment_type,
+            Receipt.payment_minor,
+            Receipt.total_minor,
+            lines.c.lines,
+            case((lines.c.lines.is_(None), Receipt.products)).label("products"),
+        )
+        .outerjoin(lines, true())
+        .order_by(Receipt.created_at.desc(), Receipt.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _export_items(row: Row) -> list[dict]:
+    """A receipt's items with their amounts as decimal strings, as the receipt routes write them."""
+    if row.lines is None:
+        return [
+            {
+                "name": product["name"],
+                "price": format_minor(product["price_minor"], places=product["price_places"]),
+                "quantity": str(product["quantity"]),
+                "total": format_minor(product["total_minor"], places=product["total_places"]),
+            }
+            for product in json_receipt_products(row.products)
+        ]
+
+    return [
+        {
+            "name": name,
+            "price": format_minor(price_minor, places=price_places),
+            "quantity": quantity,
+            "total": format_minor(total_minor, places=total_places),
+        }
+        for name, price_minor, price_places, quantity, total_minor, total_places in row.lines
+    ]
+
+
+def _ndjson_lines(rows: list[Row]) -> str:
+    lines = []
+    for row in rows:
+        receipt = {
+            "id": row.id,
+            "created_at": row.created_at.isoformat(),
+            "payment": {"type": row.payment_type, "amount": format_minor(row.payment_minor)},
+            "total": format_minor(row.total_minor),
+            "rest": format_minor(row.payment_minor - row.total_minor),
+            "products": _export_items(row),
+        }
+        lines.append(json.dumps(receipt, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n"
+
+
+def _csv_lines(rows: list[Row]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        receipt_columns = [
+            row.id,
+            row.created_at.isoformat(),
+            row.payment_type,
+            format_minor(row.payment_minor),
+            format_minor(row.total_minor),
+            format_minor(row.payment_minor - row.total_minor),
+        ]
+        writer.writerows(
+            [*receipt_columns, item["name"], item["price"], item["quantity"], item["total"]]
+            for item in _export_items(row)
+        )
+    return buffer.getvalue()
+
+
+async def stream_receipts_export(db: AsyncSession, query: Select, export_format: ExportFormat) -> AsyncIterator[str]:
+    # Runs while the response is being sent, after the request's dependencies may have already closed the session.
+    # A closed session can be reused; it is closed again here so the connection goes back to the pool.
+    try:
+        if export_format == ExportFormat.CSV:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(CSV_HEADER)
+            yield buffer.getvalue()
+
+        format_rows = _csv_lines if export_format == ExportFormat.CSV else _ndjson_lines
+        result = await db.stream(build_export_query(query))
+        async for rows in result.partitions():
+            yield format_rows(list(rows))
+    finally:
+        await db.close()
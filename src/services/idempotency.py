@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.models import IdempotencyKey
+from src.utils.cache import LRUCache
+
+
+def request_fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class IdempotencyReservation:
+    def __init__(self, user_id: int, key: str, fingerprint: str, stored: tuple[str, dict] | None) -> None:
+        self.user_id = user_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.saved_response: dict | None = None
+        self._stored = stored
+
+    @property
+    def response(self) -> dict | None:
+        if self._stored is None:
+            return None
+
+        fingerprint, response = self._stored
+        if fingerprint != self.fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Idempotency key was already used with a different request",
+            )
+        return response
+
+
+class IdempotencyStore(ABC):
+    """Stores the first response per (user, idempotency key).
+
+    reserve() holds an exclusive lock on the key for the duration of the block, so concurrent duplicates wait for
+    the first request instead of racing it. save(), and the refresh of a replayed key's last use, are applied
+    together with the caller's transaction, which must be committed on a replay as well.
+    """
+
+    @abstractmethod
+    def reserve(
+        self, db: AsyncSession, user_id: int, key: str, fingerprint: str
+    ) -> AbstractAsyncContextManager[IdempotencyReservation]: ...
+
+    @abstractmethod
+    async def save(self, db: AsyncSession, reservation: IdempotencyReservation, response: dict) -> None: ...
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._responses: LRUCache[tuple[int, str], tuple[str, dict]] = LRUCache(maxsize, ttl)
+        self._locks: dict[tuple[int, str], tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def reserve(
+        self, db: AsyncSession, user_id: int, key: str, fingerprint: str
+    ) -> AsyncIterator[IdempotencyReservation]:
+        cache_key = (user_id, key)
+        lock, holders = self._locks.get(cache_key, (asyncio.Lock(), 0))
+        self._locks[cache_key] = (lock, holders + 1)
+
+        try:
+            async with lock:
+                reservation = IdempotencyReservation(user_id, key, fingerprint, self._responses.get(cache_key))
+                yield reservation
+                if reservation.saved_response is not None:
+                    self._responses.set(cache_key, (fingerprint, reservation.saved_response))
+        finally:
+            lock, holders = self._locks[cache_key]
+            if holders == 1:
+                del self._locks[cache_key]
+            else:
+                self._locks[cache_key] = (lock, holders - 1)
+
+    async def save(self, db: AsyncSession, reservation: IdempotencyReservation, response: dict) -> None:
+        reservation.saved_response = response
+
+
+class PostgresIdempotencyStore(IdempotencyStore):
+    def __init__(self, max_keys_per_user: int, ttl: float, purge_interval: float) -> None:
+        self.max_keys_per_user = max_keys_per_user
+        self.ttl = timedelta(seconds=ttl)
+        self.purge_interval = purge_interval
+        self._purged_at: float | None = None
+
+    @asynccontextmanager
+    async def reserve(
+        self, db: AsyncSession, user_id: int, key: str, fingerprint: str
+    ) -> AsyncIterator[IdempotencyReservation]:
+        await db.execute(select(func.pg_advisory_xact_lock(user_id, func.hashtext(key))))
+
+        stored = await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now())
+            .values(last_used_at=func.now())
+            .returning(IdempotencyKey.fingerprint, IdempotencyKey.response)
+        )
+        row = stored.one_or_none()
+
+        yield IdempotencyReservation(user_id, key, fingerprint, (row.fingerprint, row.response) if row else None)
+
+    async def save(self, db: AsyncSession, reservation: IdempotencyReservation, response: dict) -> None:
+        values = {
+            "fingerprint": reservation.fingerprint,
+            "response": response,
+            "last_used_at": func.now(),
+            "expires_at": func.now() + self.ttl,
+        }
+        await db.execute(
+            insert(IdempotencyKey)
+            .values(user_id=reservation.user_id, key=reservation.key, **values)
+            .on_conflict_do_update(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key], set_=values)
+        )
+
+        retained_keys = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.user_id == reservation.user_id, IdempotencyKey.expires_at > func.now())
+            .order_by(IdempotencyKey.last_used_at.desc())
+            .limit(self.max_keys_per_user)
+        )
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == reservation.user_id, IdempotencyKey.key.not_in(retained_keys)
+            )
+        )
+
+        now = time.monotonic()
+        if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            await self.purge_expired(db)
+
+    async def purge_expired(self, db: AsyncSession) -> None:
+        """Deletes the expired keys of all users, including those who stopped sending requests.
+
+        Rows locked by another transaction are left for the next purge instead of being waited for.
+        """
+        expired_keys = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= func.now())
+            .with_for_update(skip_locked=True)
+        )
+        await db.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired_keys))
+        )
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    if config.IDEMPOTENCY_BACKEND == "postgres":
+        return PostgresIdempotencyStore(
+            config.IDEMPOTENCY_MAX_KEYS, config.IDEMPOTENCY_TTL_SECONDS, config.IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+        )
+    return MemoryIdempotencyStore(config.IDEMPOTENCY_MAX_KEYS, config.IDEMPOTENCY_TTL_SECONDS)
+
+
+idempotency_store = create_idempotency_store()
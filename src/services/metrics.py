@@ -0,0 +1,99 @@
+"""Per-route request metrics of this process, and their rendering in the Prometheus text exposition format."""
+
+from typing import Iterable
+
+from src.schemas.metrics import HistogramStats, PoolStats
+from src.utils.metrics import STATEMENT_BUCKETS, Histogram, RequestStats
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Requests that matched no route share one label, so that probing random paths cannot add series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    def __init__(self) -> None:
+        self.responses: dict[int, int] = {}
+        self.duration = Histogram()
+        self.db_statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = Histogram()
+
+
+# Keyed by (method, route template); bounded by the routes the app defines.
+route_metrics: dict[tuple[str, str], RouteMetrics] = {}
+
+
+def record_request(method: str, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+    metrics = route_metrics.get((method, route))
+    if metrics is None:
+        metrics = route_metrics[method, route] = RouteMetrics()
+
+    metrics.responses[status_code] = metrics.responses.get(status_code, 0) + 1
+    metrics.duration.observe(duration)
+    metrics.db_statements.observe(stats.statements)
+    metrics.db_time.observe(stats.db_time)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, labels: dict[str, str], stats: HistogramStats) -> Iterable[str]:
+    for bucket in stats.buckets:
+        bound = "+Inf" if bucket.le is None else repr(bucket.le)
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {bucket.count}"
+    yield f"{name}_sum{_labels(**labels)} {stats.sum!r}"
+    yield f"{name}_count{_labels(**labels)} {stats.count}"
+
+
+def _header(name: str, metric_type: str, help_text: str) -> Iterable[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {metric_type}"
+
+
+def render_prometheus(pools: dict[str, PoolStats]) -> str:
+    """The route metrics and the stats of each named connection pool."""
+    routes = sorted(route_metrics.items())
+    lines: list[str] = []
+
+    lines.extend(_header("http_requests_total", "counter", "Requests handled, by route and response status."))
+    for (method, route), metrics in routes:
+        for status_code, count in sorted(metrics.responses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=str(status_code))} {count}")
+
+    histograms = [
+        ("http_request_duration_seconds", "Time to handle a request, until its response was sent.", "duration"),
+        ("http_request_db_statements", "SQL statements run by a request.", "db_statements"),
+        ("http_request_db_seconds", "Time a request spent executing SQL statements.", "db_time"),
+    ]
+    for name, help_text, attribute in histograms:
+        lines.extend(_header(name, "histogram", help_text))
+        for (method, route), metrics in routes:
+            lines.extend(
+                _histogram_lines(name, {"method": method, "route": route}, getattr(metrics, attribute).stats())
+            )
+
+    gauges = [
+        ("db_pool_size", "Connections kept open by the pool.", "size"),
+        ("db_pool_checked_out", "Connections in use.", "checked_out"),
+        ("db_pool_idle", "Open connections waiting in the pool.", "idle"),
+        ("db_pool_overflow", "Connections in use beyond the pool size.", "overflow"),
+    ]
+    for name, help_text, attribute in gauges:
+        lines.extend(_header(name, "gauge", help_text))
+        for database, stats in pools.items():
+            lines.append(f"{name}{_labels(database=database)} {getattr(stats, attribute)}")
+
+    lines.extend(_header("db_pool_timeouts_total", "counter", "Checkouts that gave up after waiting pool_timeout."))
+    for database, stats in pools.items():
+        lines.append(f"db_pool_timeouts_total{_labels(database=database)} {stats.timeouts}")
+
+    lines.extend(_header("db_pool_checkout_wait_seconds", "histogram", "Time to get a connection from the pool."))
+    for database, stats in pools.items():
+        lines.extend(_histogram_lines("db_pool_checkout_wait_seconds", {"database": database}, stats.checkout_wait))
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+"""Monthly range partitions of receipts on created_at, one per UTC calendar month."""
+
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Connection, text
+
+RECEIPT_PARTITION_PATTERN = re.compile(r"receipts_(\d{4}_\d{2}|default)")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def receipt_partition_name(month: date) -> str:
+    return f"receipts_{month:%Y_%m}"
+
+
+def is_receipt_partition(table_name: str) -> bool:
+    return RECEIPT_PARTITION_PATTERN.fullmatch(table_name) is not None
+
+
+def create_receipt_partition(connection: Connection, month: date) -> bool:
+    """Create the partition of one month in one transaction, or return False if it already exists.
+
+    The partition is built detached and then attached, which only blocks reads of receipts_default rather than of the
+    whole table. Receipts of the month that landed in receipts_default are moved into it, and since deleting them from
+    the default partition cascades to their items, the items are put back afterwards.
+    """
+    name = receipt_partition_name(month)
+    lower = f"{month.isoformat()} 00:00:00+00"
+    upper = f"{add_months(month, 1).isoformat()} 00:00:00+00"
+    bounds = {"lower": lower, "upper": upper}
+
+    with connection.begin():
+        # Serializes partition maintenance without blocking reads or inserts on receipts.
+        connection.execute(text("LOCK TABLE receipts IN SHARE UPDATE EXCLUSIVE MODE"))
+        if connection.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None:
+            return False
+
+        connection.execute(text("LOCK TABLE receipts_default IN ACCESS EXCLUSIVE MODE"))
+        # The name and bounds are derived from a date, never from input.
+        connection.execute(text(f"CREATE TABLE {name} (LIKE receipts INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        # Lets ATTACH PARTITION skip scanning the new table.
+        connection.execute(
+            text(
+                f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds "
+                f"CHECK (created_at >= '{lower}' AND created_at < '{upper}')"
+            )
+        )
+
+        connection.execute(text("CREATE TEMP TABLE moved_receipt_items (LIKE receipt_items) ON COMMIT DROP"))
+        connection.execute(
+            text(
+                "INSERT INTO moved_receipt_items SELECT ri.* FROM receipt_items ri "
+                "JOIN receipts_default r ON r.id = ri.receipt_id AND r.created_at = ri.receipt_created_at "
+                "WHERE r.created_at >= CAST(:lower AS timestamptz) AND r.created_at < CAST(:upper AS timestamptz)"
+            ),
+            bounds,
+        )
+        move_receipts = (
+            "WITH moved AS (DELETE FROM receipts_default "
+            "WHERE created_at >= CAST(:lower AS timestamptz) AND created_at < CAST(:upper AS timestamptz) RETURNING *) "
+        )
+        connection.execute(text(move_receipts + f"INSERT INTO {name} SELECT * FROM moved"), bounds)  # noqa: S608
+
+        connection.execute(
+            text(f"ALTER TABLE receipts ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+        )
+        connection.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+        connection.execute(text("INSERT INTO receipt_items SELECT * FROM moved_receipt_items"))
+
+    return True
+
+
+def ensure_receipt_partitions(connection: Connection, first_month: date, last_month: date) -> list[str]:
+    """Create the missing monthly partitions from first_month to last_month inclusive; returns the created names."""
+    created = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        if create_receipt_partition(connection, month):
+            created.append(receipt_partition_name(month))
+        month = add_months(month, 1)
+    return created
@@ -0,0 +1,38 @@
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapper
+
+from src.config import config
+from src.models import User
+from src.schemas.auth import Principal
+from src.utils.cache import LRUCache
+
+# Authenticated users by id. Changes made through the ORM evict their entry right away; other changes, and changes
+# made by other processes, show up once the entry expires.
+principal_cache: LRUCache[int, Principal] = LRUCache(
+    config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    principal_cache.delete(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper: Mapper, connection: object, user: User) -> None:
+    invalidate_principal(user.id)
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    row = (await db.execute(select(User.id, User.name, User.email).where(User.id == user_id))).one_or_none()
+    if row is None:
+        return None
+
+    principal = Principal(id=row.id, name=row.name, email=row.email)
+    principal_cache.set(user_id, principal)
+    return principal
@@ -0,0 +1,279 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Sequence
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Connection,
+    Row,
+    Select,
+    String,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    exists,
+    func,
+    literal,
+    null,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.models import ProductName, Receipt, ReceiptItem
+from src.schemas.receipts import ProductNameMatch
+from src.utils.cache import LRUCache
+from src.utils.money import minor_places, to_minor
+from src.utils.sql import escape_like
+
+# Only ids of names that were already committed are cached: a name inserted by the current transaction may still be
+# rolled back.
+product_name_ids: LRUCache[str, int] = LRUCache(config.PRODUCT_NAME_CACHE_SIZE)
+
+
+async def resolve_product_name_ids(db: AsyncSession, names: set[str]) -> dict[str, int]:
+    """Map product names to dictionary ids, adding the unknown ones, in the caller's transaction."""
+    ids: dict[str, int] = {}
+    for name in names:
+        name_id = product_name_ids.get(name)
+        if name_id is not None:
+            ids[name] = name_id
+
+    missing_names = [name for name in names if name not in ids]
+    if not missing_names:
+        return ids
+
+    missing = bindparam("names", missing_names, type_=ARRAY(String))
+    # DO NOTHING rather than DO UPDATE: popular names must not be row-locked by every transaction that uses them.
+    inserted = (
+        insert(ProductName)
+        .from_select(["name"], select(func.unnest(missing)))
+        .on_conflict_do_nothing(index_elements=[ProductName.name])
+        .returning(ProductName.id, ProductName.name)
+        .cte("inserted")
+    )
+    result = await db.execute(
+        select(inserted.c.id, inserted.c.name, literal(False).label("committed")).union_all(
+            select(ProductName.id, ProductName.name, literal(True)).where(ProductName.name == any_(missing))
+        )
+    )
+    for row in result:
+        ids[row.name] = row.id
+        if row.committed:
+            product_name_ids.set(row.name, row.id)
+
+    # A name committed by a concurrent transaction after this statement's snapshot was taken is neither inserted nor
+    # visible above; a new statement sees it.
+    remaining = [name for name in names if name not in ids]
+    if remaining:
+        result = await db.execute(select(ProductName.id, ProductName.name).where(ProductName.name.in_(remaining)))
+        for row in result:
+            ids[row.name] = row.id
+            product_name_ids.set(row.name, row.id)
+
+    return ids
+
+
+async def insert_receipt_items(
+    db: AsyncSession, lines: list[list[dict]], rows: Sequence[Row[tuple[int, datetime]]]
+) -> None:
+    """Write the lines of freshly inserted receipts, as calculate_totals returns them, in the caller's transaction."""
+    name_ids = await resolve_product_name_ids(db, {line["name"] for receipt_lines in lines for line in receipt_lines})
+
+    items = [
+        {
+            "receipt_id": row.id,
+            "receipt_created_at": row.created_at,
+            "position": position,
+            "product_name_id": name_ids[line["name"]],
+            "price_minor": line["price_minor"],
+            "price_places": line["price_places"],
+            "quantity": line["quantity"],
+            "total_minor": line["total_minor"],
+            "total_places": line["total_places"],
+        }
+        for receipt_lines, row in zip(lines, rows, strict=True)
+        for position, line in enumerate(receipt_lines)
+    ]
+    await db.execute(insert(ReceiptItem), items)
+
+
+def build_product_receipt_ids_query(name: str, match: ProductNameMatch) -> Select[tuple[int]]:
+    """Ids of receipts with an item whose name matches, found through the name dictionary rather than the receipts."""
+    pattern = escape_like(name) + "%"
+    if match == ProductNameMatch.SUBSTRING:
+        pattern = "%" + pattern
+
+    matching_names = select(ProductName.id).where(func.lower(ProductName.name).like(func.lower(pattern), escape="\\"))
+    return select(ReceiptItem.receipt_id).where(ReceiptItem.product_name_id.in_(matching_names))
+
+
+def build_receipt_items_query(receipt_id: int) -> Select[tuple[str, int, int, Decimal, int, int]]:
+    return (
+        select(
+            ProductName.name,
+            ReceiptItem.price_minor,
+            ReceiptItem.price_places,
+            ReceiptItem.quantity,
+            ReceiptItem.total_minor,
+            ReceiptItem.total_places,
+        )
+        .join(ProductName, ProductName.id == ReceiptItem.product_name_id)
+        .where(ReceiptItem.receipt_id == receipt_id)
+        .order_by(ReceiptItem.position)
+    )
+
+
+async def load_receipt_products(db: AsyncSession, receipt: Receipt) -> list[dict]:
+    """Items of a receipt as dicts with name, price_minor, price_places, quantity, total_minor and total_places."""
+    result = await db.execute(build_receipt_items_query(receipt.id))
+    products = [row._asdict() for row in result]
+    if products or receipt.products is None:
+        return products
+
+    # Receipts that the items backfill hasn't reached yet.
+    return json_receipt_products(receipt.products)
+
+
+def json_receipt_products(products: dict) -> list[dict]:
+    """Items of a receipt's products JSON, in the shape load_receipt_products returns."""
+    items = []
+    for item in products["items"]:
+        price = Decimal(item["price"])
+        total = Decimal(item["total"])
+        price_minor = to_minor(price)
+        total_minor = to_minor(total)
+        items.append(
+            {
+                "name": item["name"],
+                "price_minor": price_minor,
+                "price_places": minor_places(price, price_minor),
+                "quantity": Decimal(item["quantity"]),
+                "total_minor": total_minor,
+                "total_places": minor_places(total, total_minor),
+            }
+        )
+    return items
+
+
+def build_receipts_with_items_query(receipt_ids: list[int]) -> Select:
+    """Receipts and their items in one statement: a row per item, ordered by receipt and position.
+
+    Receipts are found through their items, which record the partition key, as in build_receipt_query. A receipt without
+    item rows is looked up in every partition and yields a single row carrying its products JSON instead.
+    """
+    ids = bindparam("receipt_ids", receipt_ids, type_=ARRAY(BigInteger))
+    receipt_columns = (Receipt.id, Receipt.total_minor, Receipt.payment_type, Receipt.payment_minor, Receipt.created_at)
+
+    with_items = (
+        select(
+            *receipt_columns,
+            cast(null(), JSON).label("products"),
+            ProductName.name,
+            ReceiptItem.price_minor,
+            ReceiptItem.price_places,
+            ReceiptItem.quantity,
+            ReceiptItem.total_minor.label("item_total_minor"),
+            ReceiptItem.total_places,
+            ReceiptItem.position,
+        )
+        .select_from(ReceiptItem)
+        # On the partition key too, so that each item probes only its receipt's partition.
+        .join(Receipt, and_(Receipt.id == ReceiptItem.receipt_id, Receipt.created_at == ReceiptItem.receipt_created_at))
+        .join(ProductName, ProductName.id == ReceiptItem.product_name_id)
+        .where(ReceiptItem.receipt_id == any_(ids))
+    )
+
+    requested = func.unnest(ids).table_valued("receipt_id").render_derived(name="requested")
+    ids_without_items = select(requested.c.receipt_id).where(
+        ~exists().where(ReceiptItem.receipt_id == requested.c.receipt_id)
+    )
+    without_items = select(
+        *receipt_columns,
+        Receipt.products,
+        null().label("name"),
+        null().label("price_minor"),
+        null().label("price_places"),
+        null().label("quantity"),
+        null().label("item_total_minor"),
+        null().label("total_places"),
+        literal(0).label("position"),
+    ).where(
+        # Checked once before any partition is probed, so the branch costs nothing when every receipt has items.
+        exists(ids_without_items),
+        Receipt.id == any_(func.array(ids_without_items.scalar_subquery())),
+    )
+
+    lines = union_all(with_items, without_items).subquery("lines")
+    return select(*(column for column in lines.c if column.name != "position")).order_by(lines.c.id, lines.c.position)
+
+
+async def load_receipts_with_products(db: AsyncSession, receipt_ids: list[int]) -> dict[int, tuple[Row, list[dict]]]:
+    """Receipts by id, each with its products as load_receipt_products returns them, in one round trip.
+
+    The row of a receipt has id, total_minor, payment_type, payment_minor and created_at. Missing ids are left out.
+    """
+    receipts: dict[int, tuple[Row, list[dict]]] = {}
+    for row in await db.execute(build_receipts_with_items_query(receipt_ids)):
+        if row.products is not None:
+            receipts[row.id] = (row, json_receipt_products(row.products))
+            continue
+
+        if row.id not in receipts:
+            receipts[row.id] = (row, [])
+        receipts[row.id][1].append(
+            {
+                "name": row.name,
+                "price_minor": row.price_minor,
+                "price_places": row.price_places,
+                "quantity": row.quantity,
+                "total_minor": row.item_total_minor,
+                "total_places": row.total_places,
+            }
+        )
+
+    return receipts
+
+
+def backfill_receipt_items(connection: Connection, first_receipt_id: int, last_receipt_id: int) -> None:
+    """Copy the JSON items of a range of receipts into receipt_items, in one transaction.
+
+    Safe to run while the API is writing: receipts that already have items are skipped.
+    """
+    params = {"first_receipt_id": first_receipt_id, "last_receipt_id": last_receipt_id}
+
+    with connection.begin():
+        connection.execute(
+            text(
+                "INSERT INTO product_names (name) "
+                "SELECT DISTINCT i.item ->> 'name' "
+                "FROM receipts r CROSS JOIN LATERAL json_array_elements(r.products -> 'items') AS i(item) "
+                "WHERE r.id BETWEEN :first_receipt_id AND :last_receipt_id "
+                "ON CONFLICT (name) DO NOTHING"
+            ),
+            params,
+        )
+        connection.execute(
+            text(
+                "INSERT INTO receipt_items (receipt_id, receipt_created_at, position, product_name_id, "
+                "price_minor, price_places, quantity, total_minor, total_places) "
+                "SELECT r.id, r.created_at, i.position - 1, n.id, "
+                "CAST(round(v.price * 100) AS bigint), CASE WHEN round(v.price, 2) = v.price THEN scale(v.price) ELSE 2 END, "
+                "v.quantity, "
+                "CAST(round(v.total * 100) AS bigint), CASE WHEN round(v.total, 2) = v.total THEN scale(v.total) ELSE 2 END "
+                "FROM receipts r "
+                "CROSS JOIN LATERAL json_array_elements(r.products -> 'items') WITH ORDINALITY AS i(item, position) "
+                "CROSS JOIN LATERAL (SELECT CAST(i.item ->> 'price' AS numeric) AS price, "
+                "CAST(i.item ->> 'quantity' AS numeric) AS quantity, CAST(i.item ->> 'total' AS numeric) AS total) v "
+                "JOIN product_names n ON n.name = i.item ->> 'name' "
+                "WHERE r.id BETWEEN :first_receipt_id AND :last_receipt_id "
+                "AND NOT EXISTS (SELECT 1 FROM receipt_items ri WHERE ri.receipt_id = r.id) "
+                "ON CONFLICT (receipt_id, position) DO NOTHING"
+            ),
+            params,
+        )
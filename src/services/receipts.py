@@ -0,0 +1,240 @@
+from datetime import datetime
+from typing import Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Row, Select, bindparam, exists, func, insert, literal, select, true, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.models import PaymentType, Receipt, ReceiptItem
+from src.schemas.receipts import (
+    PaymentInfo,
+    ProductItem,
+    ProductResponse,
+    ReceiptCreateRequest,
+    ReceiptFilters,
+    ReceiptResponse,
+)
+from src.services.receipt_items import build_product_receipt_ids_query, insert_receipt_items
+from src.services.stats import update_daily_stats
+from src.utils.money import format_minor, from_minor, line_total_minor, minor_places, to_minor
+from src.utils.sql import Explain
+
+
+def build_receipts_query(user_id: int, filters: ReceiptFilters | None = None) -> Select[tuple[Receipt]]:
+    query = select(Receipt).where(Receipt.user_id == user_id)
+
+    if filters:
+        if filters.date_from:
+            query = query.where(Receipt.created_at >= filters.date_from)
+        if filters.date_to:
+            query = query.where(Receipt.created_at <= filters.date_to)
+        if filters.min_total is not None:
+            query = query.where(Receipt.total_minor >= to_minor(filters.min_total))
+        if filters.max_total is not None:
+            query = query.where(Receipt.total_minor <= to_minor(filters.max_total))
+        if filters.payment_type:
+            query = query.where(Receipt.payment_type == filters.payment_type)
+        if filters.product_name:
+            query = query.where(
+                Receipt.id.in_(build_product_receipt_ids_query(filters.product_name, filters.product_name_match))
+            )
+
+    return query
+
+
+def build_count_query(query: Select) -> Select[tuple[int]]:
+    return query.with_only_columns(func.count(Receipt.id.distinct())).order_by(None)
+
+
+def build_count_estimate_query(query: Select) -> Explain:
+    """The plan of the filtered query, whose top node has the planner's row estimate."""
+    return Explain(query.order_by(None))
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    plan = await db.scalar(build_count_estimate_query(query))
+    return int(plan[0]["Plan"]["Plan Rows"]) if plan else 0
+
+
+def project_receipt_list_query(query: Select) -> Select[tuple[int, int, PaymentType, datetime]]:
+    """Only the columns of a list item; they are all covered by the receipts search indexes."""
+    return query.with_only_columns(Receipt.id, Receipt.total_minor, Receipt.payment_type, Receipt.created_at)
+
+
+def paginate_receipts_query(
+    query: Select, limit: int, offset: int = 0, after: tuple[datetime, int] | None = None
+) -> Select:
+    query = query.order_by(Receipt.created_at.desc(), Receipt.id.desc())
+    if after is not None:
+        created_at, receipt_id = after
+        query = query.where(
+            tuple_(Receipt.created_at, Receipt.id)
+            < tuple_(literal(created_at, Receipt.created_at.type), literal(receipt_id, Receipt.id.type))
+        )
+    elif offset:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+def build_search_page_query(
+    query: Select, per_page: int, page: int = 1, after: tuple[datetime, int] | None = None
+) -> Select:
+    """The filtered count and a page of list items, per_page + 1 of them, in one statement.
+
+    Gives the same page as counting first: an offset page past the end is clamped to the last page. Each item row
+    carries the count in `total_count`; an empty page still yields one row, with the count and null item columns.
+    """
+    total = build_count_query(query).subquery("total")
+    total_count = total.c[0]
+
+    page_query = paginate_receipts_query(project_receipt_list_query(query), per_page + 1, after=after)
+    if after is None:
+        last_page = (total_count + per_page - 1) // per_page
+        page_query = page_query.offset(func.greatest(func.least(page, last_page) - 1, 0) * per_page)
+    items = page_query.lateral("items")
+
+    return (
+        select(total_count.label("total_count"), *items.c)
+        .select_from(total)
+        .outerjoin(items, true())
+        .order_by(items.c.created_at.desc(), items.c.id.desc())
+    )
+
+
+def build_receipt_query(receipt_id: int, user_id: int | None = None) -> Select[tuple[Receipt]]:
+    """A receipt by id, probing only the partition it is in.
+
+    receipts is partitioned on created_at, which its items record too: the first item gives the receipt's partition, and
+    the other partitions are pruned when the statement runs. Receipts without item rows, which the items backfill hasn't
+    reached, are looked up in every partition instead; that branch is skipped when items exist.
+    """
+    receipt_id_param = bindparam("receipt_id", receipt_id)
+    query = select(Receipt).where(Receipt.id == receipt_id_param)
+    if user_id is not None:
+        query = query.where(Receipt.user_id == user_id)
+
+    created_at = (
+        select(ReceiptItem.receipt_created_at)
+        .where(ReceiptItem.receipt_id == receipt_id_param, ReceiptItem.position == 0)
+        .scalar_subquery()
+    )
+    has_items = exists().where(ReceiptItem.receipt_id == receipt_id_param)
+    lookups = union_all(query.where(Receipt.created_at == created_at), query.where(~has_items)).subquery("receipt")
+    return select(aliased(Receipt, lookups))
+
+
+def calculate_totals(products: list[ProductItem]) -> tuple[list[dict], int]:
+    """Receipt lines and the receipt total in minor units.
+
+    Each line total is rounded to the minor unit on its own (see line_total_minor); the receipt total is the sum of the
+    rounded lines, so it always matches what is printed. Each line also keeps the decimal places its price and total are
+    written with (see minor_places).
+    """
+    lines = []
+    total_minor = 0
+
+    for product in products:
+        price_minor = to_minor(product.price)
+        product_total_minor = line_total_minor(price_minor, product.quantity)
+        lines.append(
+            {
+                "name": product.name,
+                "price_minor": price_minor,
+                "price_places": minor_places(product.price, price_minor),
+                "quantity": product.quantity,
+                "total_minor": product_total_minor,
+                "total_places": minor_places(product.price * product.quantity, product_total_minor),
+            }
+        )
+        total_minor += product_total_minor
+
+    return lines, total_minor
+
+
+def build_receipt_values(user_id: int, receipt_data: ReceiptCreateRequest, total_minor: int) -> dict:
+    """The receipts row of a new receipt; its lines are written to receipt_items by insert_receipts."""
+    return {
+        "user_id": user_id,
+        "total_minor": total_minor,
+        "payment_type": receipt_data.payment.type,
+        "payment_minor": to_minor(receipt_data.payment.amount),
+    }
+
+
+async def insert_receipts(
+    db: AsyncSession, values: list[dict], lines: list[list[dict]]
+) -> Sequence[Row[tuple[int, datetime]]]:
+    """Insert receipts with their lines as calculate_totals returns them, one list of lines per receipt."""
+    result = await db.execute(
+        insert(Receipt).returning(Receipt.id, Receipt.created_at, sort_by_parameter_order=True), values
+    )
+    rows = result.all()
+    await insert_receipt_items(db, lines, rows)
+    await update_daily_stats(db, values, rows)
+    return rows
+
+
+def build_receipt_response_content(receipt: Receipt, products: list[dict]) -> dict:
+    """A stored receipt in the shape of ReceiptResponse, for FastJSONResponse.
+
+    Amounts are formatted straight from minor units into the strings pydantic would emit for the decimals; line amounts
+    keep their stored places, receipt amounts have two.
+    """
+    return {
+        "id": receipt.id,
+        "products": [
+            {
+                "name": product["name"],
+                "price": format_minor(product["price_minor"], places=product["price_places"]),
+                "quantity": product["quantity"],
+                "total": format_minor(product["total_minor"], places=product["total_places"]),
+            }
+            for product in products
+        ],
+        "payment": {"type": receipt.payment_type, "amount": format_minor(receipt.payment_minor)},
+        "total": format_minor(receipt.total_minor),
+        "rest": format_minor(receipt.payment_minor - receipt.total_minor),
+        "created_at": receipt.created_at,
+    }
+
+
+def build_receipt_response(
+    row: Row[tuple[int, datetime]], payment: PaymentInfo, lines: list[dict], total_minor: int
+) -> ReceiptResponse:
+    """The response to creating a receipt, with amounts in the places the request wrote them in.
+
+    The total has as many places as the longest line total, and the change as many as the longer of the total and the
+    payment, the same places that summing and subtracting the decimals gives.
+    """
+    payment_minor = to_minor(payment.amount)
+    payment_places = minor_places(payment.amount, payment_minor)
+    total_places = max((line["total_places"] for line in lines), default=0)
+
+    return ReceiptResponse(
+        id=row.id,
+        products=[
+            ProductResponse(
+                name=line["name"],
+                price=from_minor(line["price_minor"], line["price_places"]),
+                quantity=line["quantity"],
+                total=from_minor(line["total_minor"], line["total_places"]),
+            )
+            for line in lines
+        ],
+        payment=PaymentInfo(type=payment.type, amount=from_minor(payment_minor, payment_places)),
+        total=from_minor(total_minor, total_places),
+        rest=from_minor(payment_minor - total_minor, max(payment_places, total_places)),
+        created_at=row.created_at,
+    )
+
+
+async def create_receipt(db: AsyncSession, user_id: int, receipt_data: ReceiptCreateRequest) -> ReceiptResponse:
+    lines, total_minor = calculate_totals(receipt_data.products)
+
+    if to_minor(receipt_data.payment.amount) < total_minor:
+        raise HTTPException(status_code=400, detail="Insufficient payment amount")
+
+    [row] = await insert_receipts(db, [build_receipt_values(user_id, receipt_data, total_minor)], [lines])
+
+    return build_receipt_response(row, receipt_data.payment, lines, total_minor)
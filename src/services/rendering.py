@@ -0,0 +1,186 @@
+import hmac
+import html
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Iterable, Iterator
+
+from sqlalchemy import Row
+
+from src.config import config
+from src.models import PaymentType, Receipt
+from src.schemas.receipts import RenderFormat
+from src.utils.cache import LRUCache
+from src.utils.money import format_minor
+
+# Bump whenever the rendered layout changes so clients holding an old ETag get the new text.
+LAYOUT_VERSION = 1
+
+PUBLIC_RECEIPT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Rendered receipt bodies, without the document framing of their format.
+render_cache: LRUCache[tuple[int, int, RenderFormat], bytes] = LRUCache(config.PUBLIC_RECEIPT_CACHE_SIZE)
+
+
+def public_receipt_etag(receipt_id: int, line_width: int, render_format: RenderFormat) -> str:
+    # Receipts never change after creation, so the id, width, format and layout version identify the exact bytes. The
+    # tag is signed: only the server can issue it, so a client holding it has seen the receipt exist.
+    tag = f"{receipt_id}-{line_width}-{render_format}-v{LAYOUT_VERSION}"
+    signature = hmac.new(config.JWT_SECRET_KEY.encode(), tag.encode(), "sha256").hexdigest()[:16]
+    return f'"{tag}-{signature}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether If-None-Match lists etag; "*" is left to the caller, as it only matches a receipt that exists."""
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def matches_any_etag(if_none_match: str) -> bool:
+    return if_none_match.strip() == "*"
+
+
+class ReceiptLayout:
+    """Column widths and fixed lines of the receipt layout for one line width."""
+
+    def __init__(self, line_width: int) -> None:
+        self.line_width = line_width
+        self.price_width = min(10, max(8, line_width // 4))
+        self.label_width = line_width - self.price_width - 1
+
+        self.header = "My Company".center(line_width)
+        self.double_rule = "=" * line_width
+        self.single_rule = "-" * line_width
+        self.total_label = self.label("Загальна сума")
+        self.payment_labels = {PaymentType.CASH: self.label("Готівка"), PaymentType.CARD: self.label("Карта")}
+        self.rest_label = self.label("Решта")
+
+    def label(self, text: str) -> str:
+        if len(text) > self.label_width:
+            text = text[: self.label_width - 3] + "..."
+        return text.ljust(self.label_width)
+
+    def amount_line(self, label: str, minor: int) -> str:
+        return f"{label} {format_minor(minor, grouping=True):>{self.price_width}}"
+
+
+@cache
+def receipt_layout(line_width: int) -> ReceiptLayout:
+    return ReceiptLayout(line_width)
+
+
+def receipt_lines(receipt: Receipt | Row, products: list[dict], line_width: int) -> list[str]:
+    """The receipt as text lines; products are dicts with name, price_minor, quantity and total_minor."""
+    layout = receipt_layout(line_width)
+
+    lines = [layout.header, layout.double_rule]
+    for product in products:
+        lines.append(f"{product['quantity']} x {format_minor(product['price_minor'], grouping=True)}")
+        lines.append(layout.amount_line(layout.label(product["name"]), product["total_minor"]))
+
+    lines.append(layout.single_rule)
+    lines.append(layout.amount_line(layout.total_label, receipt.total_minor))
+    lines.append(layout.amount_line(layout.payment_labels[receipt.payment_type], receipt.payment_minor))
+    lines.append(layout.amount_line(layout.rest_label, receipt.payment_minor - receipt.total_minor))
+    lines.append(layout.double_rule)
+    lines.append(receipt.created_at.strftime("%d.%m.%Y %H:%M").center(layout.line_width))
+
+    return lines
+
+
+def render_receipt_text(receipt: Receipt | Row, products: list[dict], line_width: int) -> str:
+    return "\n".join(receipt_lines(receipt, products, line_width))
+
+
+class ReceiptRenderer(ABC):
+    """Turns receipt lines into the bytes of one output format.
+
+    A document is document_start, the rendered receipts joined by separator, then document_end, so one receipt and a
+    batch of them share the same rendering.
+    """
+
+    media_type = "text/plain; charset=utf-8"
+    document_start = b""
+    document_end = b""
+    separator = b""
+
+    @abstractmethod
+    def render(self, lines: list[str]) -> bytes: ...
+
+
+class TextRenderer(ReceiptRenderer):
+    separator = b"\n\n"
+
+    def render(self, lines: list[str]) -> bytes:
+        return "\n".join(lines).encode()
+
+
+class HtmlRenderer(ReceiptRenderer):
+    """A monospace block per receipt, keeping the text layout; styles are inline for email clients."""
+
+    media_type = "text/html; charset=utf-8"
+    document_start = b'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Receipt</title></head><body>\n'
+    document_end = b"</body></html>\n"
+
+    def render(self, lines: list[str]) -> bytes:
+        body = html.escape("\n".join(lines), quote=False)
+        return f'<pre style="font-family: monospace; margin: 0 0 2em">{body}</pre>\n'.encode()
+
+
+class EscPosRenderer(ReceiptRenderer):
+    """Raw ESC/POS for thermal printers: Cyrillic code page, and each receipt fed past the cutter and cut."""
+
+    media_type = "application/octet-stream"
+    encoding = "cp1251"
+    # ESC @ resets the printer, ESC t 46 selects the WPC1251 code page.
+    document_start = b"\x1b@\x1bt\x2e"
+    # ESC d 4 feeds four lines, GS V 1 makes a partial cut.
+    receipt_end = b"\n\x1bd\x04\x1dV\x01"
+
+    def render(self, lines: list[str]) -> bytes:
+        return "\n".join(lines).encode(self.encoding, errors="replace") + self.receipt_end
+
+
+RENDERERS: dict[RenderFormat, ReceiptRenderer] = {
+    RenderFormat.TEXT: TextRenderer(),
+    RenderFormat.HTML: HtmlRenderer(),
+    RenderFormat.ESCPOS: EscPosRenderer(),
+}
+
+
+def render_receipt(receipt: Receipt | Row, products: list[dict], line_width: int, render_format: RenderFormat) -> bytes:
+    return RENDERERS[render_format].render(receipt_lines(receipt, products, line_width))
+
+
+def render_receipts(
+    receipt_ids: list[int],
+    cached: dict[int, bytes],
+    receipts: dict[int, tuple[Row, list[dict]]],
+    line_width: int,
+    render_format: RenderFormat,
+) -> list[bytes]:
+    """Bodies of the receipts in order: taken from cached, or rendered from receipts and added to render_cache.
+
+    Cache hits are passed in rather than looked up here, so entries evicted while the batch renders are not lost. All
+    bodies are rendered before the response starts: render_cache is not thread-safe, so it is only touched from the
+    event loop, never from the threads a streamed sync iterator runs in.
+    """
+    bodies = []
+    for receipt_id in receipt_ids:
+        body = cached.get(receipt_id)
+        if body is None:
+            receipt, products = receipts[receipt_id]
+            body = render_receipt(receipt, products, line_width, render_format)
+            render_cache.set((receipt_id, line_width, render_format), body)
+            cached[receipt_id] = body
+        bodies.append(body)
+    return bodies
+
+
+def render_document(render_format: RenderFormat, receipts: Iterable[bytes]) -> Iterator[bytes]:
+    """Frame rendered receipts as one document of the format, yielding chunks as the receipts come."""
+    renderer = RENDERERS[render_format]
+    yield renderer.document_start
+    for index, receipt in enumerate(receipts):
+        if index:
+            yield renderer.separator
+        yield receipt
+    yield renderer.document_end
@@ -0,0 +1,100 @@
+from datetime import date, datetime, timezone
+from typing import Sequence
+
+from sqlalchemy import Connection, Date, DateTime, Row, Select, cast, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import PaymentType, ReceiptDailyStats
+from src.schemas.receipts import ReceiptStatsParams
+
+
+async def update_daily_stats(db: AsyncSession, values: list[dict], rows: Sequence[Row[tuple[int, datetime]]]) -> None:
+    """Add freshly inserted receipts to the per-user daily rollups, in the caller's transaction.
+
+    Rows are upserted in key order, so concurrent inserts lock the rows they share in the same order and can't deadlock.
+    """
+    totals: dict[tuple[int, date, PaymentType], tuple[int, int, int]] = {}
+    for receipt, row in zip(values, rows, strict=True):
+        key = (receipt["user_id"], row.created_at.astimezone(timezone.utc).date(), receipt["payment_type"])
+        receipt_count, total_minor, payment_minor = totals.get(key, (0, 0, 0))
+        totals[key] = (
+            receipt_count + 1,
+            total_minor + receipt["total_minor"],
+            payment_minor + receipt["payment_minor"],
+        )
+
+    stmt = insert(ReceiptDailyStats).values(
+        [
+            {
+                "user_id": user_id,
+                "day": day,
+                "payment_type": payment_type,
+                "receipt_count": receipt_count,
+                "total_minor": total_minor,
+                "payment_minor": payment_minor,
+            }
+            for (user_id, day, payment_type), (receipt_count, total_minor, payment_minor) in sorted(totals.items())
+        ]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ReceiptDailyStats.user_id, ReceiptDailyStats.day, ReceiptDailyStats.payment_type],
+            set_={
+                "receipt_count": ReceiptDailyStats.receipt_count + stmt.excluded.receipt_count,
+                "total_minor": ReceiptDailyStats.total_minor + stmt.excluded.total_minor,
+                "payment_minor": ReceiptDailyStats.payment_minor + stmt.excluded.payment_minor,
+            },
+        )
+    )
+
+
+def build_stats_query(user_id: int, params: ReceiptStatsParams) -> Select:
+    period = cast(func.date_trunc(params.granularity.value, cast(ReceiptDailyStats.day, DateTime)), Date)
+    is_cash = ReceiptDailyStats.payment_type == PaymentType.CASH
+    is_card = ReceiptDailyStats.payment_type == PaymentType.CARD
+
+    query = (
+        select(
+            period.label("period"),
+            func.sum(ReceiptDailyStats.receipt_count).label("receipt_count"),
+            func.sum(ReceiptDailyStats.total_minor).label("total_minor"),
+            func.coalesce(func.sum(ReceiptDailyStats.receipt_count).filter(is_cash), 0).label("cash_count"),
+            func.coalesce(func.sum(ReceiptDailyStats.total_minor).filter(is_cash), 0).label("cash_total_minor"),
+            func.coalesce(func.sum(ReceiptDailyStats.receipt_count).filter(is_card), 0).label("card_count"),
+            func.coalesce(func.sum(ReceiptDailyStats.total_minor).filter(is_card), 0).label("card_total_minor"),
+        )
+        .where(ReceiptDailyStats.user_id == user_id)
+        .group_by(period)
+        .order_by(period)
+    )
+
+    if params.date_from:
+        query = query.where(ReceiptDailyStats.day >= params.date_from)
+    if params.date_to:
+        query = query.where(ReceiptDailyStats.day <= params.date_to)
+
+    return query
+
+
+def backfill_daily_stats(connection: Connection, first_user_id: int, last_user_id: int) -> None:
+    """Recompute the rollups of a range of users from their receipts, in one transaction."""
+    params = {"first_user_id": first_user_id, "last_user_id": last_user_id}
+
+    with connection.begin():
+        # Blocks concurrent rollup upserts so they can't be overwritten by the recomputed totals.
+        connection.execute(text("LOCK TABLE receipt_daily_stats IN EXCLUSIVE MODE"))
+        connection.execute(
+            text("DELETE FROM receipt_daily_stats WHERE user_id BETWEEN :first_user_id AND :last_user_id"), params
+        )
+        connection.execute(
+            text(
+                "INSERT INTO receipt_daily_stats "
+                "(user_id, day, payment_type, receipt_count, total_minor, payment_minor) "
+                "SELECT user_id, CAST(created_at AT TIME ZONE 'UTC' AS date), payment_type, "
+                "count(*), sum(total_minor), sum(payment_minor) "
+                "FROM receipts WHERE user_id BETWEEN :first_user_id AND :last_user_id "
+                "GROUP BY 1, 2, 3"
+            ),
+            params,
+        )
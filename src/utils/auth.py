@@ -1,12 +1,32 @@
+import asyncio
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
 import bcrypt
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 
 from src.config import config
 from src.schemas.auth import TokenData
+from src.utils.cache import LRUCache
+
+# Verified tokens, each until its exp. Keys are HMACs of the token under the current secret and algorithm, so
+# changing either makes every entry unreachable and tokens are verified again.
+token_cache: LRUCache[bytes, TokenData] = LRUCache(config.TOKEN_CACHE_SIZE)
+
+
+def _token_cache_key(token: str) -> bytes:
+    return hmac.digest(config.JWT_SECRET_KEY.encode(), f"{config.JWT_ALGORITHM}.{token}".encode(), "sha256")
 
 
 def get_data_from_token(token: str) -> TokenData:
+    cache_key = _token_cache_key(token)
+    token_data = token_cache.get(cache_key)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=[config.JWT_ALGORITHM])
         email = payload.get("sub")
@@ -15,14 +35,61 @@ def get_data_from_token(token: str) -> TokenData:
         if not isinstance(email, str) or not isinstance(user_id, int):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token data")
 
-        return TokenData(email=email, user_id=user_id)
+        token_data = TokenData(email=email, user_id=user_id)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from None
 
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, int):
+        token_cache.set(cache_key, token_data, ttl=expires_at - time.time())
+    return token_data
+
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # A bcrypt hash reads $2b$<cost>$<salt and checksum>.
+    return hashed_password.split("$")[2] != f"{config.BCRYPT_ROUNDS:02d}"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+class PasswordHasher:
+    """Runs bcrypt in a thread pool of its own, so hashing never blocks the event loop.
+
+    At most `concurrency` hashes run at once and up to `max_queue` more wait for a thread. Calls beyond that are
+    rejected with 503 right away instead of queueing behind a login spike.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int) -> None:
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bcrypt")
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run[T](self, function: Callable[..., T], *args: str) -> T:
+        if self.pending >= self.concurrency + self.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.pending -= 1
+
+
+password_hasher = PasswordHasher(config.PASSWORD_HASH_CONCURRENCY, config.PASSWORD_HASH_MAX_QUEUE)
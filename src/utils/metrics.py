@@ -0,0 +1,157 @@
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Sequence
+
+import pydantic_core
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.engine.interfaces import DBAPICursor
+
+from src.config import config
+from src.schemas.metrics import HistogramBucket, HistogramStats
+
+# Upper bounds in seconds, from a pool checkout that found an idle connection to one that waited out a timeout.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Long enough for any statement the app builds, short of an insertmanyvalues batch of many rows.
+SLOW_QUERY_STATEMENT_MAX_LENGTH = 2000
+
+slow_query_log = logging.getLogger("src.slow_queries")
+
+
+class Histogram:
+    """Counts of observed values per upper bound, plus their count and sum, in the shape of a Prometheus histogram."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """(upper bound, observations at or below it) per bucket, ending with (inf, count)."""
+        counts = []
+        total = 0
+        for bound, bucket_count in zip((*self.buckets, float("inf")), self.bucket_counts, strict=True):
+            total += bucket_count
+            counts.append((bound, total))
+        return counts
+
+    def stats(self) -> HistogramStats:
+        return HistogramStats(
+            count=self.count,
+            sum=self.sum,
+            buckets=[
+                HistogramBucket(le=None if bound == float("inf") else bound, count=count)
+                for bound, count in self.cumulative_counts()
+            ],
+        )
+
+
+class StatementTrace:
+    def __init__(self, duration: float, rows: int) -> None:
+        self.duration = duration
+        self.rows = rows
+
+
+class RequestStats:
+    """SQL statements a request ran and the time they took, filled in by the listeners of instrument_engine.
+
+    A traced request also keeps each statement's duration and row count, and the time spent in its named phases.
+    """
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_time = 0.0
+        self.route: str | None = None
+        self.trace: list[StatementTrace] | None = None
+        self.phases: dict[str, float] = {}
+
+
+# Set per request by the metrics middleware or a traced route; None outside of one, where the listeners only log slow
+# queries.
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the named phase of the current request, if it is traced."""
+    stats = request_stats.get()
+    if stats is None or stats.trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """The types of bound parameters, never their values; for executemany, the row count and the first row's types."""
+    if executemany:
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0]) if parameters else None}
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters)
+
+
+def _log_slow_query(
+    statement: str, parameters: Any, executemany: bool, duration: float, rows: int, route: str | None
+) -> None:
+    entry = {
+        "event": "slow_query",
+        "duration_ms": round(duration * 1000, 3),
+        "rows": rows,
+        "route": route,
+        "statement": statement[:SLOW_QUERY_STATEMENT_MAX_LENGTH],
+        "parameters": parameter_shape(parameters, executemany),
+    }
+    slow_query_log.warning(pydantic_core.to_json(entry).decode())
+
+
+def _before_cursor_execute(conn: Connection, *args: Any) -> None:
+    if request_stats.get() is not None or config.SLOW_QUERY_LOG_MS:
+        conn.info["statement_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection, cursor: DBAPICursor, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    started = conn.info.pop("statement_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+
+    stats = request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += duration
+        if stats.trace is not None:
+            stats.trace.append(StatementTrace(duration, cursor.rowcount))
+
+    if config.SLOW_QUERY_LOG_MS and duration * 1000 >= config.SLOW_QUERY_LOG_MS:
+        route = stats.route if stats is not None else None
+        _log_slow_query(statement, parameters, executemany, duration, cursor.rowcount, route)
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,69 @@
+"""Money as integer minor units (cents).
+
+Amounts cross the API as decimals and are converted at the edges. Line totals, receipt totals, storage and rendering
+all work on integers.
+
+Amounts with sub-cent digits are accepted and rounded to the cent, half up (away from zero). An amount is written back
+with the decimal places it came with ("10.5" stays "10.5"), unless rounding changed it; then it gets two.
+"""
+
+from decimal import Decimal
+
+MINOR_UNITS = 100
+DECIMAL_PLACES = 2
+
+
+def _round_half_up(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded to the nearest integer, halves away from zero."""
+    if numerator < 0:
+        return -_round_half_up(-numerator, denominator)
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def to_minor(amount: Decimal) -> int:
+    """Decimal amount to minor units, rounding sub-cent digits half up (away from zero)."""
+    numerator, denominator = amount.as_integer_ratio()
+    if MINOR_UNITS % denominator == 0:
+        return numerator * (MINOR_UNITS // denominator)
+    return _round_half_up(numerator * MINOR_UNITS, denominator)
+
+
+def from_minor(minor: int, places: int = DECIMAL_PLACES) -> Decimal:
+    """Minor units to a Decimal with the given places, two by default: 2100 -> Decimal("21.00")."""
+    amount = Decimal(minor).scaleb(-DECIMAL_PLACES)
+    return amount if places == DECIMAL_PLACES else amount.quantize(Decimal(1).scaleb(-places))
+
+
+def decimal_places(amount: Decimal) -> int:
+    """Digits after the point as the amount is written: 1 for Decimal("10.5"), 0 for Decimal("10")."""
+    exponent = amount.as_tuple().exponent
+    return -exponent if isinstance(exponent, int) and exponent < 0 else 0
+
+
+def minor_places(amount: Decimal, minor: int) -> int:
+    """Places to write minor with so that it reads like amount: amount's own, or two if converting it rounded."""
+    return decimal_places(amount) if from_minor(minor) == amount else DECIMAL_PLACES
+
+
+def format_minor(minor: int, grouping: bool = False, places: int = DECIMAL_PLACES) -> str:
+    """Minor units as a decimal string ("1234.50", or "1,234.50" with grouping), without going through Decimal.
+
+    With fewer than two places, the dropped digits must be zeros (see minor_places): format_minor(1050, places=1) is
+    "10.5".
+    """
+    if minor < 0:
+        return "-" + format_minor(-minor, grouping, places)
+    units, cents = divmod(minor, MINOR_UNITS)
+    fraction = f"{cents:02d}"[:places] + "0" * (places - DECIMAL_PLACES)
+    number = f"{units:,}" if grouping else str(units)
+    return f"{number}.{fraction}" if fraction else number
+
+
+def line_total_minor(price_minor: int, quantity: Decimal) -> int:
+    """price x quantity in minor units, rounded to the nearest minor unit with halves away from zero.
+
+    Quantities may be fractional (weights), so the exact product is computed from the quantity's integer ratio and
+    rounded once per line; receipt totals are plain sums of the rounded lines.
+    """
+    numerator, denominator = quantity.as_integer_ratio()
+    return _round_half_up(price_minor * numerator, denominator)
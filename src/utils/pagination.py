@@ -0,0 +1,26 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+# Receipt ids are INTEGER; a cursor id outside that range can't come from a receipt and would fail in the database.
+MIN_CURSOR_ID = -(2**31)
+MAX_CURSOR_ID = 2**31 - 1
+
+
+def encode_cursor(created_at: datetime, receipt_id: int) -> str:
+    payload = f"{created_at.isoformat()}|{receipt_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at_text, receipt_id_text = payload.split("|")
+        created_at, receipt_id = datetime.fromisoformat(created_at_text), int(receipt_id_text)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from None
+
+    if created_at.tzinfo is None or not MIN_CURSOR_ID <= receipt_id <= MAX_CURSOR_ID:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return created_at, receipt_id
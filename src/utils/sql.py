@@ -0,0 +1,29 @@
+from typing import Any
+
+from sqlalchemy import ClauseElement, Executable
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement; the result is a single JSON document.
+
+    With analyze, the statement is run and each plan node also has the rows it returned and the times it was executed.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement, analyze: bool = False) -> None:
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) {compiler.process(element.statement, **kw)}"
+
+
+def escape_like(value: str, escape: str = "\\") -> str:
+    """Escape LIKE wildcards so the value only matches itself."""
+    return value.replace(escape, escape * 2).replace("%", escape + "%").replace("_", escape + "_")
@@ -0,0 +1,58 @@
+from typing import Callable, Coroutine
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from src.config import config
+from src.utils.metrics import RequestStats, request_stats
+
+
+def server_timing(stats: RequestStats) -> str:
+    """The Server-Timing header value of a traced request, in milliseconds.
+
+    auth includes the lookup of the user, whose statement db counts as well.
+    """
+    rows = sum(statement.rows for statement in stats.trace or () if statement.rows > 0)
+    return ", ".join(
+        [
+            f"auth;dur={stats.phases.get('auth', 0.0) * 1000:.3f}",
+            f'db;dur={stats.db_time * 1000:.3f};desc="statements={stats.statements} rows={rows}"',
+            f"serialize;dur={stats.phases.get('serialize', 0.0) * 1000:.3f}",
+        ]
+    )
+
+
+class TracedRoute(APIRoute):
+    """A route whose requests are traced when TRACING_ENABLED is on, and whose slow statements are logged with it.
+
+    The Server-Timing header is added to the responses the route returns; error responses built by exception
+    handlers go out without it. A streamed response's header only covers the work done before streaming.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            if not config.TRACING_ENABLED and not config.SLOW_QUERY_LOG_MS:
+                return await handler(request)
+
+            stats = request_stats.get()
+            token = None
+            if stats is None:
+                stats = RequestStats()
+                token = request_stats.set(stats)
+            stats.route = f"{request.method} {self.path}"
+            if config.TRACING_ENABLED:
+                stats.trace = []
+
+            try:
+                response = await handler(request)
+            finally:
+                if token is not None:
+                    request_stats.reset(token)
+
+            if config.TRACING_ENABLED:
+                response.headers["Server-Timing"] = server_timing(stats)
+            return response
+
+        return traced_handler
@@ -9,12 +9,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, sessionmaker
 
 from src.config import Config
-from src.db import get_db
+from src.db import get_db, get_replica_db, recent_writers
+from src.dependencies.auth import get_read_db
+from src.dependencies.idempotency import get_idempotency_store
 from src.main import app
-from src.models import Base, User
+from src.models import Base, PaymentType, Receipt, User
 from src.schemas.auth import UserRegisterData
-from src.utils.auth import get_password_hash
-from tests.utils.helpers import create_auth_headers
+from src.services.idempotency import MemoryIdempotencyStore
+from src.services.principals import principal_cache
+from src.services.receipt_items import product_name_ids
+from src.services.rendering import render_cache
+from src.utils.auth import get_password_hash, token_cache
+from tests.utils.helpers import AsyncResultStub, create_auth_headers
 
 
 class TestConfig(Config):
@@ -53,7 +59,7 @@ def test_db(test_config: Config) -> Generator[Session]:
             yield session
         finally:
             session.rollback()
-            session.execute(text("TRUNCATE TABLE receipts, users RESTART IDENTITY CASCADE"))
+            session.execute(text("TRUNCATE TABLE receipts, users, product_names RESTART IDENTITY CASCADE"))
             session.commit()
 
 
@@ -62,9 +68,10 @@ def client(test_db: Session) -> Generator[TestClient]:
     async def override_get_db() -> AsyncGenerator[AsyncMock]:
         mock_session = AsyncMock(spec=AsyncSession)
 
-        mock_session.scalar = AsyncMock(side_effect=lambda query: test_db.scalar(query))
-        mock_session.execute = AsyncMock(side_effect=lambda query: test_db.execute(query))
-        mock_session.scalars = AsyncMock(side_effect=lambda query: test_db.scalars(query))
+        mock_session.scalar = AsyncMock(side_effect=lambda query, *args: test_db.scalar(query, *args))
+        mock_session.execute = AsyncMock(side_effect=lambda query, *args: test_db.execute(query, *args))
+        mock_session.scalars = AsyncMock(side_effect=lambda query, *args: test_db.scalars(query, *args))
+        mock_session.stream = AsyncMock(side_effect=lambda query: AsyncResultStub(test_db.execute(query)))
         mock_session.get = AsyncMock(side_effect=lambda model, id_: test_db.get(model, id_))
         mock_session.add = test_db.add
         mock_session.commit = AsyncMock(side_effect=lambda: test_db.commit())
@@ -72,7 +79,17 @@ def client(test_db: Session) -> Generator[TestClient]:
 
         yield mock_session
 
+    idempotency_store = MemoryIdempotencyStore(maxsize=100, ttl=60)
+    render_cache.clear()
+    product_name_ids.clear()
+    recent_writers.clear()
+    principal_cache.clear()
+    token_cache.clear()
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_replica_db] = override_get_db
+    app.dependency_overrides[get_idempotency_store] = lambda: idempotency_store
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -106,3 +123,17 @@ def auth_headers(client: TestClient, existing_user_data: UserRegisterData) -> di
     token = response.json()["access_token"]
 
     return create_auth_headers(token)
+
+
+@pytest.fixture
+def receipt(test_db: Session, existing_user: User) -> Receipt:
+    receipt = Receipt(
+        user_id=existing_user.id,
+        products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+        total_minor=1000,
+        payment_type=PaymentType.CASH,
+        payment_minor=1500,
+    )
+    test_db.add(receipt)
+    test_db.flush()
+    return receipt
@@ -1,10 +1,26 @@
-from fastapi import status
+import asyncio
+import time
+
+import bcrypt
+import pytest
+from fastapi import HTTPException, status
 from fastapi.testclient import TestClient
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from src.config import config
 from src.models import User
 from src.schemas.auth import UserRegisterData
+from src.services.principals import principal_cache
+from src.utils.auth import (
+    PasswordHasher,
+    get_data_from_token,
+    get_password_hash,
+    password_hasher,
+    password_needs_rehash,
+    token_cache,
+)
+from src.utils.tokens import create_access_token
 
 
 class TestAuthRegister:
@@ -74,6 +90,32 @@ class TestAuthLogin:
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
+    def test_login_rehashes_password_of_other_cost(
+        self, test_db: Session, client: TestClient, existing_user: User, existing_user_data: UserRegisterData
+    ):
+        password = existing_user_data.password.encode()
+        existing_user.password = bcrypt.hashpw(password, bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS + 1)).decode()
+        test_db.flush()
+        form_data = {"username": existing_user_data.email, "password": existing_user_data.password}
+
+        response = client.post("/auth/token", data=form_data)
+
+        assert response.status_code == status.HTTP_200_OK
+        stored = test_db.scalars(select(User.password).where(User.id == existing_user.id)).one()
+        assert not password_needs_rehash(stored)
+        assert bcrypt.checkpw(password, stored.encode())
+
+    def test_login_keeps_password_of_configured_cost(
+        self, test_db: Session, client: TestClient, existing_user: User, existing_user_data: UserRegisterData
+    ):
+        stored = existing_user.password
+        form_data = {"username": existing_user_data.email, "password": existing_user_data.password}
+
+        response = client.post("/auth/token", data=form_data)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert test_db.scalars(select(User.password).where(User.id == existing_user.id)).one() == stored
+
 
 class TestAuthMe:
     def test_get_current_user_success(self, client: TestClient, existing_user: User, auth_headers: dict):
@@ -100,3 +142,123 @@ class TestAuthMe:
         response = client.get("/auth/me", headers=headers)
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestPrincipalCache:
+    def test_repeated_requests_use_cache(self, client: TestClient, existing_user: User, auth_headers: dict):
+        principal_cache.hits = principal_cache.misses = 0
+
+        for _ in range(3):
+            assert client.get("/auth/me", headers=auth_headers).status_code == status.HTTP_200_OK
+
+        assert (principal_cache.misses, principal_cache.hits) == (1, 2)
+
+    def test_user_update_invalidates_cache(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        client.get("/auth/me", headers=auth_headers)
+
+        existing_user.name = "Renamed User"
+        test_db.flush()
+        response = client.get("/auth/me", headers=auth_headers)
+
+        assert response.json()["name"] == "Renamed User"
+
+    def test_user_delete_invalidates_cache(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        client.get("/auth/me", headers=auth_headers)
+
+        test_db.delete(existing_user)
+        test_db.flush()
+        response = client.get("/auth/me", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_user_id_routes_skip_lookup(self, client: TestClient, existing_user: User, auth_headers: dict):
+        principal_cache.hits = principal_cache.misses = 0
+
+        response = client.post("/receipts/search", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (principal_cache.misses, principal_cache.hits) == (0, 0)
+
+
+class TestTokenCache:
+    @pytest.fixture(autouse=True)
+    def empty_token_cache(self):
+        token_cache.clear()
+        token_cache.hits = token_cache.misses = 0
+
+    def test_verified_token_is_cached(self):
+        token = create_access_token("user@example.com", 1)
+
+        first = get_data_from_token(token)
+        second = get_data_from_token(token)
+
+        assert first == second
+        assert (token_cache.misses, token_cache.hits) == (1, 1)
+
+    def test_entry_expires_with_token(self, monkeypatch: pytest.MonkeyPatch):
+        token = create_access_token("user@example.com", 1)
+        get_data_from_token(token)
+        after_expiry = time.monotonic() + config.JWT_ACCESS_TOKEN_EXPIRE_HOURS * 3600 + 1
+        monkeypatch.setattr(time, "monotonic", lambda: after_expiry)
+
+        get_data_from_token(token)
+
+        assert (token_cache.misses, token_cache.hits) == (2, 0)
+
+    def test_secret_change_invalidates_cache(self, monkeypatch: pytest.MonkeyPatch):
+        token = create_access_token("user@example.com", 1)
+        get_data_from_token(token)
+        monkeypatch.setattr(config, "JWT_SECRET_KEY", "rotated-secret")
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_data_from_token(token)
+
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_invalid_token_is_not_cached(self):
+        with pytest.raises(HTTPException):
+            get_data_from_token("not-a-token")
+
+        assert len(token_cache) == 0
+
+
+class TestPasswordHasher:
+    async def test_hash_and_verify(self):
+        hasher = PasswordHasher(concurrency=1, max_queue=0)
+
+        hashed = await hasher.hash("password123")
+
+        assert await hasher.verify("password123", hashed) is True
+        assert await hasher.verify("wrong", hashed) is False
+        assert hasher.pending == 0
+
+    async def test_rejects_calls_beyond_queue(self):
+        hasher = PasswordHasher(concurrency=1, max_queue=1)
+        hashed = get_password_hash("password123")
+        running = [asyncio.create_task(hasher.verify("password123", hashed)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await hasher.verify("password123", hashed)
+
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert await asyncio.gather(*running) == [True, True]
+
+    def test_login_sheds_load(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        client: TestClient,
+        existing_user: User,
+        existing_user_data: UserRegisterData,
+    ):
+        monkeypatch.setattr(password_hasher, "pending", password_hasher.concurrency + password_hasher.max_queue)
+        form_data = {"username": existing_user_data.email, "password": existing_user_data.password}
+
+        response = client.post("/auth/token", data=form_data)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,166 @@
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from src import db
+from src.config import Config
+from src.db import get_replica_db, is_replica, read_session, recent_writers, record_write, session
+from src.main import app
+from src.models import Receipt, User
+from src.utils.cache import LRUCache
+
+
+@pytest.fixture
+def replica_session(monkeypatch: pytest.MonkeyPatch) -> object:
+    replica = object()
+    monkeypatch.setattr(db, "replica_session", replica)
+    recent_writers.clear()
+    return replica
+
+
+@pytest.fixture
+def lagging_replica(client: TestClient) -> AsyncMock:
+    """A replica the test database's rows have not reached yet."""
+    replica = AsyncMock(spec=AsyncSession)
+    replica.scalar = AsyncMock(return_value=None)
+    replica.execute = AsyncMock(return_value=[])
+
+    async def override_get_replica_db() -> AsyncGenerator[AsyncMock]:
+        yield replica
+
+    app.dependency_overrides[get_replica_db] = override_get_replica_db
+    return replica
+
+
+def use_replica_engine(engine: AsyncEngine) -> None:
+    async def override_get_replica_db() -> AsyncGenerator[AsyncSession]:
+        async with AsyncSession(engine) as replica:
+            yield replica
+
+    app.dependency_overrides[get_replica_db] = override_get_replica_db
+
+
+@pytest.fixture
+def separate_replica(client: TestClient, test_config: Config) -> AsyncEngine:
+    """A real replica on its own connections: rows the test has not committed have not reached it."""
+    replica_engine = create_async_engine(test_config.database_url, poolclass=NullPool)
+    use_replica_engine(replica_engine)
+    return replica_engine
+
+
+@pytest.fixture
+def replica_is_primary(monkeypatch: pytest.MonkeyPatch, client: TestClient, test_config: Config) -> AsyncEngine:
+    """No replica configured: the replica session is a real session on the primary engine."""
+    primary_engine = create_async_engine(test_config.database_url, poolclass=NullPool)
+    monkeypatch.setattr(db, "engine", primary_engine)
+    use_replica_engine(primary_engine)
+    return primary_engine
+
+
+class TestReadReplicaRouting:
+    def test_reads_use_replica(self, replica_session: object):
+        assert read_session(1) is replica_session
+
+    def test_reads_after_write_use_primary(self, replica_session: object):
+        record_write(1)
+
+        assert read_session(1) is session
+        assert read_session(2) is replica_session
+
+    def test_reads_return_to_replica_after_window(self, monkeypatch: pytest.MonkeyPatch, replica_session: object):
+        monkeypatch.setattr(db, "recent_writers", LRUCache(10, ttl=0))
+
+        record_write(1)
+
+        assert read_session(1) is replica_session
+
+    def test_create_receipt_records_write(self, client: TestClient, existing_user: User, auth_headers: dict):
+        response = client.post(
+            "/receipts/create",
+            json={
+                "products": [{"name": "Product", "price": "10.00", "quantity": "1"}],
+                "payment": {"type": "cash", "amount": "10.00"},
+            },
+            headers=auth_headers,
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert recent_writers.get(existing_user.id) is True
+
+    def test_register_records_write(self, test_db: Session, client: TestClient):
+        response = client.post(
+            "/auth/register", json={"name": "New User", "email": "new_user@example.com", "password": "password123"}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        user_id = test_db.scalars(select(User.id).where(User.email == "new_user@example.com")).one()
+        assert recent_writers.get(user_id) is True
+
+
+class TestPublicReceiptReplicaFallback:
+    def test_public_receipt_missing_on_replica(self, client: TestClient, lagging_replica: AsyncMock, receipt: Receipt):
+        response = client.get(f"/receipts/{receipt.id}/public")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Test Product" in response.text
+        lagging_replica.scalar.assert_awaited_once()
+
+    def test_render_batch_missing_on_replica(self, client: TestClient, lagging_replica: AsyncMock, receipt: Receipt):
+        response = client.post("/receipts/public/render-batch", json={"receipt_ids": [receipt.id]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Test Product" in response.text
+        lagging_replica.execute.assert_awaited_once()
+
+    def test_public_receipt_not_found(self, client: TestClient, lagging_replica: AsyncMock):
+        response = client.get("/receipts/999/public")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestPublicReceiptRealReplica:
+    async def test_is_replica(self, separate_replica: AsyncEngine, replica_is_primary: AsyncEngine):
+        async with AsyncSession(separate_replica) as replica, AsyncSession(replica_is_primary) as primary:
+            assert is_replica(replica) is True
+            assert is_replica(primary) is False
+
+    def test_public_receipt_falls_back_to_primary(
+        self, client: TestClient, separate_replica: AsyncEngine, receipt: Receipt
+    ):
+        single = client.get(f"/receipts/{receipt.id}/public")
+        batch = client.post("/receipts/public/render-batch", json={"receipt_ids": [receipt.id]})
+
+        assert single.status_code == status.HTTP_200_OK
+        assert batch.status_code == status.HTTP_200_OK
+        assert "Test Product" in single.text
+        assert "Test Product" in batch.text
+
+    def test_public_receipt_read_from_primary_session(
+        self, test_db: Session, client: TestClient, replica_is_primary: AsyncEngine, receipt: Receipt
+    ):
+        test_db.commit()
+
+        single = client.get(f"/receipts/{receipt.id}/public")
+        batch = client.post("/receipts/public/render-batch", json={"receipt_ids": [receipt.id]})
+
+        assert single.status_code == status.HTTP_200_OK
+        assert batch.status_code == status.HTTP_200_OK
+        assert "Test Product" in single.text
+        assert "Test Product" in batch.text
+
+    def test_public_receipt_missing_from_primary_session_is_not_looked_up_again(
+        self, client: TestClient, replica_is_primary: AsyncEngine, receipt: Receipt
+    ):
+        # The receipt is uncommitted, so only the test's own session sees it; with no replica there is no second lookup.
+        single = client.get(f"/receipts/{receipt.id}/public")
+        batch = client.post("/receipts/public/render-batch", json={"receipt_ids": [receipt.id]})
+
+        assert single.status_code == status.HTTP_404_NOT_FOUND
+        assert batch.status_code == status.HTTP_404_NOT_FOUND
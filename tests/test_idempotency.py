@@ -0,0 +1,88 @@
+import asyncio
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from src.config import Config
+from src.models import User
+from src.services.idempotency import MemoryIdempotencyStore, PostgresIdempotencyStore
+
+
+class TestMemoryIdempotencyStore:
+    async def test_concurrent_duplicate_waits_for_first_request(self):
+        store = MemoryIdempotencyStore(maxsize=10, ttl=60)
+        db = AsyncMock(spec=AsyncSession)
+        created = []
+
+        async def create(receipt_id: int) -> dict:
+            async with store.reserve(db, 1, "key", "fingerprint") as reservation:
+                if reservation.response is not None:
+                    return reservation.response
+                await asyncio.sleep(0.01)
+                created.append(receipt_id)
+                await store.save(db, reservation, {"id": receipt_id})
+                return {"id": receipt_id}
+
+        first, second = await asyncio.gather(create(1), create(2))
+
+        assert created == [1]
+        assert first == second == {"id": 1}
+
+    async def test_failed_request_releases_key(self):
+        store = MemoryIdempotencyStore(maxsize=10, ttl=60)
+        db = AsyncMock(spec=AsyncSession)
+
+        with pytest.raises(RuntimeError):
+            async with store.reserve(db, 1, "key", "fingerprint") as reservation:
+                await store.save(db, reservation, {"id": 1})
+                raise RuntimeError("commit failed")
+
+        async with store.reserve(db, 1, "key", "fingerprint") as reservation:
+            assert reservation.response is None
+
+    async def test_least_recently_used_key_is_evicted(self):
+        store = MemoryIdempotencyStore(maxsize=1, ttl=60)
+        db = AsyncMock(spec=AsyncSession)
+
+        for key in ["first", "second"]:
+            async with store.reserve(db, 1, key, "fingerprint") as reservation:
+                await store.save(db, reservation, {"key": key})
+
+        async with store.reserve(db, 1, "first", "fingerprint") as reservation:
+            assert reservation.response is None
+
+
+@pytest.fixture
+async def async_session(test_config: Config) -> AsyncGenerator[async_sessionmaker[AsyncSession]]:
+    engine = create_async_engine(test_config.database_url, poolclass=NullPool)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+class TestPostgresIdempotencyStore:
+    async def test_concurrent_duplicate_waits_for_first_request(
+        self, test_db: Session, existing_user: User, async_session: async_sessionmaker[AsyncSession]
+    ):
+        test_db.commit()
+        store = PostgresIdempotencyStore(max_keys_per_user=10, ttl=60, purge_interval=60)
+        created = []
+
+        async def create(receipt_id: int) -> dict:
+            async with async_session() as db, store.reserve(db, existing_user.id, "key", "fingerprint") as reservation:
+                if reservation.response is not None:
+                    await db.commit()
+                    return reservation.response
+                await asyncio.sleep(0.1)
+                created.append(receipt_id)
+                await store.save(db, reservation, {"id": receipt_id})
+                await db.commit()
+                return {"id": receipt_id}
+
+        first, second = await asyncio.gather(create(1), create(2))
+
+        assert len(created) == 1
+        assert first == second == {"id": created[0]}
@@ -0,0 +1,111 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from src.config import Config, config
+from src.db import MeteredPool, create_engine, pool_stats
+from src.models import Receipt
+from src.services.metrics import UNMATCHED_ROUTE, route_metrics
+from src.utils.metrics import instrument_engine
+
+
+@pytest.fixture
+def metrics_enabled(monkeypatch: pytest.MonkeyPatch, test_db: Session) -> None:
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    instrument_engine(test_db.get_bind().engine)
+    route_metrics.clear()
+
+
+class TestPoolStats:
+    def test_metrics_disabled_by_default(self, client: TestClient):
+        response = client.get("/metrics/pool")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_get_pool_stats(self, monkeypatch: pytest.MonkeyPatch, client: TestClient):
+        monkeypatch.setattr(config, "METRICS_ENABLED", True)
+
+        response = client.get("/metrics/pool")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["primary"]["size"] == config.DB_POOL_SIZE
+        assert data["primary"]["checkout_wait"]["buckets"][-1]["le"] is None
+        assert data["replica"] is None
+
+    async def test_pool_stats_track_checkouts_and_timeouts(self, test_config: Config):
+        engine = create_async_engine(
+            test_config.database_url, poolclass=MeteredPool, pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        try:
+            async with engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    await engine.connect()
+
+                stats = pool_stats(engine)
+        finally:
+            await engine.dispose()
+
+        assert (stats.checked_out, stats.overflow, stats.timeouts) == (1, 0, 1)
+        assert stats.checkout_wait.count == 2
+        assert stats.checkout_wait.buckets[-1].count == 2
+        assert stats.checkout_wait.sum >= 0.05
+
+    async def test_statement_timeout(self, monkeypatch: pytest.MonkeyPatch, test_config: Config):
+        monkeypatch.setattr(config, "DB_STATEMENT_TIMEOUT_MS", 50)
+        engine = create_engine(test_config.database_url)
+        try:
+            async with engine.connect() as connection:
+                with pytest.raises(exc.OperationalError, match="statement timeout"):
+                    await connection.execute(text("SELECT pg_sleep(1)"))
+        finally:
+            await engine.dispose()
+
+
+class TestRequestMetrics:
+    def test_not_recorded_when_disabled(self, client: TestClient, receipt: Receipt, auth_headers: dict):
+        route_metrics.clear()
+
+        client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        assert route_metrics == {}
+
+    def test_records_route_status_and_statements(
+        self, metrics_enabled: None, client: TestClient, receipt: Receipt, auth_headers: dict
+    ):
+        client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+        client.get("/receipts/999", headers=auth_headers)
+
+        metrics = route_metrics["GET", "/receipts/{receipt_id}"]
+        assert metrics.responses == {200: 1, 404: 1}
+        assert metrics.duration.count == 2
+        assert metrics.db_statements.sum >= 2
+        assert metrics.db_time.sum > 0
+
+    def test_unmatched_routes_share_a_label(self, metrics_enabled: None, client: TestClient):
+        client.get("/no-such-route")
+        client.get("/another/missing/route")
+
+        assert route_metrics["GET", UNMATCHED_ROUTE].responses == {404: 2}
+
+    def test_prometheus_text(self, metrics_enabled: None, client: TestClient, receipt: Receipt, auth_headers: dict):
+        client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        lines = response.text.splitlines()
+        assert 'http_requests_total{method="GET",route="/receipts/{receipt_id}",status="200"} 1' in lines
+        assert 'http_request_duration_seconds_count{method="GET",route="/receipts/{receipt_id}"} 1' in lines
+        assert 'http_request_db_statements_bucket{method="GET",route="/receipts/{receipt_id}",le="+Inf"} 1' in lines
+        assert f'db_pool_size{{database="primary"}} {config.DB_POOL_SIZE}' in lines
+        assert "# TYPE db_pool_checkout_wait_seconds histogram" in lines
+
+    def test_prometheus_disabled(self, client: TestClient):
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,312 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Generator
+
+import pytest
+from sqlalchemy import Select, delete, select, text
+from sqlalchemy.orm import Session
+
+from src.models import PaymentType, Receipt, ReceiptItem, User
+from src.schemas.receipts import ProductNameMatch, ReceiptFilters
+from src.services.partitions import add_months, ensure_receipt_partitions, is_receipt_partition, receipt_partition_name
+from src.services.receipt_items import build_product_receipt_ids_query, build_receipts_with_items_query
+from src.services.receipts import (
+    build_count_estimate_query,
+    build_count_query,
+    build_receipt_query,
+    build_receipts_query,
+    build_search_page_query,
+    paginate_receipts_query,
+    project_receipt_list_query,
+)
+from src.utils.sql import Explain
+
+SEED_USERS = 50
+SEED_RECEIPTS_PER_USER = 400
+SEED_PRODUCT_NAMES = 20_000
+
+
+@pytest.fixture
+def seeded_db(test_db: Session) -> Session:
+    test_db.execute(
+        text(
+            "INSERT INTO users (name, email, password) "
+            "SELECT 'User ' || g, 'user_' || g || '@example.com', 'hash' FROM generate_series(1, :users) g"
+        ),
+        {"users": SEED_USERS},
+    )
+    test_db.execute(
+        text(
+            "INSERT INTO receipts (user_id, products, total_minor, payment_type, payment_minor, created_at) "
+            "SELECT u.id, CAST('{\"items\": []}' AS json), (g % 500) * 100 + 99, "
+            "CAST(CASE WHEN g % 2 = 0 THEN 'cash' ELSE 'card' END AS payment_types), 100000, "
+            "now() - g * interval '1 hour' "
+            "FROM users u CROSS JOIN generate_series(1, :receipts) g"
+        ),
+        {"receipts": SEED_RECEIPTS_PER_USER},
+    )
+    test_db.execute(
+        text("INSERT INTO product_names (name) SELECT 'Product ' || g FROM generate_series(1, :names) g"),
+        {"names": SEED_PRODUCT_NAMES},
+    )
+    test_db.execute(
+        text(
+            "INSERT INTO receipt_items "
+            "(receipt_id, receipt_created_at, position, product_name_id, price_minor, quantity, total_minor) "
+            "SELECT r.id, r.created_at, 0, (r.id % :names) + 1, 100, 1, 100 FROM receipts r"
+        ),
+        {"names": SEED_PRODUCT_NAMES},
+    )
+    test_db.commit()
+    test_db.execute(text("ANALYZE users, receipts, product_names, receipt_items"))
+
+    return test_db
+
+
+def create_partitions(db: Session, first_month: date, last_month: date) -> list[str]:
+    # Partition maintenance runs its own transactions, so it gets a connection of its own.
+    with db.connection().engine.connect() as connection:
+        return ensure_receipt_partitions(connection, first_month, last_month)
+
+
+@pytest.fixture
+def partitioned_db(seeded_db: Session) -> Generator[tuple[Session, list[str]]]:
+    """The seeded receipts moved out of receipts_default into monthly partitions."""
+    seeded_db.commit()
+    now = datetime.now(timezone.utc)
+    # A month before the oldest receipt too, so that there is always more than one partition.
+    first_month = add_months((now - timedelta(hours=SEED_RECEIPTS_PER_USER)).date().replace(day=1), -1)
+    partitions = create_partitions(seeded_db, first_month, now.date().replace(day=1))
+    seeded_db.execute(text("ANALYZE receipts, receipt_items"))
+
+    yield seeded_db, partitions
+
+    # A partition referenced by a foreign key can only be dropped once detached, and detached once nothing refers to it.
+    seeded_db.rollback()
+    seeded_db.execute(text("TRUNCATE TABLE receipts, users, product_names RESTART IDENTITY CASCADE"))
+    for partition in partitions:
+        seeded_db.execute(text(f"ALTER TABLE receipts DETACH PARTITION {partition}"))
+        seeded_db.execute(text(f"DROP TABLE {partition}"))
+    seeded_db.commit()
+
+
+def explain(db: Session, query: Select | Explain, analyze: bool = False) -> dict:
+    statement = query if isinstance(query, Explain) else Explain(query, analyze)
+    return db.scalars(statement).one()[0]["Plan"]
+
+
+def table_name(relation: str) -> str:
+    return "receipts" if is_receipt_partition(relation) else relation
+
+
+def seq_scanned_relations(plan: dict) -> list[str]:
+    relations = [table_name(plan["Relation Name"])] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        relations.extend(seq_scanned_relations(child))
+    return relations
+
+
+def scanned_relations(plan: dict) -> set[str]:
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def executed_partition_scans(plan: dict) -> set[tuple[str, str]]:
+    """Node types and receipt partitions of the scans that ran; those pruned while the statement ran never do."""
+    relation = plan.get("Relation Name", "")
+    scans = {(plan["Node Type"], relation)} if is_receipt_partition(relation) and plan["Actual Loops"] > 0 else set()
+    for child in plan.get("Plans", []):
+        scans |= executed_partition_scans(child)
+    return scans
+
+
+def executed_partitions(plan: dict) -> set[str]:
+    return {partition for _, partition in executed_partition_scans(plan)}
+
+
+def receipt_partition(db: Session, receipt_id: int) -> str:
+    return db.scalars(text("SELECT CAST(tableoid AS regclass) FROM receipts WHERE id = :id"), {"id": receipt_id}).one()
+
+
+def page_plan(plan: dict) -> dict:
+    """The node of the page in a plan of build_search_page_query: the only LIMIT, the count has none."""
+    if plan["Node Type"] == "Limit":
+        return plan
+    return next(page_plan(child) for child in plan.get("Plans", []) if "Limit" in str(child))
+
+
+def scanned_indexes(db: Session, plan: dict) -> list[str | None]:
+    """The indexes the plan reads through, by the name of the table's index rather than the partition's; None for each
+    sequential scan of receipts."""
+    indexes: list[str | None] = []
+    if "Index Name" in plan:
+        # Partitions have indexes of their own, each attached to an index of the partitioned table.
+        indexes.append(
+            db.scalar(
+                text(
+                    "SELECT CAST(CAST(coalesce(i.inhparent, x.indexrelid) AS regclass) AS text) FROM pg_index x "
+                    "LEFT JOIN pg_inherits i ON i.inhrelid = x.indexrelid WHERE x.indexrelid = CAST(:name AS regclass)"
+                ),
+                {"name": plan["Index Name"]},
+            )
+        )
+    elif plan["Node Type"] == "Seq Scan" and is_receipt_partition(plan["Relation Name"]):
+        indexes.append(None)
+    for child in plan.get("Plans", []):
+        indexes.extend(scanned_indexes(db, child))
+    return indexes
+
+
+AFTER = (datetime.now(timezone.utc) - timedelta(days=5), 1_000_000)
+
+
+def search_page_queries(user_id: int, filters: ReceiptFilters | None) -> list[Select]:
+    query = build_receipts_query(user_id, filters)
+    return [
+        build_search_page_query(query, 10),
+        build_search_page_query(query, 10, page=10),
+        build_search_page_query(query, 10, after=AFTER),
+    ]
+
+
+def search_queries(user_id: int, filters: ReceiptFilters | None) -> list[Select | Explain]:
+    query = build_receipts_query(user_id, filters)
+    list_query = project_receipt_list_query(query)
+    return [
+        build_count_query(query),
+        build_count_estimate_query(query),
+        paginate_receipts_query(list_query, 11),
+        paginate_receipts_query(list_query, 11, offset=100),
+        paginate_receipts_query(list_query, 11, after=AFTER),
+        *search_page_queries(user_id, filters),
+    ]
+
+
+SEARCH_FILTERS = {
+    "no_filters": None,
+    "date_range": {"date_from": datetime.now(timezone.utc) - timedelta(days=7), "date_to": datetime.now(timezone.utc)},
+    "total_range": {"min_total": Decimal("100"), "max_total": Decimal("120")},
+    "payment_type": {"payment_type": PaymentType.CASH},
+    "product_name": {"product_name": "duct 1234"},
+    "product_name_prefix": {"product_name": "Product 1234", "product_name_match": "prefix"},
+    "all_filters": {
+        "date_from": datetime.now(timezone.utc) - timedelta(days=7),
+        "min_total": Decimal("10"),
+        "payment_type": PaymentType.CARD,
+    },
+}
+
+# The index the page of each search reads first.
+SEARCH_PAGE_INDEXES = {
+    "no_filters": "ix_receipts_user_id_created_at_id",
+    "date_range": "ix_receipts_user_id_created_at_id",
+    "total_range": "ix_receipts_user_id_total_minor",
+    "payment_type": "ix_receipts_user_id_payment_type_created_at",
+    "product_name": "ix_receipt_items_product_name_id_receipt_id",
+    "product_name_prefix": "ix_receipt_items_product_name_id_receipt_id",
+    "all_filters": "ix_receipts_user_id_payment_type_created_at",
+}
+
+
+class TestReceiptQueryPlans:
+    @pytest.mark.parametrize("filters", SEARCH_FILTERS.values(), ids=SEARCH_FILTERS.keys())
+    def test_search_queries_use_indexes(self, seeded_db: Session, filters: dict | None):
+        user_id = seeded_db.scalars(select(User.id).limit(1)).one()
+        receipt_filters = ReceiptFilters.model_validate(filters) if filters else None
+
+        for query in search_queries(user_id, receipt_filters):
+            scanned = seq_scanned_relations(explain(seeded_db, query))
+            assert "receipts" not in scanned, str(query)
+            assert "receipt_items" not in scanned, str(query)
+
+    @pytest.mark.parametrize("name", SEARCH_PAGE_INDEXES.keys())
+    def test_search_page_uses_search_index(self, seeded_db: Session, name: str):
+        user_id = seeded_db.scalars(select(User.id).limit(1)).one()
+        filters = SEARCH_FILTERS[name]
+        receipt_filters = ReceiptFilters.model_validate(filters) if filters else None
+
+        for query in search_page_queries(user_id, receipt_filters):
+            indexes = scanned_indexes(seeded_db, page_plan(explain(seeded_db, query)))
+            assert SEARCH_PAGE_INDEXES[name] in indexes, str(query)
+            assert None not in indexes, str(query)
+
+    def test_receipt_detail_queries_use_indexes(self, seeded_db: Session):
+        receipt = seeded_db.scalars(select(Receipt).limit(1)).one()
+
+        for query in [build_receipt_query(receipt.id, receipt.user_id), build_receipt_query(receipt.id)]:
+            assert "receipts" not in seq_scanned_relations(explain(seeded_db, query)), str(query)
+
+    def test_product_name_prefix_uses_index(self, seeded_db: Session):
+        query = build_product_receipt_ids_query("Product 1234", ProductNameMatch.PREFIX)
+
+        assert seq_scanned_relations(explain(seeded_db, query)) == []
+
+
+class TestReceiptPartitions:
+    def test_create_partitions_moves_default_receipts_with_items(self, partitioned_db: tuple[Session, list[str]]):
+        db, partitions = partitioned_db
+
+        assert partitions
+        assert db.scalar(text("SELECT count(*) FROM receipts_default")) == 0
+        assert db.scalar(text("SELECT count(*) FROM receipts")) == SEED_USERS * SEED_RECEIPTS_PER_USER
+        assert db.scalar(text("SELECT count(*) FROM receipt_items")) == SEED_USERS * SEED_RECEIPTS_PER_USER
+        assert db.scalar(
+            text("SELECT count(*) FROM receipts WHERE tableoid = CAST(:name AS regclass)"), {"name": partitions[-1]}
+        )
+
+    def test_create_partitions_is_idempotent(self, partitioned_db: tuple[Session, list[str]]):
+        db, partitions = partitioned_db
+        month = datetime.now(timezone.utc).date().replace(day=1)
+        db.commit()
+
+        created = create_partitions(db, month, add_months(month, 1))
+
+        partitions.extend(created)
+        assert created == [receipt_partition_name(add_months(month, 1))]
+
+    def test_date_filters_prune_partitions(self, partitioned_db: tuple[Session, list[str]]):
+        db, partitions = partitioned_db
+        user_id = db.scalars(select(User.id).limit(1)).one()
+        now = datetime.now(timezone.utc)
+        filters = ReceiptFilters.model_validate({"date_from": now.replace(day=1, hour=0, minute=0), "date_to": now})
+
+        for query in search_queries(user_id, filters):
+            plan = explain(db, query)
+            assert scanned_relations(plan) - {"receipt_items"} == {partitions[-1]}, str(query)
+            assert "receipts" not in seq_scanned_relations(plan), str(query)
+
+    def test_receipt_lookup_by_id_probes_one_partition(self, partitioned_db: tuple[Session, list[str]]):
+        db, _ = partitioned_db
+        receipt = db.scalars(select(Receipt).order_by(Receipt.created_at).limit(1)).one()
+
+        for query in [build_receipt_query(receipt.id, receipt.user_id), build_receipt_query(receipt.id)]:
+            plan = explain(db, query, analyze=True)
+            assert executed_partition_scans(plan) == {("Index Scan", receipt_partition(db, receipt.id))}, str(query)
+            assert db.scalars(query).one().id == receipt.id
+
+    def test_receipt_lookup_by_id_without_items_probes_every_partition(self, partitioned_db: tuple[Session, list[str]]):
+        db, partitions = partitioned_db
+        receipt = db.scalars(select(Receipt).limit(1)).one()
+        db.execute(delete(ReceiptItem).where(ReceiptItem.receipt_id == receipt.id))
+
+        query = build_receipt_query(receipt.id)
+
+        assert executed_partitions(explain(db, query, analyze=True)) == {*partitions, "receipts_default"}
+        assert db.scalars(query).one().id == receipt.id
+
+    def test_receipts_with_items_lookup_probes_their_partitions(self, partitioned_db: tuple[Session, list[str]]):
+        db, partitions = partitioned_db
+        oldest, newest = (
+            db.scalars(select(Receipt.id).order_by(order).limit(1)).one()
+            for order in [Receipt.created_at, Receipt.created_at.desc()]
+        )
+        query = build_receipts_with_items_query([oldest, newest])
+
+        assert len(partitions) > 2
+        assert executed_partitions(explain(db, query, analyze=True)) == {
+            receipt_partition(db, oldest),
+            receipt_partition(db, newest),
+        }
+        assert [row.id for row in db.execute(query)] == sorted([oldest, newest])
@@ -1,11 +1,23 @@
-from decimal import Decimal
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
 
 from fastapi import status
 from fastapi.testclient import TestClient
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from src.models import PaymentType, Receipt, User
+from src.dependencies.idempotency import get_idempotency_store
+from src.main import app
+from src.models import IdempotencyKey, PaymentType, ProductName, Receipt, ReceiptItem, User
+from src.schemas.auth import UserRegisterData
+from src.schemas.receipts import ReceiptBulkCreateResponse, ReceiptListResponse, ReceiptResponse
+from src.services.idempotency import PostgresIdempotencyStore
+from src.services.receipt_items import backfill_receipt_items
+from src.services.stats import backfill_daily_stats
+from src.utils.pagination import encode_cursor
+from tests.utils.helpers import default_response_body
 
 
 class TestReceiptCreate:
@@ -35,6 +47,93 @@ class TestReceiptCreate:
         receipt_in_db = test_db.execute(select(Receipt).where(Receipt.id == data["id"])).scalar_one_or_none()
         assert receipt_in_db is not None
         assert receipt_in_db.user_id == existing_user.id
+        assert receipt_in_db.products is None
+        items = test_db.scalars(select(ReceiptItem).order_by(ReceiptItem.position)).all()
+        assert [(item.price_minor, item.quantity, item.total_minor) for item in items] == [
+            (1050, 2, 2100),
+            (500, 1, 500),
+        ]
+
+    def test_create_receipt_rounds_fractional_quantities(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt_data = {
+            "products": [
+                {"name": "Loose tea", "price": "0.10", "quantity": "0.25"},
+                {"name": "Cheese", "price": "1.99", "quantity": "0.333"},
+                {"name": "Bread", "price": "2.5", "quantity": "3"},
+            ],
+            "payment": {"type": PaymentType.CASH, "amount": "10"},
+        }
+
+        response = client.post("/receipts/create", json=receipt_data, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+
+        assert [(p["price"], p["total"]) for p in data["products"]] == [
+            ("0.10", "0.03"),
+            ("1.99", "0.66"),
+            ("2.5", "7.5"),
+        ]
+        assert data["total"] == "8.19"
+        assert data["payment"]["amount"] == "10"
+        assert data["rest"] == "1.81"
+
+        receipt_in_db = test_db.scalars(select(Receipt).where(Receipt.id == data["id"])).one()
+        assert (receipt_in_db.total_minor, receipt_in_db.payment_minor) == (819, 1000)
+        items = test_db.scalars(select(ReceiptItem).order_by(ReceiptItem.position)).all()
+        assert [(item.price_minor, item.total_minor) for item in items] == [(10, 3), (199, 66), (250, 750)]
+
+    def test_create_receipt_rounds_sub_cent_amounts(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt_data = {
+            "products": [{"name": "Test Product", "price": "10.005", "quantity": "1"}],
+            "payment": {"type": PaymentType.CASH, "amount": "15.001"},
+        }
+
+        response = client.post("/receipts/create", json=receipt_data, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert (data["products"][0]["price"], data["products"][0]["total"]) == ("10.01", "10.01")
+        assert (data["total"], data["payment"]["amount"], data["rest"]) == ("10.01", "15.00", "4.99")
+
+        receipt_in_db = test_db.scalars(select(Receipt).where(Receipt.id == data["id"])).one()
+        assert (receipt_in_db.total_minor, receipt_in_db.payment_minor) == (1001, 1500)
+
+    def test_create_receipt_keeps_decimal_places(self, client: TestClient, existing_user: User, auth_headers: dict):
+        receipt_data = {
+            "products": [{"name": "Test Product", "price": "10.5", "quantity": "2"}],
+            "payment": {"type": PaymentType.CASH, "amount": "25"},
+        }
+
+        created = client.post("/receipts/create", json=receipt_data, headers=auth_headers).json()
+        fetched = client.get(f"/receipts/{created['id']}", headers=auth_headers).json()
+
+        assert (created["products"][0]["price"], created["products"][0]["total"]) == ("10.5", "21.0")
+        assert created["payment"]["amount"] == "25"
+        assert (fetched["products"][0]["price"], fetched["products"][0]["total"]) == ("10.5", "21.0")
+
+    def test_create_receipt_rejects_amounts_rounding_to_zero(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for receipt_data in [
+            {
+                "products": [{"name": "Test Product", "price": "0.001", "quantity": "1"}],
+                "payment": {"type": PaymentType.CASH, "amount": "1"},
+            },
+            {
+                "products": [{"name": "Test Product", "price": "0.01", "quantity": "0.1"}],
+                "payment": {"type": PaymentType.CASH, "amount": "0.004"},
+            },
+        ]:
+            response = client.post("/receipts/create", json=receipt_data, headers=auth_headers)
+
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+        assert test_db.scalars(select(Receipt)).all() == []
 
     def test_create_receipt_insufficient_payment(self, client: TestClient, existing_user: User, auth_headers: dict):
         receipt_data = {
@@ -75,21 +174,223 @@ class TestReceiptCreate:
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class TestReceiptIdempotency:
+    receipt_data = {
+        "products": [{"name": "Test Product", "price": "10.00", "quantity": "1"}],
+        "payment": {"type": PaymentType.CASH, "amount": "15.00"},
+    }
+
+    def test_create_receipt_replay(self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict):
+        headers = {**auth_headers, "Idempotency-Key": "replay-key"}
+
+        first = client.post("/receipts/create", json=self.receipt_data, headers=headers)
+        second = client.post("/receipts/create", json=self.receipt_data, headers=headers)
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_201_CREATED
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert len(test_db.scalars(select(Receipt)).all()) == 1
+
+    def test_create_receipt_key_reused_with_different_request(
+        self, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        headers = {**auth_headers, "Idempotency-Key": "reused-key"}
+        other_receipt_data = {**self.receipt_data, "payment": {"type": PaymentType.CARD, "amount": "10.00"}}
+
+        client.post("/receipts/create", json=self.receipt_data, headers=headers)
+        response = client.post("/receipts/create", json=other_receipt_data, headers=headers)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    def test_create_receipt_failed_request_is_not_stored(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        headers = {**auth_headers, "Idempotency-Key": "retry-key"}
+        insufficient_payment = {**self.receipt_data, "payment": {"type": PaymentType.CASH, "amount": "5.00"}}
+
+        first = client.post("/receipts/create", json=insufficient_payment, headers=headers)
+        second = client.post("/receipts/create", json=insufficient_payment, headers=headers)
+
+        assert first.status_code == status.HTTP_400_BAD_REQUEST
+        assert second.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_create_receipt_replay_postgres_backend(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        store = PostgresIdempotencyStore(max_keys_per_user=1, ttl=60, purge_interval=60)
+        app.dependency_overrides[get_idempotency_store] = lambda: store
+        headers = {**auth_headers, "Idempotency-Key": "postgres-key"}
+
+        first = client.post("/receipts/create", json=self.receipt_data, headers=headers)
+        second = client.post("/receipts/create", json=self.receipt_data, headers=headers)
+        client.post("/receipts/create", json=self.receipt_data, headers={**auth_headers, "Idempotency-Key": "other"})
+
+        assert second.json() == first.json()
+        assert len(test_db.scalars(select(Receipt)).all()) == 2
+        assert test_db.scalars(select(IdempotencyKey.key)).all() == ["other"]
+
+    def test_create_receipt_replay_refreshes_last_use_postgres_backend(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        store = PostgresIdempotencyStore(max_keys_per_user=2, ttl=60, purge_interval=60)
+        app.dependency_overrides[get_idempotency_store] = lambda: store
+
+        for key in ["first", "second", "first"]:
+            client.post("/receipts/create", json=self.receipt_data, headers={**auth_headers, "Idempotency-Key": key})
+        # Drops whatever the replay left uncommitted.
+        test_db.rollback()
+        client.post("/receipts/create", json=self.receipt_data, headers={**auth_headers, "Idempotency-Key": "third"})
+
+        assert set(test_db.scalars(select(IdempotencyKey.key)).all()) == {"first", "third"}
+
+    def test_create_receipt_purges_expired_keys_postgres_backend(
+        self,
+        test_db: Session,
+        client: TestClient,
+        existing_user: User,
+        new_user_data: UserRegisterData,
+        auth_headers: dict,
+    ):
+        store = PostgresIdempotencyStore(max_keys_per_user=10, ttl=60, purge_interval=60)
+        app.dependency_overrides[get_idempotency_store] = lambda: store
+        idle_user = User(name=new_user_data.name, email=new_user_data.email, password="hash")
+        test_db.add(idle_user)
+        test_db.flush()
+        test_db.add_all(
+            [
+                IdempotencyKey(idle_user.id, "expired", "fingerprint", {}, datetime.now(timezone.utc) - timedelta(1)),
+                IdempotencyKey(idle_user.id, "live", "fingerprint", {}, datetime.now(timezone.utc) + timedelta(1)),
+            ]
+        )
+        test_db.flush()
+
+        client.post("/receipts/create", json=self.receipt_data, headers={**auth_headers, "Idempotency-Key": "new"})
+
+        keys = test_db.execute(select(IdempotencyKey.user_id, IdempotencyKey.key)).all()
+        assert sorted(keys) == sorted([(idle_user.id, "live"), (existing_user.id, "new")])
+
+
+class TestReceiptBulkCreate:
+    def test_bulk_create_receipts_success(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipts_data = [
+            {
+                "products": [{"name": f"Product {i}", "price": "10.50", "quantity": "2"}],
+                "payment": {"type": PaymentType.CASH, "amount": "25.00"},
+            }
+            for i in range(3)
+        ]
+
+        response = client.post("/receipts/bulk-create", json=receipts_data, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["created_count"] == 3
+        assert [result["index"] for result in data["results"]] == [0, 1, 2]
+        assert all(result["success"] for result in data["results"])
+        assert data["results"][0]["receipt"]["total"] == "21.00"
+        assert data["results"][0]["receipt"]["rest"] == "4.00"
+
+        receipt_ids = [result["receipt"]["id"] for result in data["results"]]
+        receipts_in_db = test_db.scalars(select(Receipt).where(Receipt.id.in_(receipt_ids))).all()
+        assert len(receipts_in_db) == 3
+        assert all(receipt.user_id == existing_user.id for receipt in receipts_in_db)
+
+    def test_bulk_create_receipts_partial_failure(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipts_data = [
+            {
+                "products": [{"name": "Test Product", "price": "10.00", "quantity": "1"}],
+                "payment": {"type": PaymentType.CASH, "amount": "15.00"},
+            },
+            {
+                "products": [{"name": "Expensive Item", "price": "100.00", "quantity": "1"}],
+                "payment": {"type": PaymentType.CARD, "amount": "50.00"},
+            },
+        ]
+
+        response = client.post("/receipts/bulk-create", json=receipts_data, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["created_count"] == 1
+        assert data["results"][0]["success"] is True
+        assert data["results"][1]["success"] is False
+        assert data["results"][1]["receipt"] is None
+        assert data["results"][1]["error"] == "Insufficient payment amount"
+        assert test_db.scalars(select(Receipt.id)).all() == [data["results"][0]["receipt"]["id"]]
+
+    def test_bulk_create_receipts_invalid_items(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipts_data = [
+            {
+                "products": [{"name": "Test Product", "price": "10.00", "quantity": "1"}],
+                "payment": {"type": PaymentType.CASH, "amount": "15.00"},
+            },
+            {
+                "products": [{"name": "Free Item", "price": "-1.00", "quantity": "1"}],
+                "payment": {"type": PaymentType.CASH, "amount": "15.00"},
+            },
+            {"products": [{"name": "Test Product", "price": "10.00", "quantity": "1"}]},
+            {
+                "products": [{"name": "Another Product", "price": "5.00", "quantity": "2"}],
+                "payment": {"type": PaymentType.CARD, "amount": "10.00"},
+            },
+        ]
+
+        response = client.post("/receipts/bulk-create", json=receipts_data, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["created_count"] == 2
+        assert [result["success"] for result in data["results"]] == [True, False, False, True]
+        assert data["results"][1]["receipt"] is None
+        assert data["results"][1]["error"].startswith("products.0.price: ")
+        assert data["results"][2]["error"] == "payment: Field required"
+        assert data["results"][3]["receipt"]["total"] == "10.00"
+        created_ids = {data["results"][0]["receipt"]["id"], data["results"][3]["receipt"]["id"]}
+        assert set(test_db.scalars(select(Receipt.id)).all()) == created_ids
+
+    def test_bulk_create_receipts_empty(self, client: TestClient, existing_user: User, auth_headers: dict):
+        response = client.post("/receipts/bulk-create", json=[], headers=auth_headers)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    def test_bulk_create_receipts_unauthorized(self, client: TestClient):
+        response = client.post("/receipts/bulk-create", json=[])
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_bulk_create_receipts_openapi_schema(self, client: TestClient):
+        operation = client.get("/openapi.json").json()["paths"]["/receipts/bulk-create"]["post"]
+        items = operation["requestBody"]["content"]["application/json"]["schema"]["items"]
+
+        assert items["title"] == "ReceiptCreateRequest"
+        assert items["required"] == ["products", "payment"]
+
+
 class TestReceiptList:
     def test_list_receipts_success(self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict):
         receipt1 = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 1", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         receipt2 = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 2", "price": "20.00", "quantity": "1", "total": "20.00"}]},
-            total_cost=Decimal("20.00"),
+            total_minor=2000,
             payment_type=PaymentType.CARD,
-            payment_amount=Decimal("20.00"),
+            payment_minor=2000,
         )
         test_db.add_all([receipt1, receipt2])
         test_db.commit()
@@ -111,9 +412,9 @@ class TestReceiptList:
             receipt = Receipt(
                 user_id=existing_user.id,
                 products={"items": [{"name": f"Product {i}", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-                total_cost=Decimal("10.00"),
+                total_minor=1000,
                 payment_type=PaymentType.CASH,
-                payment_amount=Decimal("15.00"),
+                payment_minor=1500,
             )
             test_db.add(receipt)
         test_db.flush()
@@ -134,16 +435,16 @@ class TestReceiptList:
         receipt_cash = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 1", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         receipt_card = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 2", "price": "20.00", "quantity": "1", "total": "20.00"}]},
-            total_cost=Decimal("20.00"),
+            total_minor=2000,
             payment_type=PaymentType.CARD,
-            payment_amount=Decimal("20.00"),
+            payment_minor=2000,
         )
         test_db.add_all([receipt_cash, receipt_card])
         test_db.flush()
@@ -162,16 +463,16 @@ class TestReceiptList:
         receipt1 = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 1", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         receipt2 = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Product 2", "price": "50.00", "quantity": "1", "total": "50.00"}]},
-            total_cost=Decimal("50.00"),
+            total_minor=5000,
             payment_type=PaymentType.CARD,
-            payment_amount=Decimal("50.00"),
+            payment_minor=5000,
         )
         test_db.add_all([receipt1, receipt2])
         test_db.commit()
@@ -184,20 +485,364 @@ class TestReceiptList:
         assert data["total_count"] == 1
         assert float(data["receipts"][0]["total"]) >= 30
 
+        response = client.post("/receipts/search", json={"min_total": "9.995"}, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total_count"] == 2
+
+    def test_list_receipts_filter_by_product_name(self, client: TestClient, existing_user: User, auth_headers: dict):
+        for names in [["Oat Milk", "Espresso"], ["Whole milk"], ["Milkshake"], ["Tea_50%"]]:
+            client.post(
+                "/receipts/create",
+                json={
+                    "products": [{"name": name, "price": "1.00", "quantity": "1"} for name in names],
+                    "payment": {"type": PaymentType.CASH, "amount": "5.00"},
+                },
+                headers=auth_headers,
+            )
+
+        def search(**filters: str) -> int:
+            response = client.post("/receipts/search", json=filters, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            return response.json()["total_count"]
+
+        assert search(product_name="MILK") == 3
+        assert search(product_name="milk", product_name_match="prefix") == 1
+        assert search(product_name="milk", payment_type=PaymentType.CARD) == 0
+        assert search(product_name="_5") == 1
+        assert search(product_name="a_5") == 1
+        assert search(product_name="%") == 1
+        assert search(product_name="Coffee") == 0
+
     def test_list_receipts_unauthorized(self, client: TestClient):
         response = client.post("/receipts/search", json={})
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+    def test_list_receipts_cursor_pagination(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for i in range(12):
+            receipt = Receipt(
+                user_id=existing_user.id,
+                products={"items": [{"name": f"Product {i}", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+                total_minor=1000,
+                payment_type=PaymentType.CASH if i % 2 else PaymentType.CARD,
+                payment_minor=1500,
+            )
+            test_db.add(receipt)
+        test_db.flush()
+
+        seen_ids = []
+        cursor = None
+        while True:
+            url = "/receipts/search?per_page=5" + (f"&cursor={cursor}" if cursor else "")
+            response = client.post(url, json={}, headers=auth_headers)
+
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            seen_ids.extend(receipt["id"] for receipt in data["receipts"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+            assert data["total_count"] == 12
+
+        assert len(seen_ids) == 12
+        assert seen_ids == sorted(seen_ids, reverse=True)
+
+    def test_list_receipts_cursor_with_filters(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for i in range(6):
+            receipt = Receipt(
+                user_id=existing_user.id,
+                products={"items": [{"name": f"Product {i}", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+                total_minor=1000,
+                payment_type=PaymentType.CASH if i % 2 else PaymentType.CARD,
+                payment_minor=1500,
+            )
+            test_db.add(receipt)
+        test_db.flush()
+
+        first_page = client.post(
+            "/receipts/search?per_page=2", json={"payment_type": PaymentType.CASH}, headers=auth_headers
+        ).json()
+        response = client.post(
+            f"/receipts/search?per_page=2&cursor={first_page['next_cursor']}",
+            json={"payment_type": PaymentType.CASH},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["page"] is None
+        assert data["next_cursor"] is None
+        assert len(data["receipts"]) == 1
+        assert data["receipts"][0]["payment_type"] == PaymentType.CASH
+        assert data["receipts"][0]["id"] < first_page["receipts"][-1]["id"]
+
+    def test_list_receipts_count_modes(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for i in range(7):
+            receipt = Receipt(
+                user_id=existing_user.id,
+                products={"items": [{"name": f"Product {i}", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+                total_minor=1000,
+                payment_type=PaymentType.CASH,
+                payment_minor=1500,
+            )
+            test_db.add(receipt)
+        test_db.flush()
+
+        exact = client.post("/receipts/search?per_page=5&count_mode=exact", json={}, headers=auth_headers).json()
+        estimate = client.post("/receipts/search?per_page=5&count_mode=estimate", json={}, headers=auth_headers).json()
+        no_count = client.post("/receipts/search?per_page=5&count_mode=none", json={}, headers=auth_headers).json()
+        last_page = client.post(
+            "/receipts/search?page=2&per_page=5&count_mode=none", json={}, headers=auth_headers
+        ).json()
+
+        assert exact["count_mode"] == "exact"
+        assert exact["total_count"] == 7
+        assert exact["has_more"] is True
+        assert estimate["count_mode"] == "estimate"
+        assert isinstance(estimate["total_count"], int)
+        assert no_count["count_mode"] == "none"
+        assert no_count["total_count"] is None
+        assert no_count["has_more"] is True
+        assert len(no_count["receipts"]) == 5
+        assert last_page["has_more"] is False
+        assert len(last_page["receipts"]) == 2
+
+    def test_list_receipts_page_past_end(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for i in range(7):
+            receipt = Receipt(
+                user_id=existing_user.id,
+                products={"items": [{"name": f"Product {i}", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+                total_minor=1000,
+                payment_type=PaymentType.CASH,
+                payment_minor=1500,
+            )
+            test_db.add(receipt)
+        test_db.flush()
+
+        response = client.post("/receipts/search?page=9&per_page=5", json={}, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["total_count"] == 7
+        assert data["page"] == 2
+        assert data["has_more"] is False
+        assert len(data["receipts"]) == 2
+
+    def test_list_receipts_no_matches(self, client: TestClient, existing_user: User, auth_headers: dict):
+        response = client.post("/receipts/search?page=3", json={"payment_type": PaymentType.CARD}, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["total_count"] == 0
+        assert data["page"] == 0
+        assert data["has_more"] is False
+        assert data["receipts"] == []
+        assert data["next_cursor"] is None
+
+    def test_list_receipts_invalid_cursor(self, client: TestClient, existing_user: User, auth_headers: dict):
+        response = client.post("/receipts/search?cursor=not-a-cursor", json={}, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        for created_at, receipt_id in [
+            (datetime(2020, 1, 1, tzinfo=timezone.utc), 99999999999999999999),
+            (datetime(2020, 1, 1), 1),
+        ]:
+            cursor = encode_cursor(created_at, receipt_id)
+            response = client.post(f"/receipts/search?cursor={cursor}", json={}, headers=auth_headers)
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response.json()["detail"] == "Invalid cursor"
+
+
+class TestReceiptExport:
+    def test_export_receipts_ndjson(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={
+                "items": [
+                    {"name": "Product 1", "price": "10.00", "quantity": "2", "total": "20.00"},
+                    {"name": "Product 2", "price": "5.00", "quantity": "1", "total": "5.00"},
+                ]
+            },
+            total_minor=2500,
+            payment_type=PaymentType.CASH,
+            payment_minor=3000,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+
+        response = client.get("/receipts/export?format=ndjson", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        [line] = [json.loads(line) for line in response.text.splitlines()]
+        assert line["id"] == receipt.id
+        assert line["total"] == "25.00"
+        assert line["rest"] == "5.00"
+        assert line["payment"] == {"type": "cash", "amount": "30.00"}
+        assert [product["name"] for product in line["products"]] == ["Product 1", "Product 2"]
+
+    def test_export_receipts_csv_with_filters(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt_cash = Receipt(
+            user_id=existing_user.id,
+            products={
+                "items": [
+                    {"name": "Product 1", "price": "10.00", "quantity": "2", "total": "20.00"},
+                    {"name": "Product 2", "price": "5.00", "quantity": "1", "total": "5.00"},
+                ]
+            },
+            total_minor=2500,
+            payment_type=PaymentType.CASH,
+            payment_minor=3000,
+        )
+        receipt_card = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Product 3", "price": "20.00", "quantity": "1", "total": "20.00"}]},
+            total_minor=2000,
+            payment_type=PaymentType.CARD,
+            payment_minor=2000,
+        )
+        test_db.add_all([receipt_cash, receipt_card])
+        test_db.flush()
+
+        response = client.get("/receipts/export?format=csv&payment_type=cash", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["product_name"] for row in rows] == ["Product 1", "Product 2"]
+        assert all(row["receipt_id"] == str(receipt_cash.id) for row in rows)
+        assert rows[0]["product_total"] == "20.00"
+
+    def test_export_receipts_items_agree_with_totals(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        created = client.post(
+            "/receipts/create",
+            json={
+                "products": [{"name": "Product 1", "price": "10.5", "quantity": "2"}],
+                "payment": {"type": PaymentType.CASH, "amount": "25.00"},
+            },
+            headers=auth_headers,
+        ).json()
+        legacy = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Product 2", "price": "1.005", "quantity": "1", "total": "1.005"}]},
+            total_minor=101,
+            payment_type=PaymentType.CASH,
+            payment_minor=200,
+        )
+        test_db.add(legacy)
+        test_db.flush()
+
+        response = client.get("/receipts/export?format=ndjson", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        lines = {line["id"]: line for line in map(json.loads, response.text.splitlines())}
+        assert [(p["price"], p["total"]) for p in lines[created["id"]]["products"]] == [("10.5", "21.0")]
+        assert [(p["price"], p["total"]) for p in lines[legacy.id]["products"]] == [("1.01", "1.01")]
+        assert lines[legacy.id]["total"] == "1.01"
+
+    def test_export_receipts_invalid_format(self, client: TestClient, existing_user: User, auth_headers: dict):
+        response = client.get("/receipts/export?format=xml", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    def test_export_receipts_unauthorized(self, client: TestClient):
+        response = client.get("/receipts/export")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestReceiptStats:
+    def test_stats_updated_on_create(self, client: TestClient, existing_user: User, auth_headers: dict):
+        cash_receipt = {
+            "products": [{"name": "Test Product", "price": "10.00", "quantity": "2"}],
+            "payment": {"type": PaymentType.CASH, "amount": "20.00"},
+        }
+        card_receipt = {
+            "products": [{"name": "Test Product", "price": "5.50", "quantity": "1"}],
+            "payment": {"type": PaymentType.CARD, "amount": "5.50"},
+        }
+        client.post("/receipts/create", json=cash_receipt, headers=auth_headers)
+        client.post("/receipts/bulk-create", json=[cash_receipt, card_receipt], headers=auth_headers)
+
+        response = client.get("/receipts/stats", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["granularity"] == "day"
+        [bucket] = data["buckets"]
+        assert bucket["receipt_count"] == 3
+        assert bucket["total"] == "45.50"
+        assert bucket["cash_count"] == 2
+        assert bucket["cash_total"] == "40.00"
+        assert bucket["card_count"] == 1
+        assert bucket["card_total"] == "5.50"
+
+    def test_stats_backfill_and_monthly_buckets(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        for created_at in ["2025-01-05T10:00:00Z", "2025-01-20T23:30:00Z", "2025-02-01T00:10:00Z"]:
+            receipt = Receipt(
+                user_id=existing_user.id,
+                products={"items": [{"name": "Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+                total_minor=1000,
+                payment_type=PaymentType.CARD,
+                payment_minor=1000,
+                created_at=datetime.fromisoformat(created_at),
+            )
+            test_db.add(receipt)
+        test_db.commit()
+
+        with test_db.get_bind().engine.connect() as connection:
+            backfill_daily_stats(connection, existing_user.id, existing_user.id)
+
+        response = client.get(
+            "/receipts/stats?granularity=month&date_from=2025-01-01&date_to=2025-12-31", headers=auth_headers
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        buckets = response.json()["buckets"]
+        assert [(bucket["period"], bucket["receipt_count"]) for bucket in buckets] == [
+            ("2025-01-01", 2),
+            ("2025-02-01", 1),
+        ]
+        assert buckets[0]["card_total"] == "20.00"
+        assert buckets[0]["cash_count"] == 0
+
+    def test_stats_unauthorized(self, client: TestClient):
+        response = client.get("/receipts/stats")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
 
 class TestReceiptDetail:
     def test_get_receipt_success(self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict):
         receipt = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "2", "total": "20.00"}]},
-            total_cost=Decimal("20.00"),
+            total_minor=2000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("25.00"),
+            payment_minor=2500,
         )
         test_db.add(receipt)
         test_db.flush()
@@ -212,6 +857,98 @@ class TestReceiptDetail:
         assert data["rest"] == "5.00"
         assert len(data["products"]) == 1
 
+    def test_get_receipt_reads_normalized_items(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        created = [
+            client.post(
+                "/receipts/create",
+                json={
+                    "products": [
+                        {"name": "Coffee", "price": "3.50", "quantity": "2"},
+                        {"name": name, "price": "1.25", "quantity": "0.5"},
+                    ],
+                    "payment": {"type": PaymentType.CARD, "amount": "10.00"},
+                },
+                headers=auth_headers,
+            ).json()
+            for name in ["Croissant", "Cookie"]
+        ]
+
+        assert test_db.scalars(select(ProductName.name).order_by(ProductName.name)).all() == [
+            "Coffee",
+            "Cookie",
+            "Croissant",
+        ]
+        assert len(test_db.scalars(select(ReceiptItem)).all()) == 4
+
+        for receipt in created:
+            response = client.get(f"/receipts/{receipt['id']}", headers=auth_headers)
+
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["products"] == receipt["products"]
+
+    def test_receipt_items_backfill(
+        self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={
+                "items": [
+                    {"name": "Tea", "price": "2.00", "quantity": "3", "total": "6.00"},
+                    {"name": "Tea", "price": "2.50", "quantity": "1", "total": "2.50"},
+                ]
+            },
+            total_minor=850,
+            payment_type=PaymentType.CASH,
+            payment_minor=1000,
+        )
+        test_db.add(receipt)
+        test_db.commit()
+        before = client.get(f"/receipts/{receipt.id}", headers=auth_headers).json()
+
+        with test_db.get_bind().engine.connect() as connection:
+            backfill_receipt_items(connection, receipt.id, receipt.id)
+            backfill_receipt_items(connection, receipt.id, receipt.id)
+
+        items = test_db.scalars(select(ReceiptItem).order_by(ReceiptItem.position)).all()
+        assert [(item.position, item.product_name.name, item.total_minor) for item in items] == [
+            (0, "Tea", 600),
+            (1, "Tea", 250),
+        ]
+        assert client.get(f"/receipts/{receipt.id}", headers=auth_headers).json() == before
+
+    def test_receipt_responses_match_default_serialization(
+        self, client: TestClient, existing_user: User, auth_headers: dict
+    ):
+        receipt_data = {
+            "products": [
+                {"name": 'Кава "Лате" \\ ☕ \u0007', "price": "0.10", "quantity": "3"},
+                {"name": "Cheese / 𝄞", "price": "12.34", "quantity": "0.255"},
+            ],
+            "payment": {"type": PaymentType.CARD, "amount": "100"},
+        }
+
+        created = client.post("/receipts/create", json=receipt_data, headers=auth_headers)
+        detail = client.get(f"/receipts/{created.json()['id']}", headers=auth_headers)
+        search = client.post("/receipts/search", json={}, headers=auth_headers)
+        bulk = client.post(
+            "/receipts/bulk-create",
+            json=[receipt_data, {**receipt_data, "payment": {"type": "cash", "amount": "1"}}],
+            headers=auth_headers,
+        )
+
+        assert created.content == default_response_body(ReceiptResponse, created.content)
+        assert detail.content == default_response_body(ReceiptResponse, detail.content)
+        assert search.content == default_response_body(ReceiptListResponse, search.content)
+        assert bulk.content == default_response_body(ReceiptBulkCreateResponse, bulk.content)
+        assert detail.json()["products"][1] == {
+            "name": "Cheese / 𝄞",
+            "price": "12.34",
+            "quantity": "0.255",
+            "total": "3.15",
+        }
+
     def test_get_receipt_not_found(self, client: TestClient, existing_user: User, auth_headers: dict):
         response = client.get("/receipts/999", headers=auth_headers)
 
@@ -221,9 +958,9 @@ class TestReceiptDetail:
         receipt = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         test_db.add(receipt)
         test_db.flush()
@@ -243,9 +980,9 @@ class TestPublicReceipt:
                     {"name": "Product 2", "price": "50.00", "quantity": "2.00", "total": "100.00"},
                 ]
             },
-            total_cost=Decimal("400.00"),
+            total_minor=40000,
             payment_type=PaymentType.CARD,
-            payment_amount=Decimal("400.00"),
+            payment_minor=40000,
         )
         test_db.add(receipt)
         test_db.flush()
@@ -262,9 +999,9 @@ class TestPublicReceipt:
         receipt = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         test_db.add(receipt)
         test_db.flush()
@@ -285,9 +1022,9 @@ class TestPublicReceipt:
         receipt = Receipt(
             user_id=existing_user.id,
             products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
-            total_cost=Decimal("10.00"),
+            total_minor=1000,
             payment_type=PaymentType.CASH,
-            payment_amount=Decimal("15.00"),
+            payment_minor=1500,
         )
         test_db.add(receipt)
         test_db.flush()
@@ -295,3 +1032,145 @@ class TestPublicReceipt:
         response = client.get(f"/receipts/{receipt.id}/public")
 
         assert response.status_code == status.HTTP_200_OK
+
+    def test_get_public_receipt_cache_headers(self, test_db: Session, client: TestClient, existing_user: User):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+            total_minor=1000,
+            payment_type=PaymentType.CASH,
+            payment_minor=1500,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+
+        response = client.get(f"/receipts/{receipt.id}/public")
+        not_modified = client.get(f"/receipts/{receipt.id}/public", headers={"If-None-Match": response.headers["ETag"]})
+        other_width = client.get(f"/receipts/{receipt.id}/public?line_width=50")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "immutable" in response.headers["Cache-Control"]
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified.content == b""
+        assert other_width.headers["ETag"] != response.headers["ETag"]
+
+    def test_get_public_receipt_if_none_match_missing_receipt(
+        self, test_db: Session, client: TestClient, existing_user: User
+    ):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+            total_minor=1000,
+            payment_type=PaymentType.CASH,
+            payment_minor=1500,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+        missing_id = receipt.id + 1
+
+        any_existing = client.get(f"/receipts/{receipt.id}/public", headers={"If-None-Match": "*"})
+        any_missing = client.get(f"/receipts/{missing_id}/public", headers={"If-None-Match": "*"})
+        made_up = client.get(f"/receipts/{missing_id}/public", headers={"If-None-Match": f'"{missing_id}-32-text-v1"'})
+
+        assert any_existing.status_code == status.HTTP_304_NOT_MODIFIED
+        assert any_missing.status_code == status.HTTP_404_NOT_FOUND
+        assert made_up.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_get_public_receipt_served_from_cache(self, test_db: Session, client: TestClient, existing_user: User):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+            total_minor=1000,
+            payment_type=PaymentType.CASH,
+            payment_minor=1500,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+
+        first = client.get(f"/receipts/{receipt.id}/public")
+        test_db.delete(receipt)
+        test_db.flush()
+        second = client.get(f"/receipts/{receipt.id}/public")
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.text == first.text
+
+    def test_get_public_receipt_formats(self, test_db: Session, client: TestClient, existing_user: User):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Tea & <Co>", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+            total_minor=1000,
+            payment_type=PaymentType.CASH,
+            payment_minor=1500,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+
+        text_response = client.get(f"/receipts/{receipt.id}/public")
+        html_response = client.get(f"/receipts/{receipt.id}/public?format=html")
+        escpos_response = client.get(f"/receipts/{receipt.id}/public?format=escpos")
+
+        assert html_response.status_code == status.HTTP_200_OK
+        assert html_response.headers["Content-Type"] == "text/html; charset=utf-8"
+        assert html_response.text.startswith("<!DOCTYPE html>")
+        assert "Tea &amp; &lt;Co&gt;" in html_response.text
+
+        assert escpos_response.status_code == status.HTTP_200_OK
+        assert escpos_response.headers["Content-Type"] == "application/octet-stream"
+        assert escpos_response.content.startswith(b"\x1b@\x1bt\x2e")
+        assert escpos_response.content.endswith(b"\x1dV\x01")
+        assert text_response.text.encode("cp1251") in escpos_response.content
+
+        etags = {response.headers["ETag"] for response in [text_response, html_response, escpos_response]}
+        assert len(etags) == 3
+
+    def test_render_batch(self, test_db: Session, client: TestClient, existing_user: User, auth_headers: dict):
+        created = client.post(
+            "/receipts/create",
+            json={
+                "products": [{"name": "Coffee", "price": "3.50", "quantity": "2"}],
+                "payment": {"type": PaymentType.CARD, "amount": "7.00"},
+            },
+            headers=auth_headers,
+        ).json()
+        stored = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Tea", "price": "2.00", "quantity": "3", "total": "6.00"}]},
+            total_minor=600,
+            payment_type=PaymentType.CASH,
+            payment_minor=1000,
+        )
+        test_db.add(stored)
+        test_db.flush()
+        receipt_ids = [stored.id, created["id"], stored.id]
+
+        cached = client.get(f"/receipts/{created['id']}/public")
+        batch = client.post("/receipts/public/render-batch", json={"receipt_ids": receipt_ids})
+
+        assert batch.status_code == status.HTTP_200_OK
+        assert batch.headers["Content-Type"] == "text/plain; charset=utf-8"
+        singles = [client.get(f"/receipts/{receipt_id}/public").text for receipt_id in receipt_ids]
+        assert batch.text == "\n\n".join(singles)
+        assert singles[1] == cached.text
+
+        escpos = client.post(
+            "/receipts/public/render-batch", json={"receipt_ids": receipt_ids, "format": "escpos", "line_width": 40}
+        )
+        assert escpos.content.count(b"\x1b@") == 1
+        assert escpos.content.count(b"\x1dV\x01") == 3
+
+    def test_render_batch_not_found(self, test_db: Session, client: TestClient, existing_user: User):
+        receipt = Receipt(
+            user_id=existing_user.id,
+            products={"items": [{"name": "Test Product", "price": "10.00", "quantity": "1", "total": "10.00"}]},
+            total_minor=1000,
+            payment_type=PaymentType.CASH,
+            payment_minor=1500,
+        )
+        test_db.add(receipt)
+        test_db.flush()
+
+        response = client.post("/receipts/public/render-batch", json={"receipt_ids": [receipt.id, 998, 999]})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Receipts not found: 998, 999"
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from src.config import config
+from src.models import Receipt, User
+from src.utils.metrics import instrument_engine, parameter_shape
+
+
+@pytest.fixture
+def instrumented_db(test_db: Session) -> Session:
+    instrument_engine(test_db.get_bind().engine)
+    return test_db
+
+
+@pytest.fixture
+def tracing_enabled(monkeypatch: pytest.MonkeyPatch, instrumented_db: Session) -> None:
+    monkeypatch.setattr(config, "TRACING_ENABLED", True)
+
+
+def parse_server_timing(header: str) -> dict[str, dict[str, str]]:
+    metrics = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+class TestServerTiming:
+    def test_disabled_by_default(self, client: TestClient, receipt: Receipt, auth_headers: dict):
+        response = client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Server-Timing" not in response.headers
+
+    def test_receipt_route_phases(
+        self, tracing_enabled: None, client: TestClient, receipt: Receipt, auth_headers: dict
+    ):
+        response = client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        timing = parse_server_timing(response.headers["Server-Timing"])
+        assert list(timing) == ["auth", "db", "serialize"]
+        assert float(timing["auth"]["dur"]) > 0
+        assert float(timing["db"]["dur"]) > 0
+        assert timing["db"]["desc"] == '"statements=2 rows=1"'
+        assert float(timing["serialize"]["dur"]) > 0
+
+    def test_auth_route_phases(self, tracing_enabled: None, client: TestClient, existing_user: User):
+        response = client.post("/auth/token", data={"username": existing_user.email, "password": "password123"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "access_token" in response.json()
+        timing = parse_server_timing(response.headers["Server-Timing"])
+        assert float(timing["auth"]["dur"]) > 0
+        assert timing["db"]["desc"] == '"statements=1 rows=1"'
+
+    def test_other_routers_not_traced(self, monkeypatch: pytest.MonkeyPatch, tracing_enabled: None, client: TestClient):
+        monkeypatch.setattr(config, "METRICS_ENABLED", True)
+
+        response = client.get("/metrics/pool")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Server-Timing" not in response.headers
+
+
+class TestSlowQueryLog:
+    def test_logs_slow_statements_with_route(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+        instrumented_db: Session,
+        client: TestClient,
+        receipt: Receipt,
+        auth_headers: dict,
+    ):
+        monkeypatch.setattr(config, "SLOW_QUERY_LOG_MS", 0.000001)
+
+        with caplog.at_level("WARNING", logger="src.slow_queries"):
+            response = client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        entries = [json.loads(record.getMessage()) for record in caplog.records]
+        assert [entry["route"] for entry in entries] == ["GET /receipts/{receipt_id}"] * 2
+        assert [entry["rows"] for entry in entries] == [1, 0]
+        assert "FROM receipts" in entries[0]["statement"]
+        assert entries[0]["parameters"] == {"receipt_id": "int", "user_id_1": "int", "position_1": "int"}
+        assert "Server-Timing" not in response.headers
+
+    def test_fast_statements_not_logged(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+        instrumented_db: Session,
+        client: TestClient,
+        receipt: Receipt,
+        auth_headers: dict,
+    ):
+        monkeypatch.setattr(config, "SLOW_QUERY_LOG_MS", 60_000)
+
+        with caplog.at_level("WARNING", logger="src.slow_queries"):
+            client.get(f"/receipts/{receipt.id}", headers=auth_headers)
+
+        assert caplog.records == []
+
+    def test_parameter_shape(self):
+        assert parameter_shape({"id_1": 7, "names": ["a", "b"]}) == {"id_1": "int", "names": "list[2]"}
+        assert parameter_shape([{"id": 1}, {"id": 2}], executemany=True) == {"rows": 2, "row": {"id": "int"}}
+        assert parameter_shape(("secret", 3)) == ["str", "int"]
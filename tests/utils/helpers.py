@@ -1,3 +1,9 @@
+from typing import AsyncIterator, Sequence
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Result, Row
+
 from src.services.auth import login_user
 
 
@@ -8,3 +14,20 @@ def create_auth_headers(token: str) -> dict[str, str]:
 async def get_access_token(async_client, email: str, password: str) -> str:
     response = await login_user(async_client, email, password)
     return response.access_token
+
+
+def default_response_body(model: type[BaseModel], content: bytes) -> bytes:
+    """The body FastAPI renders when a route returns the model: validate, dump to JSON-able data, json.dumps."""
+    adapter = TypeAdapter(model)
+    return bytes(JSONResponse(adapter.dump_python(adapter.validate_json(content), mode="json")).body)
+
+
+class AsyncResultStub:
+    """Async facade over a sync Result, standing in for AsyncSession.stream() in tests."""
+
+    def __init__(self, result: Result) -> None:
+        self._result = result
+
+    async def partitions(self, size: int | None = None) -> AsyncIterator[Sequence[Row]]:
+        for partition in self._result.partitions(size):
+            yield partition